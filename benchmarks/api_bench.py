@@ -0,0 +1,252 @@
+"""
+HTTP接口压测：在工作目录中生成与db.sqlite3结构相同的数据库（题目、测试样例、用户，规模可配置），
+再通过ASGI客户端在进程内直接调用应用，逐个接口测量吞吐、尾延迟和每个请求的数据库查询数，输出JSON报告。
+
+    python -m benchmarks.api_bench --problems 10000 --samples-per-problem 100 --users 100000 --out api.json
+    python -m benchmarks.api_bench --endpoints problem_list,problem --requests 5000 --concurrency 64
+
+同样规模的数据只生成一次（工作目录中的seed.json记录规模），--reseed强制重新生成。
+所有样例共享少量不同的测试数据（--distinct-blobs），blob存储因去重而保持很小，样例行数不受影响。
+需要额外安装httpx。
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import random
+import threading
+import time
+import typing
+
+from benchmarks.common import latency_summary, make_report, write_report
+
+BENCH_PASSWORD = "benchmark-password"
+BATCH_SIZE = 10_000
+
+
+class Endpoint(typing.NamedTuple):
+    method: str
+    make_request: typing.Callable[[random.Random, dict], dict]  # httpx.AsyncClient.request keyword arguments
+
+
+ENDPOINTS: typing.Dict[str, Endpoint] = {
+    "problem_list": Endpoint("POST", lambda rng, scale: {
+        "url": "/problems/list",
+        "json": {"page_size": 20, "after": rng.randint(0, max(0, scale["problems"] - 20))}
+    }),
+    "problem_list_offset": Endpoint("POST", lambda rng, scale: {
+        "url": "/problems/list",
+        "json": {"page_size": 20, "page_num": rng.randint(1, max(1, scale["problems"] // 20))}
+    }),
+    "problem": Endpoint("GET", lambda rng, scale: {
+        "url": f"/problems/problem/{rng.randint(1, scale['problems'])}"
+    }),
+    "test_samples": Endpoint("GET", lambda rng, scale: {
+        "url": f"/test_samples/{rng.randint(1, scale['problems'])}/all"
+    }),
+    "token": Endpoint("POST", lambda rng, scale: {
+        "url": "/auth/token",
+        "data": {"username": f"user{rng.randint(1, scale['users'])}@example.com", "password": BENCH_PASSWORD}
+    })
+}
+
+
+def _batches(rows: typing.Iterable[dict], size: int = BATCH_SIZE) -> typing.Iterator[typing.List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(scale: dict, distinct_blobs: int, sample_bytes: int):
+    """Create the tables and fill them in one transaction per table, with executemany batches."""
+    from sqlalchemy import insert
+
+    import database
+    from models import user, test_sample, problem, runtime_info, source_code, submission  # noqa: F401, mappers
+    from models.problem import Problem
+    from models.test_sample import TestSample
+    from models.user import User
+    from services.blob_store import blob_store
+    from utils.auth import make_hashed_password
+
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+
+    rng = random.Random(0)
+    blobs = []
+    for number in range(distinct_blobs):
+        payload = "".join(f"{rng.randint(0, 10 ** 6)}\n" for _ in range(max(1, sample_bytes // 8)))
+        input_blob, output_blob = blob_store.put(f"{number}\n{payload}"), blob_store.put(payload)
+        blobs.append((input_blob, output_blob, blob_store.normalize(output_blob.digest)))
+
+    with database.engine.begin() as connection:
+        for batch in _batches({
+            "pid": pid, "title": f"Problem {pid}", "description": "Benchmark problem. " * 20,
+            "input": "Some integers.", "output": "Their sum.", "sample_input": "1 2", "sample_output": "3",
+            "labels": "benchmark", "source": "benchmark", "hint": "", "difficulty": "easy",
+            "time_limit": "1", "memory_limit": "16", "accepted": 0, "submit": 0, "solved": 0, "defunct": False
+        } for pid in range(1, scale["problems"] + 1)):
+            connection.execute(insert(Problem), batch)
+
+    def samples():
+        for pid in range(1, scale["problems"] + 1):
+            for num in range(1, scale["samples_per_problem"] + 1):
+                input_blob, output_blob, normalized = blobs[(pid + num) % len(blobs)]
+                yield {
+                    "num": num, "problem_id": pid,
+                    "input_digest": input_blob.digest, "input_size": input_blob.size,
+                    "output_digest": output_blob.digest, "output_size": output_blob.size,
+                    "normalized_output_digest": normalized.digest
+                }
+
+    with database.engine.begin() as connection:
+        for batch in _batches(samples()):
+            connection.execute(insert(TestSample), batch)
+
+    password = make_hashed_password(BENCH_PASSWORD)  # bcrypt is slow on purpose, every user shares one hash
+    with database.engine.begin() as connection:
+        for batch in _batches({
+            "uid": uid, "username": f"user{uid}", "email": f"user{uid}@example.com",
+            "disabled": False, "verified": True, "password": password
+        } for uid in range(1, scale["users"] + 1)):
+            connection.execute(insert(User), batch)
+
+
+def ensure_seeded(workdir: pathlib.Path, scale: dict, distinct_blobs: int, sample_bytes: int, reseed: bool) -> float:
+    """Seconds spent seeding, 0 when the workdir already holds data of this scale."""
+    marker = workdir / "seed.json"
+    wanted = {**scale, "distinct_blobs": distinct_blobs, "sample_bytes": sample_bytes}
+    if not reseed and marker.exists() and json.loads(marker.read_text()) == wanted \
+            and (workdir / "db.sqlite3").exists():
+        return 0.0
+    marker.unlink(missing_ok=True)
+    started = time.perf_counter()
+    seed(scale, distinct_blobs, sample_bytes)
+    marker.write_text(json.dumps(wanted))
+    return time.perf_counter() - started
+
+
+def make_app():
+    """The routers under test, without main.py's startup side effects (redis-server, backfill)."""
+    from fastapi import FastAPI
+
+    from models import user, test_sample, problem, runtime_info, source_code, submission  # noqa: F401, mappers
+    from routes.auth.index import router as auth_router
+    from routes.problems.index import router as problems_router
+    from routes.test_samples.index import router as test_samples_router
+
+    app = FastAPI()
+    app.include_router(auth_router)
+    app.include_router(problems_router)
+    app.include_router(test_samples_router)
+    return app
+
+
+class QueryCounter:
+    """Counts statements sent to the database; endpoints are driven one at a time, so a phase's count is its own."""
+
+    def __init__(self, *engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()  # sessions run on the DB executor and the writer thread
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+async def drive(client, endpoint: Endpoint, scale: dict, requests: int, concurrency: int, counter: QueryCounter,
+                seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    planned = [endpoint.make_request(rng, scale) for _ in range(requests)]
+    latencies: typing.List[float] = []
+    statuses: typing.Dict[str, int] = {}
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def one(request: dict):
+        async with limiter:
+            started = time.perf_counter()
+            response = await client.request(endpoint.method, **request)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in planned))
+    wall = time.perf_counter() - started
+    queries = counter.count - queries_before
+    return {
+        "requests": requests,
+        "wall_seconds": round(wall, 3),
+        "per_second": round(requests / wall, 3) if wall else None,
+        "latency": latency_summary(latencies),
+        "statuses": statuses,
+        "queries": queries,
+        "queries_per_request": round(queries / requests, 3) if requests else None
+    }
+
+
+async def run_endpoints(args, scale: dict) -> dict:
+    import httpx
+
+    import database
+
+    counter = QueryCounter(database.engine, database.read_engine, database.write_engine)
+    transport = httpx.ASGITransport(app=make_app())
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for number, name in enumerate(args.endpoints):
+            endpoint = ENDPOINTS[name]
+            requests = args.token_requests if name == "token" else args.requests
+            if args.warmup:
+                await drive(client, endpoint, scale, args.warmup, args.concurrency, counter, -1 - number)
+            results[name] = await drive(client, endpoint, scale, requests, args.concurrency, counter, number)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the read endpoints in-process on a seeded database")
+    parser.add_argument("--problems", type=int, default=10_000)
+    parser.add_argument("--samples-per-problem", type=int, default=100)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--distinct-blobs", type=int, default=64, help="different test data files behind all samples")
+    parser.add_argument("--sample-bytes", type=int, default=256, help="approximate size of one test data file")
+    parser.add_argument("--reseed", action="store_true", help="regenerate the database even if the scale matches")
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), default=list(ENDPOINTS),
+                        help=f"comma separated, from {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    parser.add_argument("--token-requests", type=int, default=200, help="requests to /auth/token, bcrypt bound")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workdir", type=pathlib.Path, default=pathlib.Path("/tmp/pseudo-oj-api-bench"))
+    parser.add_argument("--out", default=None, help="JSON report path, stdout when omitted")
+    args = parser.parse_args()
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        parser.exit(1, "api_bench needs httpx: pip install httpx\n")
+
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(args.workdir)  # database.py and the blob store use paths relative to the working directory
+    scale = {"problems": args.problems, "samples_per_problem": args.samples_per_problem, "users": args.users}
+    seed_seconds = ensure_seeded(args.workdir, scale, args.distinct_blobs, args.sample_bytes, args.reseed)
+    results = asyncio.run(run_endpoints(args, scale))
+    config = {key: str(value) if isinstance(value, pathlib.Path) else value for key, value in vars(args).items()}
+    write_report(make_report("api", config, {"seed_seconds": round(seed_seconds, 3), "endpoints": results}),
+                 args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+基准测试的公共部分：延迟统计、运行环境信息与JSON报告。
+
+报告是一个JSON对象，带有当前commit，保存下来即可在两个commit之间比较吞吐与尾延迟的变化。
+"""
+import datetime
+import json
+import os
+import pathlib
+import platform
+import resource
+import subprocess
+import sys
+import typing
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def percentile(values: typing.Sequence[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of an unsorted sequence."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def latency_summary(seconds: typing.Sequence[float]) -> dict:
+    """Milliseconds, rounded to microseconds."""
+    def ms(value: float | None) -> float | None:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "count": len(seconds),
+        "mean": ms(sum(seconds) / len(seconds)) if seconds else None,
+        "p50": ms(percentile(seconds, 0.50)),
+        "p95": ms(percentile(seconds, 0.95)),
+        "p99": ms(percentile(seconds, 0.99)),
+        "max": ms(max(seconds)) if seconds else None
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def process_memory() -> dict:
+    """Peak RSS in KB of the benchmark itself and of its largest reaped child."""
+    return {
+        "self_peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_peak_rss": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    }
+
+
+def make_report(benchmark: str, config: dict, results: dict) -> dict:
+    return {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": config,
+        "results": results,
+        "memory": process_memory()
+    }
+
+
+def write_report(report: dict, path: str | None):
+    """Write to `path`, or to stdout when no path (or "-") is given."""
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path is None or path == "-":
+        sys.stdout.write(text + "\n")
+        return
+    pathlib.Path(path).write_text(text + "\n")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+基准测试用的替身引擎：与PseudoEngine2同样以源文件路径为唯一参数启动，但不解释伪代码，
+而是按源文件第一行的参数模拟引擎的行为，使评测链路可以在没有真实引擎的机器上被压测：
+
+    // bench startup=0.01 prompts=1 cpu=0.05 output=4096 exit=0
+
+- startup: 启动延迟（秒），模拟引擎加载
+- prompts: 依次读取的输入行数，每行读取前输出一个提示
+- cpu:     忙循环消耗的CPU时间（秒）
+- output:  输出的字节数，按64字节一行生成，内容固定，评测时可以构造出完全一致的期望输出
+- exit:    退出码，非0时向stderr输出一条错误
+"""
+import sys
+import time
+
+DEFAULTS = {"startup": 0.0, "prompts": 0, "cpu": 0.0, "output": 0, "exit": 0}
+LINE = "x" * 63 + "\n"
+
+
+def parse_header(source: str) -> dict:
+    params = dict(DEFAULTS)
+    first_line = source.split("\n", 1)[0].strip()
+    if first_line.startswith("//"):
+        for item in first_line[2:].split()[1:]:
+            key, _, value = item.partition("=")
+            if key in params:
+                params[key] = type(DEFAULTS[key])(float(value))
+    return params
+
+
+def make_source(**params) -> str:
+    """The source a benchmark submits; the fake engine reads its behaviour back from the first line."""
+    header = " ".join(f"{key}={params.get(key, default)}" for key, default in DEFAULTS.items())
+    return f"// bench {header}\nOUTPUT \"benchmark\"\n"
+
+
+def prompt(number: int) -> str:
+    return f"Input {number + 1}:\n"
+
+
+def render_output(size: int) -> str:
+    lines, rest = divmod(size, len(LINE))
+    return LINE * lines + ("x" * (rest - 1) + "\n" if rest else "")
+
+
+def expected_output(source: str) -> str:
+    """Exactly what the fake engine prints for the source, given enough input lines."""
+    params = parse_header(source)
+    return "".join(prompt(number) for number in range(params["prompts"])) + render_output(params["output"])
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        params = parse_header(f.read())
+    time.sleep(params["startup"])
+    for number in range(params["prompts"]):
+        sys.stdout.write(prompt(number))
+        sys.stdout.flush()
+        if not sys.stdin.readline():
+            break
+    deadline = time.process_time() + params["cpu"]
+    while time.process_time() < deadline:
+        pass
+    sys.stdout.write(render_output(params["output"]))
+    sys.stdout.flush()
+    if params["exit"]:
+        sys.stderr.write("Runtime error: benchmark\n")
+    sys.exit(params["exit"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+评测链路压测：用替身引擎（benchmarks/fake_engine.py）在指定并发下驱动评测的各层，输出JSON报告。
+
+    python -m benchmarks.judge_bench executor --runs 500 --concurrency 8 --cpu 0.05 --output 4096
+    python -m benchmarks.judge_bench judge --runs 100 --samples 10 --out judge.json
+    python -m benchmarks.judge_bench interactive --runs 200 --concurrency 32 --prompts 2
+    python -m benchmarks.judge_bench queue --runs 200 --concurrency 16
+
+- executor:    CodeExecutor.communicate，单次引擎运行
+- judge:       judge_cases，一次提交在全部样例上的评测（含blob读取与流式比较）
+- interactive: ExecutionManager经Redis收发输入输出，与/runner的交互式运行相同
+- queue:       judge_submission_task经Celery队列到worker再写回数据库，需要先在同一工作目录启动worker：
+               cd <workdir> && PYTHONPATH=<repo> python -m services.main
+
+引擎路径、数据库与blob存储都相对于当前目录，因此压测在 --workdir 中进行，其中的 Pseudo/PseudoEngine2 指向替身引擎
+（或 --engine 指定的真实引擎）。所有模式都是闭环压测：并发数即同时在途的运行数，每个完成后才发起下一个。
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import pathlib
+import time
+import typing
+import uuid
+
+from benchmarks.common import REPO_ROOT, latency_summary, make_report, write_report
+from benchmarks.fake_engine import expected_output, make_source
+
+FAKE_ENGINE = REPO_ROOT / "benchmarks" / "fake_engine.py"
+
+
+def prepare_workdir(workdir: pathlib.Path, engine: pathlib.Path):
+    (workdir / "Pseudo").mkdir(parents=True, exist_ok=True)
+    link = workdir / "Pseudo" / "PseudoEngine2"
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    link.symlink_to(engine.resolve())
+    os.chdir(workdir)
+
+
+def run_closed_loop(run: typing.Callable[[], typing.Any], runs: int, concurrency: int):
+    """Call `run` `runs` times with `concurrency` calls in flight; returns (latencies, results, wall seconds)."""
+    def timed():
+        started = time.perf_counter()
+        result = run()
+        return time.perf_counter() - started, result
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda _: timed(), range(runs)))
+    wall = time.perf_counter() - started
+    return [latency for latency, _ in outcomes], [result for _, result in outcomes], wall
+
+
+def throughput(runs: int, wall: float) -> dict:
+    return {"runs": runs, "wall_seconds": round(wall, 3), "per_second": round(runs / wall, 3) if wall else None}
+
+
+def engine_usage(usages: typing.Iterable[dict | None]) -> dict:
+    usages = [usage for usage in usages if usage is not None]
+    memory = sorted(usage["peak_memory"] for usage in usages)
+    cpu = sorted(usage["cpu_time"] for usage in usages)
+    return {
+        "peak_memory_kb": {"p50": memory[len(memory) // 2], "max": memory[-1]} if memory else None,
+        "cpu_time_ms": {"p50": cpu[len(cpu) // 2], "max": cpu[-1]} if cpu else None
+    }
+
+
+def bench_executor(args, source: str, input_data: str) -> dict:
+    from services.code_executor.code_manager import CodeExecutor
+    from services.code_executor.limits import ResourceLimits
+
+    limits = ResourceLimits(args.time_limit, args.memory_limit)
+    setup_times: typing.List[float] = []
+
+    class TimedExecutor(CodeExecutor):
+        def setup_runtime(self):
+            started = time.perf_counter()
+            super().setup_runtime()
+            setup_times.append(time.perf_counter() - started)  # list.append is atomic
+
+    def run(code: str):
+        return TimedExecutor(code, limits).communicate(input_data, timeout=args.time_limit * 3 + 1)
+
+    noop = make_source()
+    noop_latencies, _, _ = run_closed_loop(lambda: run(noop), args.calibration_runs, 1)
+    setup_times.clear()
+    latencies, results, wall = run_closed_loop(lambda: run(source), args.runs, args.concurrency)
+    return {
+        "throughput": throughput(args.runs, wall),
+        "latency": latency_summary(latencies),
+        "spawn_overhead": latency_summary(setup_times),  # staging + pool handoff / fork-exec
+        "noop_run": latency_summary(noop_latencies),  # a run doing nothing, end to end, without concurrency
+        "failed": sum(not result["good"] or result["timed_out"] for result in results),
+        "engine": engine_usage(result["usage"] for result in results)
+    }
+
+
+def _put_cases(source: str, input_data: str):
+    from services.blob_store import blob_store
+
+    input_blob = blob_store.put(input_data)
+    output_blob = blob_store.put(expected_output(source))
+    return input_blob, output_blob, blob_store.normalize(output_blob.digest)
+
+
+def bench_judge(args, source: str, input_data: str) -> dict:
+    from services.code_executor.judge import judge_cases, Verdict
+    from services.code_executor.limits import ResourceLimits
+
+    limits = ResourceLimits(args.time_limit, args.memory_limit)
+    input_blob, output_blob, normalized = _put_cases(source, input_data)
+    cases = [{"sample_id": number, "input_digest": input_blob.digest, "output_digest": normalized.digest}
+             for number in range(args.samples)]
+    latencies, results, wall = run_closed_loop(lambda: judge_cases(source, cases, limits), args.runs,
+                                               args.concurrency)
+    verdicts: typing.Dict[str, int] = {}
+    for sample_results in results:
+        for result in sample_results:
+            verdicts[result["status"].value] = verdicts.get(result["status"].value, 0) + 1
+    return {
+        "throughput": throughput(args.runs, wall),
+        "samples_per_second": round(args.runs * args.samples / wall, 3) if wall else None,
+        "latency": latency_summary(latencies),
+        "verdicts": verdicts,
+        "accepted": verdicts.get(Verdict.ACCEPTED.value, 0) == args.runs * args.samples,
+        "engine": engine_usage({"cpu_time": result["time_used"], "peak_memory": result["memory_used"]}
+                               for sample_results in results for result in sample_results
+                               if result["time_used"] is not None)
+    }
+
+
+async def _interactive_runs(args, source: str, input_lines: typing.List[str]):
+    import redis.asyncio
+    from services.code_executor.code_manager import ExecutionManager
+    from services.config import REDIS_SERVER_IP, REDIS_PORT
+
+    redis_instance = redis.asyncio.Redis(host=REDIS_SERVER_IP, port=REDIS_PORT)
+    first_output: typing.List[float] = []
+    latencies: typing.List[float] = []
+    reasons: typing.Dict[str, int] = {}
+    limiter = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with limiter:
+            connection_id = f"bench-{uuid.uuid4().hex}"
+            output_key, done_key = f"output_{connection_id}", f"done_{connection_id}"
+            started = time.perf_counter()
+            if input_lines:  # the run forwards each line once the engine asks for input
+                await redis_instance.rpush(f"input_{connection_id}", *input_lines)
+            task = asyncio.create_task(ExecutionManager(source, connection_id, redis_instance).run())
+            seen_output = False
+            try:
+                while True:
+                    item = await redis_instance.brpop([output_key, done_key], timeout=args.time_limit * 3 + 10)
+                    if item is None:
+                        reasons["no response"] = reasons.get("no response", 0) + 1
+                        return
+                    key, data = item
+                    if key.decode() == done_key:
+                        latencies.append(time.perf_counter() - started)
+                        break
+                    if not seen_output:
+                        first_output.append(time.perf_counter() - started)
+                        seen_output = True
+                await task
+                reason = "finished"
+            finally:
+                task.cancel()
+                await redis_instance.delete(output_key, done_key, f"input_{connection_id}",
+                                            f"control_{connection_id}")
+            reasons[reason] = reasons.get(reason, 0) + 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(args.runs)))
+    finally:
+        await redis_instance.aclose()
+    return latencies, first_output, reasons, time.perf_counter() - started
+
+
+def bench_interactive(args, source: str, input_data: str) -> dict:
+    input_lines = input_data.splitlines(keepends=True)  # written to the engine as they are
+    latencies, first_output, reasons, wall = asyncio.run(_interactive_runs(args, source, input_lines))
+    return {
+        "throughput": throughput(args.runs, wall),
+        "latency": latency_summary(latencies),
+        "first_output": latency_summary(first_output),
+        "outcomes": reasons
+    }
+
+
+def _seed_queue_problem(args, source: str, input_data: str) -> typing.List[int]:
+    """One problem with `samples` samples and `runs` submissions of `source`, in the workdir's database."""
+    import database
+    from models import user, test_sample, problem, runtime_info, source_code, submission  # noqa: F401, mappers
+    from models.problem import Problem
+    from models.source_code import SourceCode
+    from models.submission import Submission
+    from models.test_sample import TestSample
+    from services.blob_store import assign_sample_blobs
+
+    database.Base.metadata.create_all(bind=database.engine)
+    input_blob, output_blob, _ = _put_cases(source, input_data)
+    session = database.SessionLocal()
+    try:
+        bench_problem = Problem(title="benchmark", description="", input="", output="", sample_input="",
+                                sample_output="", labels="", source="benchmark", hint="",
+                                time_limit=str(args.time_limit), memory_limit=str(args.memory_limit))
+        session.add(bench_problem)
+        session.flush()
+        for number in range(args.samples):
+            sample = TestSample(num=number, problem_id=bench_problem.pid)
+            assign_sample_blobs(sample, input_blob, output_blob)
+            session.add(sample)
+        submissions = []
+        for number in range(args.runs):
+            # unique sources, otherwise every run after the first is a verdict cache hit
+            code = SourceCode(code=f"{source}// {number}\n", pid=bench_problem.pid, sid="benchmark")
+            session.add(code)
+            session.flush()
+            submissions.append(Submission(code_id=code.code_id, sid="benchmark", pid=bench_problem.pid))
+        session.add_all(submissions)
+        session.commit()
+        return [item.submit_id for item in submissions]
+    finally:
+        session.close()
+
+
+def bench_queue(args, source: str, input_data: str) -> dict:
+    from services.code_executor.tasks import judge_submission_task
+
+    submit_ids = iter(_seed_queue_problem(args, source, input_data))
+    latencies, results, wall = run_closed_loop(
+        lambda: judge_submission_task.delay(next(submit_ids)).get(timeout=args.queue_timeout),
+        args.runs, args.concurrency
+    )
+    return {
+        "throughput": throughput(args.runs, wall),
+        "latency": latency_summary(latencies),  # enqueue to result, through the broker and the worker
+        "valid": sum(result is True for result in results)
+    }
+
+
+MODES = {
+    "executor": bench_executor,
+    "judge": bench_judge,
+    "interactive": bench_interactive,
+    "queue": bench_queue
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-generate the judging pipeline with a fake engine")
+    parser.add_argument("mode", choices=MODES)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--samples", type=int, default=5, help="test samples per submission (judge, queue)")
+    parser.add_argument("--startup", type=float, default=0.0, help="fake engine startup delay, seconds")
+    parser.add_argument("--cpu", type=float, default=0.01, help="fake engine CPU burn per run, seconds")
+    parser.add_argument("--output", type=int, default=1024, help="fake engine output per run, bytes")
+    parser.add_argument("--prompts", type=int, default=0, help="input lines the fake engine asks for")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="seconds")
+    parser.add_argument("--memory-limit", type=int, default=64, help="MB")
+    parser.add_argument("--calibration-runs", type=int, default=20, help="sequential no-op runs (executor)")
+    parser.add_argument("--queue-timeout", type=float, default=300.0, help="seconds to wait for one task (queue)")
+    parser.add_argument("--engine", type=pathlib.Path, default=FAKE_ENGINE, help="engine executable to benchmark")
+    parser.add_argument("--workdir", type=pathlib.Path, default=pathlib.Path("/tmp/pseudo-oj-bench"))
+    parser.add_argument("--out", default=None, help="JSON report path, stdout when omitted")
+    args = parser.parse_args()
+
+    prepare_workdir(args.workdir, args.engine)
+    source = make_source(startup=args.startup, prompts=args.prompts, cpu=args.cpu, output=args.output)
+    input_data = "".join(f"{number}\n" for number in range(args.prompts))
+    results = MODES[args.mode](args, source, input_data)
+    config = {key: str(value) if isinstance(value, pathlib.Path) else value for key, value in vars(args).items()}
+    write_report(make_report(f"judge.{args.mode}", config, results), args.out)
+
+
+if __name__ == "__main__":
+    main()
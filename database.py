@@ -1,15 +1,88 @@
 # database.py
-from sqlalchemy import create_engine
+"""
+SQLite存储层：
+
+- 所有连接以WAL模式运行并设置mmap、synchronous、busy_timeout等pragma，读写互不阻塞
+- 只读查询使用独立的只读连接池（`ReadSessionLocal` / `make_read_session`）
+- 写入通过 `writer` 交给单一写线程：排队的写操作合并成一个事务提交（group commit），每个操作有自己的savepoint，
+  一个失败不影响同批的其他操作；一次提交只fsync一次，进程内也不会再出现写者之间的 "database is locked"
+"""
+import asyncio
+import concurrent.futures
+import functools
+import os
+import queue
+import threading
+import typing
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
 
+from services.config import DB_EXECUTOR_WORKERS, DB_READ_POOL_SIZE, DB_WRITE_BATCH_SIZE, SQLITE_BUSY_TIMEOUT, \
+    SQLITE_MMAP_SIZE, SQLITE_SYNCHRONOUS
+
 SQLALCHEMY_DATABASE_URL = "sqlite:///./db.sqlite3"  # 或者您的数据库 URL
+SQLALCHEMY_READ_ONLY_URL = "sqlite:///file:./db.sqlite3?mode=ro&uri=true"
+
+T = typing.TypeVar("T")
+
+
+def _set_pragmas(dbapi_connection, read_only: bool, busy_timeout: int = SQLITE_BUSY_TIMEOUT):
+    cursor = dbapi_connection.cursor()
+    if not read_only:  # persistent in the file; a read-only connection cannot switch it
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+# A session keeps its connection between the calls of one request, across awaits; a capped pool could leave every
+# DB thread waiting on a checkout while the connections sit with requests waiting for a DB thread. The executor
+# bounds the concurrency instead, connections beyond pool_size are closed when returned.
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_size=DB_EXECUTOR_WORKERS, max_overflow=-1)
+read_engine = create_engine(SQLALCHEMY_READ_ONLY_URL, pool_size=DB_READ_POOL_SIZE, max_overflow=-1)
+event.listen(engine, "connect", lambda dbapi_connection, _: _set_pragmas(dbapi_connection, read_only=False))
+event.listen(read_engine, "connect", lambda dbapi_connection, _: _set_pragmas(dbapi_connection, read_only=True))
+
+
+def create_write_engine(busy_timeout: int = SQLITE_BUSY_TIMEOUT, **kwargs):
+    """
+    An engine whose transactions start with BEGIN IMMEDIATE, taking the write lock up front. pysqlite's implicit
+    transactions are turned off, so SAVEPOINTs and DDL run inside the transaction as written.
+    """
+    write_engine = create_engine(SQLALCHEMY_DATABASE_URL, **kwargs)
+
+    @event.listens_for(write_engine, "connect")
+    def on_connect(dbapi_connection, _):
+        _set_pragmas(dbapi_connection, read_only=False, busy_timeout=busy_timeout)
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(write_engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return write_engine
+
+
+# the writer thread's own connection
+write_engine = create_write_engine(pool_size=1, max_overflow=0)
+
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# objects returned by a write stay readable after the group commit
+WriteSessionLocal = sessionmaker(autoflush=False, bind=write_engine, expire_on_commit=False)
+
+# 路由都是async def，同步的数据库调用交给这组有界线程执行，不再阻塞事件循环上的其他请求
+_db_executor = concurrent.futures.ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
 
 class Base(DeclarativeBase):
     pass
 
+
 def make_session():
     db = SessionLocal()
     try:
@@ -17,3 +90,107 @@ def make_session():
     finally:
         db.close()
 
+
+def make_read_session():
+    """For routes that only read; the connection is opened read-only, a write through it fails."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def run_db(function: typing.Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run blocking database work (queries, commits, lazy loads) on the DB executor and await its result.
+    A session is only ever used by one call at a time, so handing it between threads is safe.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(function, *args, **kwargs))
+
+
+class _WriteRequest(typing.NamedTuple):
+    work: typing.Callable[[Session], typing.Any]
+    future: concurrent.futures.Future
+
+
+class GroupCommitWriter:
+    """
+    One thread per process applies every queued write. Whatever has queued up while the previous commit ran
+    goes into the next transaction, so batches grow with the load and a lone write is committed at once.
+    """
+
+    def __init__(self, session_factory: sessionmaker = WriteSessionLocal, batch_size: int = DB_WRITE_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue[_WriteRequest] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_running(self):
+        with self._start_lock:
+            # the thread does not survive a fork (prefork celery workers)
+            if self._thread is None or self._thread_pid != os.getpid():
+                if self._thread_pid is not None and self._thread_pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, work: typing.Callable[[Session], T]) -> "concurrent.futures.Future[T]":
+        """
+        Queue `work(session)`; the future resolves once the transaction holding it is committed.
+        `work` must not commit or roll back itself, its changes are undone alone if it raises.
+        """
+        self._ensure_running()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put(_WriteRequest(work, future))
+        return future
+
+    def write(self, work: typing.Callable[[Session], T]) -> T:
+        """Blocking form of `submit`, for worker code."""
+        return self.submit(work).result()
+
+    async def run(self, work: typing.Callable[[Session], T]) -> T:
+        """Awaitable form of `submit`, for routes."""
+        return await asyncio.wrap_future(self.submit(work))
+
+    def _next_batch(self) -> typing.List[_WriteRequest]:
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return [request for request in batch if request.future.set_running_or_notify_cancel()]
+
+    def _commit(self, batch: typing.List[_WriteRequest]):
+        outcomes: typing.List[typing.Tuple[_WriteRequest, typing.Any, BaseException | None]] = []
+        try:
+            with self.session_factory() as session, session.begin():
+                for request in batch:
+                    try:
+                        with session.begin_nested():
+                            result = request.work(session)
+                        outcomes.append((request, result, None))
+                    except Exception as e:
+                        outcomes.append((request, None, e))
+        except Exception as e:  # BEGIN or COMMIT failed, nothing of the batch was stored
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, result, error in outcomes:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._commit(batch)
+
+
+writer = GroupCommitWriter()
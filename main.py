@@ -1,26 +1,35 @@
 from utils.logger import logger
 
 from fastapi import FastAPI
-from database import Base, engine
 from models import user, test_sample, problem, runtime_info, source_code, submission
 from routes.problems.index import router as problems_router
 from routes.test_samples.index import router as test_samples_router
 from routes.submissions.index import router as submissions_router
 from routes.auth.index import router as auth_router
+from routes.runner.index import router as runner_router
+from migrations.runner import upgrade_database
+from services import problem_stats
+from services.blob_store import backfill_inline_samples, blob_collector
 import utils.dependencies as dependencies  # strange
+import database
 
 import uvicorn
 
 dependencies.start_redis_server()
 dependencies.redis_pool = dependencies.create_redis()
 
-Base.metadata.create_all(bind=engine)
+upgrade_database()  # adds the blob columns (migration 0001) before the inline data is moved into them
+with database.SessionLocal() as session:
+    backfill_inline_samples(session)
+blob_collector.start()  # superseded test data is removed in the background
+problem_stats.flusher.ensure_running()  # increments keep reaching the database while no judging runs here
 
 app = FastAPI()
 app.include_router(auth_router)
 app.include_router(problems_router)
 app.include_router(test_samples_router)
 app.include_router(submissions_router)
+app.include_router(runner_router)
 
 # directly run within main file
 if __name__ == "__main__":
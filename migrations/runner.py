@@ -0,0 +1,116 @@
+"""
+数据库结构迁移：migrations/versions 下的每个脚本定义递增的 `revision` 和 `upgrade(connection)`，
+已执行到的版本记录在 schema_version 表中。启动时按顺序执行尚未执行的脚本，全部在一个事务中，任何一个失败则全部回滚。
+
+- 全新的数据库（还没有任何业务表）直接按模型 create_all，并标记为最新版本
+- 修改模型的表结构（列、索引、约束）时，同时新增一个迁移脚本，让已有的数据库得到同样的结构
+
+    python -m migrations.runner            # 升级到最新版本
+    python -m migrations.runner --current  # 显示当前版本和待执行的脚本
+"""
+import argparse
+import datetime
+import importlib
+import pkgutil
+import typing
+
+from sqlalchemy import Connection, Engine, inspect
+from sqlalchemy.pool import NullPool
+
+import database
+from services.config import MIGRATION_LOCK_TIMEOUT
+from utils.logger import logger
+
+VERSIONS_PACKAGE = "migrations.versions"
+
+
+class Migration(typing.NamedTuple):
+    revision: int
+    name: str
+    upgrade: typing.Callable[[Connection], None]
+
+
+def load_migrations() -> typing.List[Migration]:
+    package = importlib.import_module(VERSIONS_PACKAGE)
+    migrations = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        module = importlib.import_module(f"{VERSIONS_PACKAGE}.{module_info.name}")
+        migrations.append(Migration(module.revision, module_info.name, module.upgrade))
+    migrations.sort()
+    revisions = [migration.revision for migration in migrations]
+    if revisions != list(range(1, len(migrations) + 1)):
+        raise RuntimeError(f"Migration revisions must be 1..n without gaps, found {revisions}")
+    return migrations
+
+
+def _ensure_version_table(connection: Connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "revision INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"
+    )
+
+
+def current_revision(connection: Connection) -> int:
+    return connection.exec_driver_sql("SELECT COALESCE(MAX(revision), 0) FROM schema_version").scalar()
+
+
+def _record(connection: Connection, migration: Migration):
+    connection.exec_driver_sql("INSERT INTO schema_version (revision, name, applied_at) VALUES (?, ?, ?)",
+                               (migration.revision, migration.name, datetime.datetime.utcnow()))
+
+
+def _is_empty(connection: Connection) -> bool:
+    return not set(inspect(connection).get_table_names()) & set(database.Base.metadata.tables)
+
+
+def _migration_engine() -> Engine:
+    # every API process migrates on startup, the first takes the write lock and the others wait for it to finish
+    return database.create_write_engine(busy_timeout=MIGRATION_LOCK_TIMEOUT, poolclass=NullPool)
+
+
+def upgrade_database() -> int:
+    """Bring the database to the latest revision and return it."""
+    from models import user, test_sample, problem, runtime_info, source_code, submission  # noqa: F401, mappers
+
+    migrations = load_migrations()
+    engine = _migration_engine()
+    try:
+        with engine.begin() as connection:  # BEGIN IMMEDIATE, held while the migrations run
+            _ensure_version_table(connection)
+            revision = current_revision(connection)
+            if revision == 0 and _is_empty(connection):
+                database.Base.metadata.create_all(connection)
+                for migration in migrations:
+                    _record(connection, migration)
+                logger.info(f"Created the database schema at revision {len(migrations)}")
+                return len(migrations)
+            for migration in migrations[revision:]:
+                migration.upgrade(connection)
+                _record(connection, migration)
+                logger.info(f"Applied migration {migration.name}")
+            return max(revision, len(migrations))
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the pending database migrations")
+    parser.add_argument("--current", action="store_true", help="only show the current revision")
+    args = parser.parse_args()
+    if not args.current:
+        print(f"Database at revision {upgrade_database()}")
+        return
+    engine = _migration_engine()
+    try:
+        with engine.begin() as connection:
+            _ensure_version_table(connection)
+            revision = current_revision(connection)
+    finally:
+        engine.dispose()
+    print(f"Database at revision {revision}")
+    for migration in load_migrations()[revision:]:
+        print(f"pending: {migration.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+把启动时 create_all 建出的旧数据库补齐到引入迁移之前模型的结构：
+
+- runtime_info：每个样例的耗时和内存（time_used、memory_used）
+- submission：评测完成时间（judged_at）
+- test_sample：blob存储的摘要和大小、updated_at；内联的 input/output 改为可空，
+  SQLite不能修改列约束，因此按官方推荐的方式重建整张表
+"""
+from sqlalchemy import Connection
+
+revision = 1
+
+TEST_SAMPLE_TABLE = """
+CREATE TABLE test_sample_new (
+    sid INTEGER NOT NULL,
+    num INTEGER NOT NULL,
+    input VARCHAR,
+    output VARCHAR,
+    input_digest VARCHAR(64),
+    input_size INTEGER,
+    output_digest VARCHAR(64),
+    output_size INTEGER,
+    normalized_output_digest VARCHAR(64),
+    problem_id INTEGER NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (sid),
+    FOREIGN KEY(problem_id) REFERENCES problem (pid)
+)
+"""
+
+
+def _columns(connection: Connection, table: str) -> list:
+    return [row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")]
+
+
+def _add_columns(connection: Connection, table: str, columns: dict):
+    existing = _columns(connection, table)
+    for name, column_type in columns.items():
+        if name not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def upgrade(connection: Connection):
+    _add_columns(connection, "runtime_info", {"time_used": "INTEGER", "memory_used": "INTEGER"})
+    _add_columns(connection, "submission", {"judged_at": "DATETIME"})
+
+    existing = _columns(connection, "test_sample")
+    connection.exec_driver_sql(TEST_SAMPLE_TABLE)
+    copied = ", ".join(name for name in _columns(connection, "test_sample_new") if name in existing)
+    connection.exec_driver_sql(f"INSERT INTO test_sample_new ({copied}) SELECT {copied} FROM test_sample")
+    connection.exec_driver_sql("DROP TABLE test_sample")
+    connection.exec_driver_sql("ALTER TABLE test_sample_new RENAME TO test_sample")
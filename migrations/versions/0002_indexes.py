@@ -0,0 +1,41 @@
+"""
+热点查询的索引，原先只有主键，按题目取样例、按提交取运行结果都是全表扫描：
+
+- test_sample (problem_id, num)：唯一，评测和 /test_samples 按题目取样例、按编号取单个样例
+- submission (pid, judged_at)：重测一道题时找出已评测的提交；submission (sid)：按用户查提交
+- source_code (pid)
+- runtime_info (submission_id, sample_id, status)：覆盖索引，重测和查询结果时不必回表
+
+旧的样例编号可能重复（按样例数量编号，和添加题目时从1开始的编号会撞），建唯一索引前把这些题目的样例按原顺序重新编号为1..n。
+"""
+from sqlalchemy import Connection
+
+revision = 2
+
+RENUMBER_DUPLICATE_SAMPLES = [
+    # computed up front, an UPDATE whose subquery reads the rows it is changing would see half renumbered data
+    """
+    CREATE TEMP TABLE sample_renumber AS
+    SELECT sid, ROW_NUMBER() OVER (PARTITION BY problem_id ORDER BY num, sid) AS num FROM test_sample
+    WHERE problem_id IN (SELECT problem_id FROM test_sample GROUP BY problem_id, num HAVING COUNT(*) > 1)
+    """,
+    """
+    UPDATE test_sample SET num = (SELECT num FROM sample_renumber WHERE sample_renumber.sid = test_sample.sid)
+    WHERE sid IN (SELECT sid FROM sample_renumber)
+    """,
+    "DROP TABLE sample_renumber",
+]
+
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_test_sample_problem_id_num ON test_sample (problem_id, num)",
+    "CREATE INDEX IF NOT EXISTS ix_submission_pid_judged_at ON submission (pid, judged_at)",
+    "CREATE INDEX IF NOT EXISTS ix_submission_sid ON submission (sid)",
+    "CREATE INDEX IF NOT EXISTS ix_source_code_pid ON source_code (pid)",
+    "CREATE INDEX IF NOT EXISTS ix_runtime_info_submission_id ON runtime_info (submission_id, sample_id, status)",
+]
+
+
+def upgrade(connection: Connection):
+    for statement in RENUMBER_DUPLICATE_SAMPLES + INDEXES:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql("ANALYZE")  # statistics for the query planner to pick the new indexes
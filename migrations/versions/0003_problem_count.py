@@ -0,0 +1,55 @@
+"""
+题目列表的游标分页和总数：
+
+- problem (difficulty, pid)：按难度筛选时的分页顺序
+- problem_count：每个 (difficulty, defunct) 的题目数，由 problem 表上的触发器在插入、删除、修改时维护，
+  列表接口不再每次 COUNT(*) 全表
+
+触发器的DDL写在本文件中而不是从models导入：迁移描述的是revision 3时的结构，之后模型怎么改都不能改变它。
+"""
+from sqlalchemy import Connection
+
+revision = 3
+
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_count_insert AFTER INSERT ON problem BEGIN
+        INSERT INTO problem_count (difficulty, defunct, count)
+        VALUES (COALESCE(NEW.difficulty, 'easy'), COALESCE(NEW.defunct, 0), 1)
+        ON CONFLICT (difficulty, defunct) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_count_delete AFTER DELETE ON problem BEGIN
+        UPDATE problem_count SET count = count - 1
+        WHERE difficulty = COALESCE(OLD.difficulty, 'easy') AND defunct = COALESCE(OLD.defunct, 0);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_count_update AFTER UPDATE OF difficulty, defunct ON problem
+    WHEN OLD.difficulty IS NOT NEW.difficulty OR OLD.defunct IS NOT NEW.defunct BEGIN
+        UPDATE problem_count SET count = count - 1
+        WHERE difficulty = COALESCE(OLD.difficulty, 'easy') AND defunct = COALESCE(OLD.defunct, 0);
+        INSERT INTO problem_count (difficulty, defunct, count)
+        VALUES (COALESCE(NEW.difficulty, 'easy'), COALESCE(NEW.defunct, 0), 1)
+        ON CONFLICT (difficulty, defunct) DO UPDATE SET count = count + 1;
+    END
+    """,
+]
+
+
+def upgrade(connection: Connection):
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_problem_difficulty_pid ON problem (difficulty, pid)")
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS problem_count ("
+        "difficulty VARCHAR NOT NULL, defunct BOOLEAN NOT NULL, count INTEGER NOT NULL, "
+        "PRIMARY KEY (difficulty, defunct))"
+    )
+    connection.exec_driver_sql("DELETE FROM problem_count")
+    connection.exec_driver_sql(
+        "INSERT INTO problem_count (difficulty, defunct, count) "
+        "SELECT COALESCE(difficulty, 'easy') AS difficulty, COALESCE(defunct, 0) AS defunct, COUNT(*) "
+        "FROM problem GROUP BY 1, 2"
+    )
+    for trigger in TRIGGERS:
+        connection.exec_driver_sql(trigger)
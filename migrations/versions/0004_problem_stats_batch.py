@@ -0,0 +1,14 @@
+"""
+题目统计写回的批次记录：problem_stats_batch 中记下已经加到 problem 行上的增量批次，
+写回在提交之后、删除redis中的批次之前中断时，重试不会把同一批增量再加一次。
+"""
+from sqlalchemy import Connection
+
+revision = 4
+
+
+def upgrade(connection: Connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS problem_stats_batch ("
+        "batch_id VARCHAR NOT NULL PRIMARY KEY, applied_at DATETIME NOT NULL)"
+    )
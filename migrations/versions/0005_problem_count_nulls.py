@@ -0,0 +1,40 @@
+"""
+problem_count 触发器对 NULL 的 difficulty / defunct 按列默认值（'easy'、0）计数：
+revision 3 的触发器把 NULL 直接插入 problem_count 的主键，违反 NOT NULL，连同触发它的题目写入一起失败。
+已经到达 revision 3 的数据库在这里删除旧触发器重建；计数不需要重算，旧触发器失败时题目行也没有写入。
+"""
+from sqlalchemy import Connection
+
+revision = 5
+
+TRIGGERS = {
+    "problem_count_insert": """
+    CREATE TRIGGER problem_count_insert AFTER INSERT ON problem BEGIN
+        INSERT INTO problem_count (difficulty, defunct, count)
+        VALUES (COALESCE(NEW.difficulty, 'easy'), COALESCE(NEW.defunct, 0), 1)
+        ON CONFLICT (difficulty, defunct) DO UPDATE SET count = count + 1;
+    END
+    """,
+    "problem_count_delete": """
+    CREATE TRIGGER problem_count_delete AFTER DELETE ON problem BEGIN
+        UPDATE problem_count SET count = count - 1
+        WHERE difficulty = COALESCE(OLD.difficulty, 'easy') AND defunct = COALESCE(OLD.defunct, 0);
+    END
+    """,
+    "problem_count_update": """
+    CREATE TRIGGER problem_count_update AFTER UPDATE OF difficulty, defunct ON problem
+    WHEN OLD.difficulty IS NOT NEW.difficulty OR OLD.defunct IS NOT NEW.defunct BEGIN
+        UPDATE problem_count SET count = count - 1
+        WHERE difficulty = COALESCE(OLD.difficulty, 'easy') AND defunct = COALESCE(OLD.defunct, 0);
+        INSERT INTO problem_count (difficulty, defunct, count)
+        VALUES (COALESCE(NEW.difficulty, 'easy'), COALESCE(NEW.defunct, 0), 1)
+        ON CONFLICT (difficulty, defunct) DO UPDATE SET count = count + 1;
+    END
+    """,
+}
+
+
+def upgrade(connection: Connection):
+    for name, trigger in TRIGGERS.items():
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        connection.exec_driver_sql(trigger)
@@ -1,10 +1,15 @@
+import datetime
+
 from database import Base
-from sqlalchemy import Integer, String, Boolean, ForeignKey
+from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 
 class Problem(Base):
     __tablename__ = "problem"
+    __table_args__ = (
+        Index("ix_problem_difficulty_pid", "difficulty", "pid"),  # keyset pages filtered by difficulty
+    )
     pid: Mapped[int] = mapped_column(Integer, unique=True, primary_key=True, nullable=False)
     title: Mapped[str] = mapped_column(String)
     description: Mapped[str] = mapped_column(String)
@@ -23,3 +28,51 @@ class Problem(Base):
     solved: Mapped[int] = mapped_column(Integer, default=0)
     defunct: Mapped[bool] = mapped_column(Boolean, default=False)
     samples: Mapped[List["TestSample"]] = relationship(back_populates='problem')
+
+
+class ProblemCount(Base):
+    """Number of problems per (difficulty, defunct), kept current by triggers on the problem table."""
+    __tablename__ = "problem_count"
+    difficulty: Mapped[str] = mapped_column(String, primary_key=True)
+    defunct: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ProblemStatsBatch(Base):
+    """A batch of statistics increments already added to the problem rows; a retried write-back skips it."""
+    __tablename__ = "problem_stats_batch"
+    batch_id: Mapped[str] = mapped_column(String, primary_key=True)
+    applied_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+
+
+PROBLEM_COUNT_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_count_insert AFTER INSERT ON problem BEGIN
+        INSERT INTO problem_count (difficulty, defunct, count)
+        VALUES (COALESCE(NEW.difficulty, 'easy'), COALESCE(NEW.defunct, 0), 1)
+        ON CONFLICT (difficulty, defunct) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_count_delete AFTER DELETE ON problem BEGIN
+        UPDATE problem_count SET count = count - 1
+        WHERE difficulty = COALESCE(OLD.difficulty, 'easy') AND defunct = COALESCE(OLD.defunct, 0);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS problem_count_update AFTER UPDATE OF difficulty, defunct ON problem
+    WHEN OLD.difficulty IS NOT NEW.difficulty OR OLD.defunct IS NOT NEW.defunct BEGIN
+        UPDATE problem_count SET count = count - 1
+        WHERE difficulty = COALESCE(OLD.difficulty, 'easy') AND defunct = COALESCE(OLD.defunct, 0);
+        INSERT INTO problem_count (difficulty, defunct, count)
+        VALUES (COALESCE(NEW.difficulty, 'easy'), COALESCE(NEW.defunct, 0), 1)
+        ON CONFLICT (difficulty, defunct) DO UPDATE SET count = count + 1;
+    END
+    """,
+]
+
+# create_all does not know about triggers; migrations/versions/0003 and 0005 add them to existing databases
+# from their own copies of this DDL, a change here needs a new migration as well.
+# A NULL difficulty or defunct counts as the column default, the key of problem_count cannot be NULL
+for trigger in PROBLEM_COUNT_TRIGGERS:
+    event.listen(Problem.__table__, "after_create", DDL(trigger))
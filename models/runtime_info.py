@@ -1,16 +1,21 @@
 from database import Base
-from sqlalchemy import Integer, String, Boolean, ForeignKey
+from sqlalchemy import Integer, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 
 
 class RuntimeInfo(Base):
     __tablename__ = "runtime_info"
+    __table_args__ = (
+        Index("ix_runtime_info_submission_id", "submission_id", "sample_id", "status"),
+    )
     run_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     sample_id: Mapped[int] = mapped_column(ForeignKey("test_sample.sid"))
     problem_id: Mapped[int] = mapped_column(ForeignKey("problem.pid"))
     status: Mapped[str] = mapped_column(String, nullable=False)
     msg: Mapped[str] = mapped_column(String, nullable=True)
+    time_used: Mapped[int] = mapped_column(Integer, nullable=True)  # ms of CPU time
+    memory_used: Mapped[int] = mapped_column(Integer, nullable=True)  # KB of peak RSS
     problem: Mapped["Problem"] = relationship()
     sample: Mapped["TestSample"] = relationship()
     submission_id: Mapped[int] = mapped_column(ForeignKey("submission.submit_id"))
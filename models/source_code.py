@@ -8,6 +8,6 @@ class SourceCode(Base):
     code_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     language: Mapped[str] = mapped_column(String, default="pseudocode")
     code: Mapped[str] = mapped_column(String, nullable=False)
-    pid: Mapped[int] = mapped_column(ForeignKey("problem.pid"))
+    pid: Mapped[int] = mapped_column(ForeignKey("problem.pid"), index=True)
     problem: Mapped["Problem"] = relationship()
     sid: Mapped[str] = mapped_column(String,nullable=False)
\ No newline at end of file
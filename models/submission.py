@@ -1,15 +1,21 @@
+import datetime
+
 from database import Base
-from sqlalchemy import Integer, String, Boolean, ForeignKey
+from sqlalchemy import Integer, String, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 
 class Submission(Base):
     __tablename__ = "submission"
+    __table_args__ = (
+        Index("ix_submission_pid_judged_at", "pid", "judged_at"),
+    )
     submit_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     code_id: Mapped[str] = mapped_column(ForeignKey("source_code.code_id"))
     source_code: Mapped["SourceCode"] = relationship()
     runtime_infos: Mapped[List["RuntimeInfo"]] = relationship(back_populates='submission')
-    sid: Mapped[str] = mapped_column(String,nullable=False)
+    sid: Mapped[str] = mapped_column(String,nullable=False, index=True)
     pid: Mapped[int] = mapped_column(ForeignKey("problem.pid"))
     valid: Mapped[bool] = mapped_column(Boolean,nullable=True)
+    judged_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=True)
 
@@ -1,5 +1,7 @@
 from database import Base
-from sqlalchemy import Integer, String, Boolean, ForeignKey
+import datetime
+
+from sqlalchemy import Integer, String, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 
@@ -7,9 +9,20 @@ from typing import List
 # TODO: solve the malfunction of autoincrement
 class TestSample(Base):
     __tablename__ = "test_sample"
+    __table_args__ = (
+        Index("ix_test_sample_problem_id_num", "problem_id", "num", unique=True),
+    )
     sid: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     num: Mapped[int] = mapped_column(Integer, autoincrement=True)
-    input: Mapped[str] = mapped_column(String)
-    output: Mapped[str] = mapped_column(String)
+    # legacy inline test data, moved into the blob store on startup; deferred so queries never load it
+    input: Mapped[str] = mapped_column(String, nullable=True, deferred=True)
+    output: Mapped[str] = mapped_column(String, nullable=True, deferred=True)
+    input_digest: Mapped[str] = mapped_column(String(64), nullable=True)
+    input_size: Mapped[int] = mapped_column(Integer, nullable=True)
+    output_digest: Mapped[str] = mapped_column(String(64), nullable=True)
+    output_size: Mapped[int] = mapped_column(Integer, nullable=True)
+    normalized_output_digest: Mapped[str] = mapped_column(String(64), nullable=True)
     problem_id: Mapped[int] = mapped_column(ForeignKey("problem.pid"))
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow,
+                                                          onupdate=datetime.datetime.utcnow, nullable=True)
     problem: Mapped["Problem"] = relationship(back_populates="samples")
@@ -133,12 +133,10 @@ async def send_verify_email(user: auth.UserSchema):
 @router.post("/register/resend_verification")
 async def resend_verification(
         email: Annotated[str, Query()],
-        session: Annotated[database.Session, Depends(database.make_session)],
         background: BackgroundTasks
 ):
-    try:
-        print(email)
-        user = session.query(User).filter(User.email == email).one_or_none()
+    def touch_user(write_session: database.Session) -> auth.UserSchema:
+        user = write_session.query(User).filter(User.email == email).one_or_none()
         if user is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         if user.verified:
@@ -149,20 +147,22 @@ async def resend_verification(
                                 detail="Please wait before resending the email")
 
         user.updated_at = now
-        session.add(user)
-        session.commit()
+        write_session.add(user)
         logger.info(f"Successfully updated user({user.uid}) and saved to database.")
+        return auth.UserSchema.model_validate(user)
+
+    try:
+        print(email)
+        user = await database.writer.run(touch_user)
     except sqlalchemy.exc.SQLAlchemyError as e:
-        session.rollback()
         logger.error(f"Failed to resend verification email during database operation: {e.args}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Internal server error during database operation")
     except Exception as e:
-        session.rollback()
         logger.error(f"Failed to resend verification email due to unexpected reason: {e.args}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Internal server error during database operation")
-    background.add_task(send_verify_email, auth.UserSchema.model_validate(user))
+    background.add_task(send_verify_email, user)
     return {"message": "Verification email resent!"}
 
 
@@ -170,10 +170,9 @@ async def resend_verification(
 async def verify_user(
         auth_code: Annotated[str, Path],
         uid: Annotated[int, Query(...)],
-        session: Annotated[database.Session, Depends(database.make_session)],
 ):
-    try:
-        found_user: User = session.query(User).get(uid)
+    def verify(write_session: database.Session) -> int:
+        found_user: User = write_session.query(User).get(uid)
         now = datetime.now()
         if found_user.verified:
             raise ValueError("User already verified!")
@@ -184,17 +183,18 @@ async def verify_user(
             raise ValueError("Invalid authentication code.")
 
         found_user.verified = True
-        session.add(found_user)
-        session.commit()
+        write_session.add(found_user)
+        return found_user.uid
+
+    try:
+        verified_uid = await database.writer.run(verify)
     except ValueError as e:
-        session.rollback()
         logger.error(f"Invalid credentials during verification with user({uid}): {e.args}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except sqlalchemy.exc.IntegrityError as e:
-        session.rollback()
         logger.error(f"Failed to verify user({uid}) during database operation: {e.args}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Registration failed!")
-    access_token = auth.create_access_token(data={"sub": str(found_user.uid)})
+    access_token = auth.create_access_token(data={"sub": str(verified_uid)})
     logger.info(f"User({uid}) successfully logged in with access bearer token of {access_token}")
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -202,29 +202,35 @@ async def verify_user(
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 async def register(
         registration_data: RegistrationSchema,
-        session: Annotated[database.Session, Depends(database.make_session)],
+        session: Annotated[database.Session, Depends(database.make_read_session)],
         background: BackgroundTasks
 ):
-    is_exist = session.query(User).where(User.email == registration_data.email).one_or_none()
+    is_exist = await database.run_db(
+        lambda: session.query(User).where(User.email == registration_data.email).one_or_none()
+    )
     if is_exist is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    try:
+
+    def insert_user(write_session: database.Session) -> auth.UserSchema:
         new_user = User(
             username=registration_data.username,
             email=registration_data.email,
             disabled=False,
             verified=False,
-            password=auth.make_hashed_password(registration_data.password)
+            password=hashed_password
         )
-        session.add(new_user)
-        session.flush()
-        session.refresh(new_user)
-        new_user_schema = auth.UserSchema.model_validate(new_user)
+        write_session.add(new_user)
+        write_session.flush()
+        write_session.refresh(new_user)
+        return auth.UserSchema.model_validate(new_user)
+
+    try:
+        # bcrypt is slow on purpose, it is not worth holding the writer thread for
+        hashed_password = await database.run_db(auth.make_hashed_password, registration_data.password)
+        new_user_schema = await database.writer.run(insert_user)
         background.add_task(send_verify_email, new_user_schema)
-        session.commit()
         logger.info(f"Successfully created an unverified user account: {new_user_schema.model_dump()}")
     except Exception as e:
-        session.rollback()
         logger.error(
             f"Failed to register user with registration_data of {registration_data.model_dump()} due to {e.args}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Registration failed: {e.args}")
@@ -234,7 +240,7 @@ async def register(
 @router.post("/token", response_model=TokenSchema)
 async def login_for_access_token(
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-        session: Annotated[database.Session, Depends(database.make_session)],
+        session: Annotated[database.Session, Depends(database.make_read_session)],
         login_type: Literal["uid", "email"] = "email"
 ):
     username = form_data.username
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Query, Path, Depends
-from models.problem import Problem
+from models.problem import Problem, ProblemCount
 from models.test_sample import TestSample
 from typing import Annotated, List
 from .schemas import ProblemSchema, AddProblemRequest, \
     GetProblemResponse, TestSampleSchema, AddProblemResponse, ProblemListRequest
+from services import problem_stats
+from services.blob_store import blob_store, assign_sample_blobs
+from sqlalchemy import String, func, select
 from utils.index import digitalize_problem_id, cheerful_messages
 
+import asyncio
 import database
 import math
 import random
@@ -16,17 +20,43 @@ router = APIRouter(
 PAGE_SIZE_LIMIT = 200
 
 
+def _problem_filters(page_config: ProblemListRequest) -> list:
+    filters = []
+    if page_config.difficulty is not None:
+        filters.append(Problem.difficulty == page_config.difficulty)
+    if page_config.defunct is not None:
+        filters.append(Problem.defunct == page_config.defunct)
+    for label in page_config.labels:
+        labels = "," + func.replace(Problem.labels, " ", "", type_=String) + ","
+        filters.append(labels.contains(f",{label.strip()},", autoescape=True))
+    return filters
+
+
+def _count_problems(session: database.Session, page_config: ProblemListRequest) -> int | None:
+    """From the counts the triggers maintain; None with a labels filter, those are not counted."""
+    if page_config.labels:
+        return None
+    query = select(func.coalesce(func.sum(ProblemCount.count), 0))
+    if page_config.difficulty is not None:
+        query = query.where(ProblemCount.difficulty == page_config.difficulty)
+    if page_config.defunct is not None:
+        query = query.where(ProblemCount.defunct == page_config.defunct)
+    return session.scalar(query)
+
+
 @router.get("/problem/{pid}/has_test_data")
 async def has_test_samples(
         pid: Annotated[str, Path()],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     pid = digitalize_problem_id(pid)
     result = False
     if pid is None:
         return {"error": "Invalid pid!"}
     try:
-        samples = session.query(TestSample).where(TestSample.problem_id == pid).all()
+        samples = await database.run_db(
+            lambda: session.query(TestSample).where(TestSample.problem_id == pid).all()
+        )
         if len(samples) > 0:
             result = True
     except Exception as e:
@@ -42,14 +72,14 @@ async def has_test_samples(
 @router.get('/problem/exists')
 async def is_problem_exist(
         pid: Annotated[str, Query(...)],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     pid = digitalize_problem_id(pid)
     result = False
     if pid is None:
         return {"error": "Invalid pid!"}
     try:
-        obj = session.query(Problem).get(pid)
+        obj = await database.run_db(session.get, Problem, pid)
         if obj is not None:
             result = True
     except Exception as e:
@@ -65,18 +95,29 @@ async def is_problem_exist(
 @router.post('/list')
 async def get_problem_list(
         page_config: ProblemListRequest,
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
-    offset = page_config.page_size * (page_config.page_num - 1)
-    query = session.query(Problem).offset(offset).limit(page_config.page_size)
-    problem_list = query.all()
-    total_records = session.query(Problem).count()
-    total_pages = math.ceil(total_records / page_config.page_size)
+    page_size = min(page_config.page_size, PAGE_SIZE_LIMIT)
+    query = select(Problem.pid, Problem.title, Problem.source, Problem.difficulty, Problem.labels) \
+        .where(*_problem_filters(page_config)).order_by(Problem.pid).limit(page_size + 1)
+    if page_config.after is not None:
+        query = query.where(Problem.pid > page_config.after)  # keyset, as fast on the last page as on the first
+    else:
+        query = query.offset(page_size * (page_config.page_num - 1))
+
+    def fetch_page():
+        return session.execute(query).all(), _count_problems(session, page_config)
+
+    problem_list, total_records = await database.run_db(fetch_page)
+    has_more = len(problem_list) > page_size
+    problem_list = problem_list[:page_size]
 
     return {
-        "total_pages": total_pages,
-        "current_page": page_config.page_num,
-        "page_size": page_config.page_size,
+        "total_records": total_records,
+        "total_pages": math.ceil(total_records / page_size) if total_records is not None else None,
+        "current_page": page_config.page_num if page_config.after is None else None,
+        "page_size": page_size,
+        "next_cursor": problem_list[-1].pid if has_more else None,
         "store": [{
             "pid": problem.pid,
             "title": problem.title,
@@ -91,27 +132,31 @@ async def get_problem_list(
 @router.post('/add_problem', response_model=AddProblemResponse)
 async def add_problem(
         problem: ProblemSchema,
-        test_samples: List[TestSampleSchema],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        test_samples: List[TestSampleSchema]
 ):
-    try:
+    def prepare_samples() -> List[TestSample]:
+        # blob files are written here, the writer thread only inserts the rows
+        samples = []
+        for i, sample_data in enumerate(test_samples):
+            test_sample = TestSample(num=i + 1)
+            assign_sample_blobs(test_sample, blob_store.put(sample_data.input), blob_store.put(sample_data.output))
+            samples.append(test_sample)
+        return samples
+
+    def insert_problem(write_session: database.Session):
         orm_problem = Problem(
             **problem.model_dump()
         )
-        session.add(orm_problem)
-        session.flush()
-        new_pid = orm_problem.pid
-        for i, sample_data in enumerate(test_samples):
-            test_sample = TestSample(
-                num=i + 1,
-                input=sample_data.input,
-                output=sample_data.output,
-                problem_id=new_pid
-            )
-            session.add(test_sample)
-        session.commit()
+        write_session.add(orm_problem)
+        write_session.flush()
+        for test_sample in samples:
+            test_sample.problem_id = orm_problem.pid
+            write_session.add(test_sample)
+
+    try:
+        samples = await database.run_db(prepare_samples)
+        await database.writer.run(insert_problem)
     except Exception as e:
-        session.rollback()
         return {
             "result": "failed",
             "details": e
@@ -127,19 +172,20 @@ async def add_problem(
 @router.get('/problem/{pid}')
 async def get_problem(
         pid: Annotated[str, Path(title="the pid of a problem")],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     # prob: Problem = Problem.query.where(Problem.pid == pid).one_or_none()
 
     pid = digitalize_problem_id(pid)
     if pid is None:
         return {"error": "Invalid pid!"}
-    prob: Problem = session.query(Problem).get(pid)
+    prob: Problem = await database.run_db(session.get, Problem, pid)
     resp = {}
     if prob is None:
         return resp | {"result": "None"}
     if prob.defunct:
         return resp | {"result": "defunct problem"}
+    counts = await asyncio.to_thread(problem_stats.live_counts, prob)  # blocking redis client
     # TODO: synchronise the request handling part of frontend to adapt new return value
     return {
         "pid": prob.pid,
@@ -153,8 +199,8 @@ async def get_problem(
         "labels": prob.labels,
         "time_limit": prob.time_limit,
         "memory_limit": prob.memory_limit,
-        "accepted": prob.accepted,
-        "submit": prob.submit,
-        "solved": prob.solved,
+        "accepted": counts["accepted"],
+        "submit": counts["submit"],
+        "solved": counts["solved"],
         "hint": prob.hint
     }
@@ -44,5 +44,9 @@ class AddProblemResponse(ProblemSchema):
 
 
 class ProblemListRequest(BaseModel):
-    page_size: int
-    page_num: int
+    page_size: int = Field(gt=0)
+    page_num: int = Field(1, gt=0)  # offset paging, only used without a cursor
+    after: Optional[int] = None  # cursor: the last pid of the previous page (`next_cursor` of the response)
+    difficulty: Optional[str] = None
+    labels: List[str] = []  # every one of them must be among the problem's comma separated labels
+    defunct: Optional[bool] = None
@@ -1,24 +1,55 @@
+import asyncio
+import json
 import typing
 import uuid
 
 import pydantic
-from fastapi import APIRouter
-from starlette.websockets import WebSocket
-from .schemas import ConnectionData, ReceivedData
+import redis.asyncio
+from fastapi import APIRouter, Query, status
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from .schemas import ConnectionData, ReceivedData, OutputData, StoppedData
+from services.code_executor.tasks import interactive_run_task
+from services.config import REDIS_SERVER_IP, REDIS_PORT, INPUT_SESSION_TIMEOUT, OUTPUT_STALL_TIMEOUT, \
+    RUNNER_MAX_CONNECTIONS, RUNNER_REDIS_POOL_SIZE
+from services.scheduler import QueueClass, acquire_user_share, release_user_share
 from utils.logger import logger
-from typing import Type
+from typing import Annotated, Type
 
 import database
+import utils.auth as auth
 
 router = APIRouter(
     prefix="/runner"
 )
+FRAME_INTERVAL = 0.016  # seconds, output arriving within this window is sent as one frame
+FRAME_BYTES = 32 * 1024  # a frame is sent early once it holds this much output
+IDLE_TIMEOUT = INPUT_SESSION_TIMEOUT + 60  # seconds without any output before the runner is presumed dead
+STALL_TIMEOUT = OUTPUT_STALL_TIMEOUT + 10  # seconds a run may go without credit, by then the runner has given up
+INITIAL_CREDITS = 16  # frames a run may send before the client grants more
+MAX_RUNS_PER_CONNECTION = 16
+MIN_READ_TIMEOUT = 0.01  # seconds, redis reads a shorter BRPOP timeout as 0 and would block forever
+
+_redis = redis.asyncio.Redis(connection_pool=redis.asyncio.BlockingConnectionPool(
+    host=REDIS_SERVER_IP, port=REDIS_PORT, max_connections=RUNNER_REDIS_POOL_SIZE, timeout=None))
+_connections = 0  # open websockets of this process, each one holds a pooled connection in BRPOP
 
 """
-1. 前端ws连接后端，获取client_id
-2. 前端等待后端发送正在执行
-3. 后端会不断的发送程序输出的数据
-4. 前端会向后端发送输入参数
+一个websocket连接上可以同时进行多个运行，每条消息都带有客户端选定的run_id：
+1. 前端带着登录得到的token连接 /runner/runner/start?token=...（浏览器的websocket不能设置Authorization头），
+   获取connection_id；token无效或用户未激活时连接以1008关闭，进程的连接数达到RUNNER_MAX_CONNECTIONS时以1013关闭
+2. 前端发送 {"type": "operation", "operation": "run", "run_id": ..., "data": 源代码}，后端把运行交给interactive队列的worker
+3. 后端会不断的发送程序输出的数据 {"type": "output", "run_id": ..., "output": ...}，按FRAME_INTERVAL/FRAME_BYTES合并成帧。
+   每个运行有独立的额度：每发一帧消耗一个，初始为INITIAL_CREDITS，
+   前端通过 {"type": "operation", "operation": "credit", "run_id": ..., "data": "帧数"} 补充。
+   额度用完时该运行的输出积压在redis中，由运行方暂停引擎（见OutputShipper），不影响同一连接上的其他运行；
+   超过STALL_TIMEOUT仍没有额度的运行被取消，让出名额
+4. 前端发送 {"type": "input", "run_id": ..., "data": ...}，直接RPUSH到input_{connection_id}_{run_id}，运行方BLPOP等待，没有轮询
+5. {"type": "operation", "operation": "cancel", "run_id": ...} 取消一个运行
+6. 运行结束后发送 {"type": "stopped", "run_id": ..., ...}；连接断开时取消其上所有运行
+7. 每个用户同时排队或运行中的交互运行数受USER_INFLIGHT_LIMIT限制，超出时直接以 "too many runs" 结束
+
+一个连接的全部运行由同一个BRPOP读取：键表为 wake_{connection_id} 加上每个有额度的运行的output/done键，
+每轮轮换运行的顺序，一个输出很多的运行不会饿死其他运行。键表变化（新运行、额度从0恢复）时向wake键推一个元素唤醒读取。
 """
 
 
@@ -31,8 +62,190 @@ async def parse_json(model_type: Type[pydantic.BaseModel], json_data: dict) -> p
     return message
 
 
+def run_key(connection_id: str, run_id: str) -> str:
+    return f"{connection_id}_{run_id}"
+
+
+class Run:
+    def __init__(self, key: str, now: float):
+        self.output_key, self.done_key = f"output_{key}", f"done_{key}"
+        self.credits = INITIAL_CREDITS
+        self.frame: typing.List[str] = []
+        self.frame_bytes = 0
+        self.frame_deadline: float | None = None
+        self.expires = now + IDLE_TIMEOUT
+
+    @property
+    def readable(self) -> bool:
+        return self.credits > 0  # nothing is taken from redis until the client can accept it
+
+
+class MultiplexedConnection:
+    def __init__(self, socket: WebSocket, connection_id: str, sid: str):
+        self.socket = socket
+        self.connection_id = connection_id
+        self.sid = sid
+        self.runs: typing.Dict[str, Run] = {}
+        self.wake_key = f"wake_{connection_id}"
+        self._turn = 0
+        self._send_lock = asyncio.Lock()  # messages of the relay and of handle must not interleave
+
+    async def send(self, data: pydantic.BaseModel):
+        async with self._send_lock:
+            await self.socket.send_text(data.model_dump_json())
+
+    async def wake(self):
+        async with _redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(self.wake_key, 1)
+            pipe.expire(self.wake_key, IDLE_TIMEOUT)
+            await pipe.execute()
+
+    def _read_keys(self) -> typing.List[str]:
+        run_ids = list(self.runs)
+        self._turn = (self._turn + 1) % max(len(run_ids), 1)
+        keys = [self.wake_key]
+        for run_id in run_ids[self._turn:] + run_ids[:self._turn]:
+            run = self.runs[run_id]
+            if run.readable:  # keys are checked in order, so every output chunk is relayed before the end marker
+                keys += [run.output_key, run.done_key]
+        return keys
+
+    async def _send_frame(self, run_id: str, run: Run, now: float):
+        output = "".join(run.frame)
+        run.frame, run.frame_bytes, run.frame_deadline = [], 0, None
+        run.credits -= 1
+        if not run.readable:
+            run.expires = now + STALL_TIMEOUT
+        await self.send(OutputData(run_id=run_id, output=output))
+
+    async def relay(self):
+        """The single reader of every run on this connection."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            for run_id, run in list(self.runs.items()):
+                if run.frame_deadline is not None and (run.frame_deadline <= now or run.frame_bytes >= FRAME_BYTES):
+                    await self._send_frame(run_id, run, now)
+                elif run.expires <= now:
+                    reason = "no response from the runner" if run.readable else "output not read by the client"
+                    await self.cancel_run(run_id)
+                    await self.finish_run(run_id, StoppedData(run_id=run_id, return_code=None, reason=reason))
+            deadlines = [run.frame_deadline or run.expires for run in self.runs.values()]
+            timeout = max(min(deadlines, default=now + IDLE_TIMEOUT) - now, MIN_READ_TIMEOUT)
+            item = await _redis.brpop(self._read_keys(), timeout=timeout)
+            if item is None:
+                continue
+            key, value = item[0].decode(), item[1]
+            if key == self.wake_key:
+                continue
+            run_id = next((run_id for run_id, run in self.runs.items() if key in (run.output_key, run.done_key)), None)
+            if run_id is None:
+                continue
+            run = self.runs[run_id]
+            now = loop.time()
+            run.expires = now + IDLE_TIMEOUT
+            if key == run.done_key:
+                if run.frame:
+                    await self._send_frame(run_id, run, now)
+                await self.finish_run(run_id, StoppedData(run_id=run_id, **json.loads(value)))
+                continue
+            run.frame.append(value.decode('utf-8', errors='replace'))
+            run.frame_bytes += len(value)
+            if run.frame_deadline is None:
+                run.frame_deadline = now + FRAME_INTERVAL
+
+    async def finish_run(self, run_id: str, stopped: StoppedData):
+        key = run_key(self.connection_id, run_id)
+        self.runs.pop(run_id, None)
+        # the control key is left to expire, a cancel pushed just before must still reach the runner
+        await _redis.delete(f"output_{key}", f"input_{key}", f"done_{key}")
+        await self.send(stopped)
+
+    async def start_run(self, run_id: str, source_code: str):
+        if run_id in self.runs:
+            return
+        if len(self.runs) >= MAX_RUNS_PER_CONNECTION \
+                or not await asyncio.to_thread(acquire_user_share, QueueClass.INTERACTIVE, self.sid):
+            await self.send(StoppedData(run_id=run_id, return_code=None, reason="too many runs"))
+            return
+        key = run_key(self.connection_id, run_id)
+        try:  # the share is released by the worker once the run is over
+            await asyncio.to_thread(interactive_run_task.delay, source_code, key, self.sid)
+        except Exception:
+            await asyncio.to_thread(release_user_share, QueueClass.INTERACTIVE, self.sid)
+            raise
+        self.runs[run_id] = Run(key, asyncio.get_running_loop().time())
+        await self.wake()
+
+    async def cancel_run(self, run_id: str):
+        key = f"control_{run_key(self.connection_id, run_id)}"
+        async with _redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, "cancel")
+            pipe.expire(key, IDLE_TIMEOUT)
+            await pipe.execute()
+
+    async def grant_credits(self, run_id: str, frames: int):
+        run = self.runs[run_id]
+        resumed = not run.readable
+        run.credits += frames
+        if resumed and run.readable:
+            run.expires = asyncio.get_running_loop().time() + IDLE_TIMEOUT
+            await self.wake()
+
+    async def handle(self, message: ReceivedData):
+        run_id = message.run_id
+        if message.type == "input":
+            if run_id in self.runs and message.data is not None:
+                await _redis.rpush(f"input_{run_key(self.connection_id, run_id)}", message.data.encode('utf-8'))
+        elif message.operation == "run" and message.data is not None:
+            await self.start_run(run_id, message.data)
+        elif message.operation == "cancel" and run_id in self.runs:
+            await self.cancel_run(run_id)
+        elif message.operation == "credit" and run_id in self.runs:
+            await self.grant_credits(run_id, int(message.data) if message.data and message.data.isdigit() else 1)
+
+    async def serve(self):
+        relay = asyncio.create_task(self.relay())
+        try:
+            while True:
+                message: ReceivedData | Exception = await parse_json(ReceivedData, await self.socket.receive_json())
+                if isinstance(message, Exception):
+                    logger.error(message)
+                    continue
+                await self.handle(message)
+                if relay.done():  # surfaces an error of the relay instead of leaving the connection mute
+                    relay.result()
+        finally:  # disconnected: nobody is left to read the output
+            relay.cancel()
+            for run_id in list(self.runs):
+                await self.cancel_run(run_id)
+                key = run_key(self.connection_id, run_id)
+                await _redis.delete(f"output_{key}", f"input_{key}", f"done_{key}")
+            self.runs.clear()
+            await _redis.delete(self.wake_key)
+
+
 @router.websocket("/runner/start")
-async def connection(socket: WebSocket):
+async def connection(socket: WebSocket, token: Annotated[str | None, Query()] = None):
+    user = None
+    if token is not None:
+        with database.ReadSessionLocal() as session:  # not held for the lifetime of the socket
+            user = await auth.get_user_from_token(session, token)
+    if user is None or not auth.is_active(user):
+        await socket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    global _connections
+    if _connections >= RUNNER_MAX_CONNECTIONS:  # the redis pool would run dry under the blocking reads
+        await socket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    _connections += 1
+    try:
+        await serve_socket(socket, str(user.uid))
+    finally:
+        _connections -= 1
+
+
+async def serve_socket(socket: WebSocket, sid: str):
     await socket.accept()
     connection_data = ConnectionData(
         connection_id=uuid.uuid4(),
@@ -40,10 +253,7 @@ async def connection(socket: WebSocket):
 
     await socket.send_text(  # To send data needed for connection establishment
         connection_data.model_dump_json())  # assume that the .send_json method can't deserialize uuid
-    # 0. 确保redis队列正确
-    # 1. 启动code_manager
-    while True:
-        message: ReceivedData | Exception = await parse_json(ReceivedData, await socket.receive_json())
-        if isinstance(message, Exception):
-            logger.error(message)
-            continue
+    try:
+        await MultiplexedConnection(socket, str(connection_data.connection_id), sid).serve()
+    except WebSocketDisconnect:
+        pass
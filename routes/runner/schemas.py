@@ -1,4 +1,4 @@
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, UUID4, Field
 from typing import List, Optional, Literal
 
 
@@ -7,13 +7,23 @@ class ConnectionData(BaseModel):
 
 
 class OutputData(BaseModel):
+    type: Literal["output"] = "output"
+    run_id: str
     output: str
 
 
+class StoppedData(BaseModel):
+    type: Literal["stopped"] = "stopped"
+    run_id: str
+    return_code: Optional[int]
+    reason: Optional[str] = None
+
+
 class ReceivedData(BaseModel):
     type: Literal["input", "operation"]
-    data: Optional[str]
-    operation: Optional[str]
+    run_id: str = Field("0", max_length=64)  # chosen by the client, unique within its connection
+    data: Optional[str] = None
+    operation: Optional[Literal["run", "cancel", "credit"]] = None
 
     class Config:
         from_attributes = True
@@ -1,15 +1,89 @@
-from fastapi import APIRouter, Query, Path, Depends
+from fastapi import APIRouter, Query, Path, Depends, HTTPException, status
 from typing import Annotated, List
+from models.problem import Problem
+from models.runtime_info import RuntimeInfo
+from models.source_code import SourceCode
+from models.submission import Submission
+from models.test_sample import TestSample
+from services.code_executor.interpreter import linter
+from services.code_executor.tasks import judge_submission_task
+from services.scheduler import QueueClass, acquire_user_share, release_user_share, queue_depths
+from utils.index import digitalize_problem_id
+from utils.logger import logger
+from .schemas import SourceCodeSchema, CreateSubmissionResponse, GetSubmissionResponse
+
+import asyncio
 import database
+import utils.auth as auth
 
 router = APIRouter(
     prefix="/submission"
 )
 
 
-@router.post("/")
+@router.post("/", response_model=CreateSubmissionResponse, status_code=status.HTTP_201_CREATED)
 async def create_submission(
+        source_code: SourceCodeSchema,
+        user: Annotated[auth.UserSchema, Depends(auth.require_login)],
+        session: Annotated[database.Session, Depends(database.make_read_session)]
+):
+    pid = digitalize_problem_id(source_code.pid)
+    if pid is None or await database.run_db(session.get, Problem, pid) is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": "Invalid pid!"})
+    if source_code.language == "pseudocode":
+        # compile errors are answered here and never take a queue slot or an engine; parsing stays off the event loop
+        syntax_error = await asyncio.to_thread(linter.lint, source_code.code)
+        if syntax_error is not None:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, {"error": f"Syntax error: {syntax_error}"})
+    # redis and the broker are reached through blocking clients, kept off the event loop
+    if not await asyncio.to_thread(acquire_user_share, QueueClass.JUDGE, str(user.uid)):
+        raise HTTPException(status.HTTP_429_TOO_MANY_REQUESTS,
+                            {"error": "Too many submissions waiting to be judged, please wait for them first"})
+
+    def insert_submission(write_session: database.Session) -> int:
+        orm_source_code = SourceCode(
+            language=source_code.language,
+            code=source_code.code,
+            pid=pid,
+            sid=str(user.uid)
+        )
+        write_session.add(orm_source_code)
+        write_session.flush()
+        submission = Submission(
+            code_id=orm_source_code.code_id,
+            sid=str(user.uid),
+            pid=pid
+        )
+        write_session.add(submission)
+        write_session.flush()
+        return submission.submit_id
+
+    try:
+        submit_id = await database.writer.run(insert_submission)
+    except Exception as e:
+        await asyncio.to_thread(release_user_share, QueueClass.JUDGE, str(user.uid))
+        logger.error(f"Failed to create submission for user({user.uid}) on problem({pid}): {e.args}")
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, {"error": e.args})
+    await asyncio.to_thread(judge_submission_task.delay, submit_id)
+    return {"submit_id": submit_id}
 
-    session: Annotated[database.Session, Depends(database.make_session)]
+
+@router.get("/queues")
+async def get_queue_depths():
+    return await asyncio.to_thread(queue_depths)
+
+
+@router.get("/{submit_id}", response_model=GetSubmissionResponse)
+async def get_submission(
+        submit_id: Annotated[int, Path()],
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
-    ...
+    def load_submission() -> GetSubmissionResponse | None:
+        submission = session.get(Submission, submit_id)
+        # validated here, so runtime_infos is lazy loaded on the DB executor and not while serializing
+        return GetSubmissionResponse.model_validate(submission) if submission is not None else None
+
+    submission = await database.run_db(load_submission)
+    if submission is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": "Submission not found"})
+    return submission
@@ -8,3 +8,27 @@ class SourceCodeSchema(BaseModel):
     code: str
     pid: str
 
+
+class CreateSubmissionResponse(BaseModel):
+    submit_id: int
+
+
+class RuntimeInfoSchema(BaseModel):
+    sample_id: int
+    status: str
+    msg: Optional[str] = None
+    time_used: Optional[int] = None
+    memory_used: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class GetSubmissionResponse(BaseModel):
+    submit_id: int
+    pid: int
+    valid: Optional[bool]
+    runtime_infos: List[RuntimeInfoSchema]
+
+    class Config:
+        from_attributes = True
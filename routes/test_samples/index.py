@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Query, Path, Depends, HTTPException, Body, status
+from fastapi import APIRouter, Query, Path, Depends, HTTPException, Body, status, UploadFile, File
 from models.problem import Problem
 from models.test_sample import TestSample
-from typing import Annotated, List
+from sqlalchemy import func, select
+from typing import Annotated, List, Tuple
 from .schemas import GetAllTestSamplesFromPidResponse, TestSampleSchema,\
-    RawTestSampleSchema, CreateTestSampleFromPid
+    RawTestSampleSchema, CreateTestSampleFromPid, RejudgeProgressResponse
+from services.blob_store import blob_store, assign_sample_blobs, sample_digests
+from services.code_executor.rejudge import get_progress
+from services.code_executor.tasks import rejudge_problem_task
 from utils.index import digitalize_problem_id, cheerful_messages
 
+import asyncio
 import database
 import math
 import random
@@ -15,65 +20,77 @@ router = APIRouter(
 )
 
 
+def _next_sample_num(write_session: database.Session, pid: int) -> int:
+    # runs on the writer thread, so two new samples of one problem never get the same number
+    return (write_session.scalar(select(func.max(TestSample.num)).where(TestSample.problem_id == pid)) or 0) + 1
+
+
+def _read_sample(sample: TestSample) -> dict:
+    # blocking file reads, called through database.run_db
+    return {
+        "input": blob_store.read_text(sample.input_digest),
+        "output": blob_store.read_text(sample.output_digest),
+        "num": sample.num
+    }
+
+
 @router.get("/test_sample/{sample_id}", response_model=TestSampleSchema)
 async def get_test_sample_from_sid(
         sample_id: Annotated[int, Path()],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     try:
-        sample = session.query(TestSample).where(TestSample.sid == sample_id).one()
+        sample = await database.run_db(
+            lambda: session.query(TestSample).where(TestSample.sid == sample_id).one_or_none()
+        )
     except Exception as e:
         raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": e.args})
-    return {
-        "sample": {
-            "input": sample.input,
-            "output": sample.output,
-            "num": sample.num
-        }
-    }
+    if sample is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": "No such test sample"})
+    return {"sample": await database.run_db(_read_sample, sample)}
 
 @router.get("/{pid}/all", response_model=GetAllTestSamplesFromPidResponse)
 async def get_all_test_samples_from_pid(
         pid: Annotated[str, Path()],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     try:
         pid = digitalize_problem_id(pid)
-        problem = session.query(Problem).where(Problem.pid == pid).one_or_none()
-        samples = problem.samples
+        problem = await database.run_db(lambda: session.query(Problem).where(Problem.pid == pid).one_or_none())
+        samples = await database.run_db(lambda: problem.samples)  # lazy load
     except Exception as e:
         raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": e.args})
-    return {
-        "samples": [
-            {
-                "input": sample.input,
-                "output": sample.output,
-                "num": sample.num
-            }
-            for sample in samples
-        ]
-    }
+    return {"samples": await database.run_db(lambda: [_read_sample(sample) for sample in samples])}
+
+
+@router.get("/{pid}/rejudge", response_model=RejudgeProgressResponse)
+async def get_rejudge_progress(
+        pid: Annotated[str, Path()]
+):
+    pid = digitalize_problem_id(pid)
+    progress = await asyncio.to_thread(get_progress, pid) if pid is not None else None
+    if progress is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": "No rejudge for this problem"})
+    return progress
 
 
 @router.get("/{pid}/{sample_num}",response_model=TestSampleSchema)
 async def get_test_sample_from_pid(
         pid: Annotated[str, Path()],
         sample_num: Annotated[int, Path()],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     try:
         pid = digitalize_problem_id(pid)
-        sample = session.query(TestSample).where(TestSample.problem_id == pid,
-                                                 TestSample.num == sample_num).one_or_none()
+        sample = await database.run_db(
+            lambda: session.query(TestSample).where(TestSample.problem_id == pid,
+                                                    TestSample.num == sample_num).one_or_none()
+        )
     except Exception as e:
         raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": e.args})
-    return {
-        "sample": {
-            "input": sample.input,
-            "output": sample.output,
-            "num": sample.num
-        }
-    }
+    if sample is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, {"error": "No such test sample"})
+    return {"sample": await database.run_db(_read_sample, sample)}
 
 
 # TODO: add unique-value verification here
@@ -81,25 +98,86 @@ async def get_test_sample_from_pid(
 async def create_test_sample_from_pid(
         pid: Annotated[str, Body(...)],
         test_sample: RawTestSampleSchema,
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
+    def prepare_sample() -> TestSample:
+        # blob files are written here, the writer thread only inserts the row
+        sample = TestSample(problem_id=pid)
+        assign_sample_blobs(sample, blob_store.put(test_sample.input), blob_store.put(test_sample.output))
+        return sample
+
+    def insert_sample(write_session: database.Session):
+        sample.num = _next_sample_num(write_session, pid)
+        write_session.add(sample)
+
     try:
         pid = digitalize_problem_id(pid)
         if pid is None:
             raise ValueError("Invalid pid!")
-        problem = session.query(Problem).where(Problem.pid == pid).one_or_none()
-        if problem is None:
+        if await database.run_db(session.get, Problem, pid) is None:
             raise ValueError("Invalid problem!")
-        sample = TestSample(**{
-            "input": test_sample.input,
-            "output": test_sample.output,
-            "problem_id": pid,
-            "num": len(problem.samples)
-        })
-        session.add(sample)
-        session.commit()
+        sample = await database.run_db(prepare_sample)
+        await database.writer.run(insert_sample)
+    except Exception as e:
+        raise HTTPException(status.HTTP_406_NOT_ACCEPTABLE, {"Success": False, "error": e.args})
+    await asyncio.to_thread(rejudge_problem_task.delay, pid)  # blocking broker client
+    return {"success": True}
+
+
+@router.put("/test_sample/{sample_id}", response_model=CreateTestSampleFromPid)
+async def update_test_sample(
+        sample_id: Annotated[int, Path()],
+        test_sample: RawTestSampleSchema
+):
+    def prepare_blobs() -> TestSample:
+        blobs = TestSample()  # carries the blob columns only
+        assign_sample_blobs(blobs, blob_store.put(test_sample.input), blob_store.put(test_sample.output))
+        return blobs
+
+    def update_sample(write_session: database.Session) -> Tuple[int, set]:
+        sample = write_session.query(TestSample).where(TestSample.sid == sample_id).one()
+        superseded = sample_digests(sample) - sample_digests(blobs)
+        sample.input_digest, sample.input_size = blobs.input_digest, blobs.input_size
+        sample.output_digest, sample.output_size = blobs.output_digest, blobs.output_size
+        sample.normalized_output_digest = blobs.normalized_output_digest
+        return sample.problem_id, superseded
+
+    try:
+        blobs = await database.run_db(prepare_blobs)
+        pid, superseded = await database.writer.run(update_sample)
+        await database.run_db(blob_store.touch, superseded)  # removed by the blob collector after the grace period
     except Exception as e:
-        session.rollback()
         raise HTTPException(status.HTTP_406_NOT_ACCEPTABLE, {"Success": False, "error": e.args})
+    await asyncio.to_thread(rejudge_problem_task.delay, pid)  # blocking broker client
     return {"success": True}
 
+
+@router.post("/{pid}/upload", response_model=CreateTestSampleFromPid, status_code=status.HTTP_201_CREATED)
+async def upload_test_sample(
+        pid: Annotated[str, Path()],
+        input_file: Annotated[UploadFile, File(alias="input")],
+        output_file: Annotated[UploadFile, File(alias="output")],
+        session: Annotated[database.Session, Depends(database.make_read_session)]
+):
+    """Large test data as multipart files, streamed into the blob store chunk by chunk."""
+    def prepare_sample() -> TestSample:
+        sample = TestSample(problem_id=pid)
+        assign_sample_blobs(sample, blob_store.write_upload(input_file), blob_store.write_upload(output_file))
+        return sample
+
+    def insert_sample(write_session: database.Session):
+        sample.num = _next_sample_num(write_session, pid)
+        write_session.add(sample)
+
+    try:
+        pid = digitalize_problem_id(pid)
+        if pid is None:
+            raise ValueError("Invalid pid!")
+        if await database.run_db(session.get, Problem, pid) is None:
+            raise ValueError("Invalid problem!")
+        sample = await database.run_db(prepare_sample)
+        await database.writer.run(insert_sample)
+    except Exception as e:
+        raise HTTPException(status.HTTP_406_NOT_ACCEPTABLE, {"Success": False, "error": e.args})
+    await asyncio.to_thread(rejudge_problem_task.delay, pid)  # blocking broker client
+    return {"success": True}
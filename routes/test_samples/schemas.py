@@ -22,3 +22,7 @@ class GetTestSampleFromPidResponse(BaseModel):
 class CreateTestSampleFromPid(BaseModel):
     success: bool
 
+
+class RejudgeProgressResponse(BaseModel):
+    total: int
+    done: int
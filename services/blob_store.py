@@ -0,0 +1,232 @@
+"""
+测试数据的内容寻址存储：样例的输入/输出按sha256命名保存在BLOB_STORE_DIR下，内容相同的文件只存一份，
+TestSample只记录摘要和大小，查询样例不再把整份测试数据读进ORM对象。
+
+- 写入按块进行，边写边算摘要，写完后原子地rename到最终位置（已存在则直接丢弃临时文件）
+- 读取通过mmap，评测时输入直接从映射写入引擎的stdin
+- 每个输出同时保存一份规范化形式（行尾空白、\\r\\n与末尾空行已去除），供whitespace比较模式直接使用
+- 所有读写都是阻塞的文件IO，路由中通过 `database.run_db` 调用
+- 不再被任何样例引用的文件（样例被修改后的旧数据、进程中断时遗留的文件）由后台线程每 BLOB_GC_INTERVAL 秒清扫删除；
+  BLOB_GC_GRACE_PERIOD 内写入或被替换下来的文件可能属于正在添加或正在评测的样例，不会被删除
+"""
+import contextlib
+import hashlib
+import mmap
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import typing
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import database
+from models.test_sample import TestSample
+from services.config import BLOB_STORE_DIR, BLOB_CHUNK_SIZE, BLOB_GC_GRACE_PERIOD, BLOB_GC_INTERVAL
+from utils.logger import logger
+
+if typing.TYPE_CHECKING:
+    from fastapi import UploadFile
+
+
+class BlobInfo(typing.NamedTuple):
+    digest: str  # sha256 hex
+    size: int  # bytes
+
+
+class BlobWriter:
+    """Receives a blob chunk by chunk; `commit` moves it into the store under its digest."""
+
+    def __init__(self, store: "BlobStore"):
+        self.store = store
+        self._digest = hashlib.sha256()
+        self._size = 0
+        store.tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=store.tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+        self._path = pathlib.Path(path)
+
+    def write(self, chunk: bytes):
+        self._digest.update(chunk)
+        self._size += len(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> BlobInfo:
+        self._file.close()
+        info = BlobInfo(self._digest.hexdigest(), self._size)
+        target = self.store.path(info.digest)
+        target.parent.mkdir(exist_ok=True)
+        # also over the same content stored before: the fresh mtime keeps it from the garbage collection
+        os.replace(self._path, target)
+        return info
+
+    def abort(self):
+        self._file.close()
+        self._path.unlink(missing_ok=True)
+
+
+class BlobStore:
+    def __init__(self, root: pathlib.Path = pathlib.Path(BLOB_STORE_DIR)):
+        self.root = root
+        self.tmp_dir = root / "tmp"  # same filesystem as the blobs, so the final rename is atomic
+
+    def path(self, digest: str) -> pathlib.Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest).is_file()
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def write_chunks(self, chunks: typing.Iterable[bytes]) -> BlobInfo:
+        writer = self.writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def put(self, data: str | bytes) -> BlobInfo:
+        data = data.encode() if isinstance(data, str) else data
+        return self.write_chunks(data[i:i + BLOB_CHUNK_SIZE] for i in range(0, len(data), BLOB_CHUNK_SIZE))
+
+    def write_upload(self, upload: "UploadFile") -> BlobInfo:
+        """Stream an uploaded file (spooled by the server) into the store without holding it in memory."""
+        upload.file.seek(0)
+        return self.write_chunks(iter(lambda: upload.file.read(BLOB_CHUNK_SIZE), b""))
+
+    @contextlib.contextmanager
+    def open(self, digest: str) -> typing.Iterator[mmap.mmap | bytes]:
+        """Read-only mapping of a blob; an empty blob cannot be mapped and is given as b""."""
+        with open(self.path(digest), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read_text(self, digest: str) -> str:
+        with self.open(digest) as mapped:
+            return bytes(mapped).decode(errors="replace")
+
+    def normalize(self, digest: str) -> BlobInfo:
+        """Store the normalized form of an expected output, the same one the whitespace comparison uses."""
+        def lines() -> typing.Iterator[bytes]:
+            separator = b""  # no newline before the first line
+            blank_lines = 0  # trailing blank lines are dropped, so they are only written once something follows
+            with self.open(digest) as mapped:
+                for line in iter(mapped.readline, b"") if mapped else ():
+                    line = line.rstrip()
+                    if not line:
+                        blank_lines += 1
+                        continue
+                    yield separator + b"\n" * blank_lines + line
+                    separator, blank_lines = b"\n", 0
+
+        return self.write_chunks(lines())
+
+    def digests(self) -> typing.Iterator[str]:
+        for directory in self.root.iterdir():
+            if directory.is_dir() and directory != self.tmp_dir:
+                for path in directory.iterdir():
+                    yield directory.name + path.name
+
+    def touch(self, digests: typing.Iterable[str]):
+        """Restart the grace period of blobs that were just replaced; a judging started earlier may still read them."""
+        for digest in digests:
+            try:
+                os.utime(self.path(digest))
+            except FileNotFoundError:
+                pass
+
+    def discard(self, digest: str, grace_period: float = BLOB_GC_GRACE_PERIOD) -> bool:
+        """Delete a blob unless it was written within the grace period."""
+        return _discard_old(self.path(digest), grace_period)
+
+    def discard_temporary(self, grace_period: float = BLOB_GC_GRACE_PERIOD) -> int:
+        """Delete the partial writes of a process that died while writing."""
+        if not self.tmp_dir.is_dir():
+            return 0
+        return sum(_discard_old(path, grace_period) for path in self.tmp_dir.iterdir())
+
+
+def _discard_old(path: pathlib.Path, grace_period: float) -> bool:
+    try:
+        if time.time() - path.stat().st_mtime < grace_period:
+            return False
+        path.unlink()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+blob_store = BlobStore()
+
+_DIGEST_COLUMNS = (TestSample.input_digest, TestSample.output_digest, TestSample.normalized_output_digest)
+
+
+def sample_digests(sample: TestSample) -> typing.Set[str]:
+    return {digest for digest in (sample.input_digest, sample.output_digest, sample.normalized_output_digest)
+            if digest is not None}
+
+
+def collect_blobs(session: Session) -> int:
+    """Sweep the whole store for blobs no sample refers to."""
+    if not blob_store.root.is_dir():
+        return 0
+    referenced = set()
+    for column in _DIGEST_COLUMNS:
+        referenced.update(session.scalars(select(column).where(column.is_not(None))))
+    removed = sum(blob_store.discard(digest) for digest in blob_store.digests() if digest not in referenced)
+    removed += blob_store.discard_temporary()
+    if removed:
+        logger.info(f"Removed {removed} unreferenced blobs")
+    return removed
+
+
+class BlobCollector:
+    """Runs collect_blobs on an interval from a daemon thread, the first sweep right after start."""
+
+    def __init__(self, interval: float = BLOB_GC_INTERVAL):
+        self.interval = interval
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="blob-collector", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                with database.ReadSessionLocal() as session:
+                    collect_blobs(session)
+            except Exception as e:
+                logger.error(f"Failed to collect unreferenced blobs: {e.args}")
+            time.sleep(self.interval)
+
+
+blob_collector = BlobCollector()
+
+
+def assign_sample_blobs(sample: TestSample, input_blob: BlobInfo, output_blob: BlobInfo):
+    sample.input_digest, sample.input_size = input_blob
+    sample.output_digest, sample.output_size = output_blob
+    sample.normalized_output_digest = blob_store.normalize(output_blob.digest).digest
+
+
+def backfill_inline_samples(session: Session) -> int:
+    """Move test data still stored inline in the test_sample table into the blob store."""
+    samples = session.scalars(select(TestSample).where(TestSample.input_digest.is_(None))).all()
+    for sample in samples:
+        assign_sample_blobs(sample, blob_store.put(sample.input or ""), blob_store.put(sample.output or ""))
+        sample.input = sample.output = None
+    session.commit()
+    if samples:
+        logger.info(f"Moved {len(samples)} inline test samples into the blob store")
+    return len(samples)
@@ -4,33 +4,32 @@
 
 """
 import asyncio
-import datetime
+import codecs
+import contextlib
 import hashlib
-import logging
-import select
+import json
+import mmap
+import os
+import selectors
 import typing
+import uuid
 
 import loguru
 import redis
-from subprocess import Popen, PIPE
+import redis.asyncio
 import threading
 import pathlib
-import psutil
 import enum
 
-PSUTIL_STATUS_MAPPER = {
-    psutil.STATUS_RUNNING: "running",
-    psutil.STATUS_SLEEPING: "sleeping",
-    psutil.STATUS_DISK_SLEEP: "disk sleeping",
-    psutil.STATUS_STOPPED: "stopped",
-    psutil.STATUS_TRACING_STOP: "tracing stop",
-    psutil.STATUS_ZOMBIE: "zombie",
-    psutil.STATUS_DEAD: "dead",
-    psutil.STATUS_WAKING: "waking",
-    psutil.STATUS_IDLE: "idle",
-    psutil.STATUS_LOCKED: "locked"
-}
-
+from services.code_executor.comparator import StreamingComparator
+from services.code_executor.engine_pool import get_engine_pool, slot_command, spawn_engine
+from services.code_executor.input_channel import InputChannel
+from services.code_executor.limits import MeasuredPopen, ResourceLimits, ResourceUsage, apply_limits
+from services.code_executor.output_shipper import OutputShipper, OutputStalled
+from services.code_executor.slots import async_engine_slot
+from services.code_executor.staging import StagedSource, stage_source
+from services.code_executor.supervisor import ProcessSnapshot, supervisor
+from services.config import ENGINE_POOL_ENABLED, INTERACTIVE_CPU_LIMIT, INTERACTIVE_MEMORY_LIMIT, OUTPUT_QUEUE_TTL
 
 class RunStatus(str, enum.Enum):
     RUNNING = "running"
@@ -60,6 +59,13 @@ class CommunicateResult(typing.TypedDict):
     process_id: int
     good: bool
     result: str
+    error: str
+    return_code: int
+    timed_out: bool
+    # comparator verdict: False when the output went wrong (the run may have been killed for it), otherwise only
+    # decided for a clean exit; None without a comparator, on a timeout or when the run crashed first
+    matched: typing.Optional[bool]
+    usage: typing.Optional[ResourceUsage]
 
 
 class Signal(typing.TypedDict):
@@ -68,28 +74,6 @@ class Signal(typing.TypedDict):
     reason: typing.Optional[str]
 
 
-class ThreadSafeDict:
-    def __init__(self):
-        self.dict: dict[str, Popen] = {}
-        self.lock = threading.Lock()
-
-    def set_item(self, key, value):
-        with self.lock:
-            self.dict[key] = value
-
-    def get_item(self, key):
-        with self.lock:
-            return self.dict.get(key)
-
-    def remove_item(self, key):
-        with self.lock:
-            self.dict.pop(key, None)
-
-    def items(self):
-        with self.lock:
-            return self.dict.items()
-
-
 class SourceCode(typing.TypedDict):
     code: str
     language: str
@@ -104,169 +88,314 @@ class CodeExecutor:
             root (Path): 当前工作目录的路径。
             engine_path (Path): 用于执行代码的引擎路径。
             source_code (str): 要执行的源代码。
-            process (Optional[Popen]): 子进程对象，用于执行源代码。
-            _p (Optional[psutil.Process]): psutil库的进程对象，用于更细粒度的进程控制。
-            input_queue (None): 用于存储输入的队列。（未在此代码片段中使用）
-            _input_thread (None): 处理输入的线程。（未在此代码片段中使用）
+            limits (Optional[ResourceLimits]): CPU时间与内存限制，为None时不限制。
+            staged (Optional[StagedSource]): 暂存的源代码（内存文件或临时文件），运行结束后释放。
+            process (Optional[MeasuredPopen]): 子进程对象，用于执行源代码，回收后带有资源用量。
     """
 
-    def __init__(self, source_code: str):
-        self.execution_id = hashlib.md5(f"{source_code} {datetime.datetime.now()}".encode()).hexdigest()
+    def __init__(self, source_code: str, limits: ResourceLimits | None = None):
+        self.execution_id = hashlib.md5(f"{source_code} {uuid.uuid4()}".encode()).hexdigest()
         self.root = pathlib.Path.cwd()
         self.engine_path = self.root / "Pseudo/PseudoEngine2"
 
         self.source_code = source_code
-        self.process: Popen | None = None
-        self._p = None
-        self.input_queue = None
-        self._input_thread = None
+        self.limits = limits
+        self.staged: StagedSource | None = None
+        self.process: MeasuredPopen | None = None
 
     # Launch the engine with source code provided
     def setup_runtime(self):
         """准备运行环境，包括源代码文件的创建和子进程的初始化。"""
-        file_path = self.root / f"Buffer/{self.execution_id}.pseudo"
-        pathlib.Path(file_path).parent.mkdir(parents=True, exist_ok=True)  # make sure the path and file exists
-
-        with open(file_path, 'w') as file:  # write code into template source code file
-            file.write(self.source_code)
-
-        command = f"{self.engine_path} {file_path}"  # TODO: add support for custom options
-        self.process = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True, shell=True)
-        self._p = psutil.Process(self.process.pid)
-
-    def is_process_terminated(self):
-        return self.process.poll() is not None
-
-    def _process_select_stdout(self, readable) -> typing.List[Signal]:
-        signals: typing.List[Signal] = []
-        for stream in readable:
-            if stream == self.process.stdout.fileno():
-                read = self.process.stdout.readline()
-                if read == '':  # EOF exception
-                    signals.append({
-                        "type": RunStatus.EXCEPTION,
-                        "reason": "EOF",
-                        "result": None
-                    }
-                    )
-                signals.append({
-                    "type": RunStatus.OUTPUT,
-                    "result": {
-                        "output": f"{read}"
-                    },
-                    "reason": None
-                })
-            elif stream == self.process.stderr.fileno():
-                read = self.process.stderr.readline()
-                if read == '': continue  # IGNORE the eof-like exception since they are somewhat misfunctioned
-                signals.append({
-                    "type": RunStatus.EXCEPTION,
-                    "reason": f"{read}",
-                    "result": None
-                })
-        return signals
-
-    def _parse_input(self, interaction: Interaction) -> bool:
-        if interaction['type'] == InteractionType.INPUT:
-            self.process.stdin.write(interaction['data'])
-            self.process.stdin.flush()
-            return True
-        return False
-
-    def run(self) -> typing.Generator[Signal]:
+        self.staged = stage_source(self.source_code, self.execution_id, disk_root=self.root)
+
+        # TODO: add support for custom options
+        if ENGINE_POOL_ENABLED:
+            self.process = get_engine_pool(self.engine_path).acquire(self.staged.path, self.limits)
+        else:
+            self.process = spawn_engine(self.engine_path, self.staged.path, self.limits)
+
+    def cleanup(self):
+        """运行结束后释放暂存的源代码。"""
+        if self.staged is not None:
+            self.staged.close()
+            self.staged = None
+
+    @property
+    def snapshot(self) -> ProcessSnapshot | None:
+        """监管线程最近一次采样到的进程状态。"""
+        return supervisor.snapshot(self.execution_id)
+
+    def _feed_stdin(self, input_data: str | bytes | mmap.mmap):
+        try:
+            if isinstance(input_data, str):
+                self.process.stdin.write(input_data)
+            else:  # test data straight from the blob store mapping, no decoding
+                self.process.stdin.buffer.write(input_data)
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):  # the engine exited or was killed before reading everything
+            pass
+
+    def communicate(self, input_data: str | bytes | mmap.mmap = "", timeout: float | None = None,
+                    comparator: StreamingComparator | None = None) -> CommunicateResult:
+        """非交互式执行：写入全部输入并收集输出，用于批量评测。超时由监管线程杀死进程。
+        传入comparator时stdout不会被保存，而是逐块交给comparator比较，一旦不一致立即杀死进程。
+        资源用量中的峰值RSS取wait4的ru_maxrss与监管线程采样的VmHWM中较大者。"""
         self.setup_runtime()
-        yield {
-            "type": RunStatus.RUNNING,
-            "result": "Process started"
-        }
+        supervisor.register(self.execution_id, self.process, timeout)
+        feeder = threading.Thread(target=self._feed_stdin, args=(input_data,), daemon=True)
+        feeder.start()
+        stdout_fd, stderr_fd = self.process.stdout.fileno(), self.process.stderr.fileno()
+        selector = selectors.DefaultSelector()
+        decoders = {}
+        for fd in (stdout_fd, stderr_fd):
+            selector.register(fd, selectors.EVENT_READ)
+            decoders[fd] = codecs.getincrementaldecoder("utf-8")(errors="replace")
         stdout, stderr = [], []
-        flag = False
-        while (not flag) and self.is_process_terminated():
-            readable, writable, exception = select.select(
-                [self.process.stdout.fileno(), self.process.stderr.fileno()],
-                [],
-                [],
-                0.1  # Timeout
-            )
-            if not readable:  # 如果没有可读的流
-                break  # 退出循环
-
-            signals = []
-            readable_signals = self._process_select_stdout(readable)
-            signals.extend(readable_signals)
-            signals.append({  # Ensure every loop can provide at least 1 yield
-                "type": RunStatus.RUNNING,
-                "result": "Process is running..."
-            })
-            for _signal in signals:
-                if _signal == RunStatus.EXCEPTION and _signal['reason'] == 'EOF': flag = True
-                recv = yield _signal
-                self._parse_input(recv)
-        yield {
-            "type": RunStatus.STOPPED,
-            "result": f"Process ended for {self.source_code}",
-        }
+        mismatched = False
+        while selector.get_map():  # a kill at the deadline closes the pipes and ends the loop
+            for key, _ in selector.select():
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fd)
+                text = decoders[key.fd].decode(data, final=not data)  # a truncated sequence at EOF becomes U+FFFD
+                if not text:
+                    continue
+                if key.fd == stderr_fd:
+                    stderr.append(text)
+                elif comparator is None:
+                    stdout.append(text)
+                elif not comparator.feed(text):
+                    mismatched = True
+            if mismatched:
+                break
+        selector.close()
+        if mismatched:
+            self.process.kill()
+        self.process.wait()
+        feeder.join()
+        snapshot = supervisor.unregister(self.execution_id)
+        timed_out = snapshot is not None and snapshot["timed_out"]
+        peak_memory = max(snapshot["peak_memory"] if snapshot is not None else 0, self.process.peak_rss or 0)
+        self.process.stdout.close()
+        self.process.stderr.close()
+        self.cleanup()
+        stderr = "".join(stderr)
+        good = self.process.returncode == 0 and not stderr and not timed_out
+        matched = None
+        if comparator is not None and not timed_out:
+            # partial output of a crashed run says nothing about the answer, that is a runtime error
+            matched = False if mismatched else comparator.finish() if good else None
         return {
-            "output": stdout,
-            "error": stdout
+            "process_id": self.process.pid,
+            "good": good,
+            "result": "".join(stdout),
+            "error": stderr,
+            "return_code": self.process.returncode,
+            "timed_out": timed_out,
+            "matched": matched,
+            "usage": {
+                "cpu_time": self.process.cpu_time,
+                "peak_memory": peak_memory
+            } if self.process.cpu_time is not None else None
         }
 
 
+class AsyncCodeExecutor:
+    """
+        CodeExecutor的asyncio版本。stdout与stderr由两个任务并发按块读取，信号通过异步迭代器产出，
+        输入通过 `send` 写入，不会阻塞事件循环，因此一个事件循环可以同时监管大量运行。
+
+        属性:
+            chunk_size (int): 每次从管道读取的最大字节数。
+            _signals (asyncio.Queue): 读取任务产出的信号，有界以便在消费者过慢时向读取任务施加背压。
+    """
+
+    def __init__(self, source_code: str, chunk_size: int = 4096, max_pending_signals: int = 256):
+        self.execution_id = hashlib.md5(f"{source_code} {uuid.uuid4()}".encode()).hexdigest()
+        self.root = pathlib.Path.cwd()
+        self.engine_path = self.root / "Pseudo/PseudoEngine2"
+
+        self.source_code = source_code
+        self.chunk_size = chunk_size
+        self.staged: StagedSource | None = None
+        self.process: asyncio.subprocess.Process | None = None
+        self._signals: asyncio.Queue[Signal | None] = asyncio.Queue(max_pending_signals)
+        self._started = asyncio.Event()
+
+    async def setup_runtime(self):
+        self.staged = stage_source(self.source_code, self.execution_id, disk_root=self.root)
+        # the slot shell is limited before it execs the engine, so the limits hold from the first instruction
+        self.process = await asyncio.create_subprocess_exec(
+            *slot_command(self.engine_path),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        apply_limits(self.process.pid, ResourceLimits(INTERACTIVE_CPU_LIMIT, INTERACTIVE_MEMORY_LIMIT))
+        shell = self._command_line()
+        self.process.stdin.write(f"{self.staged.path}\n".encode())
+        await self.process.stdin.drain()
+        # the shell blocked on reading the path would look like the engine waiting for input
+        interval = 0.001
+        while shell is not None and self._command_line() == shell and self.process.returncode is None:
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 0.05)
+        supervisor.register(self.execution_id, self.process)
+        self._started.set()
+
+    def _command_line(self) -> bytes | None:
+        try:
+            with open(f"/proc/{self.process.pid}/cmdline", "rb") as file:  # changes with the exec
+                return file.read()
+        except OSError:  # gone, or not Linux
+            return None
+
+    async def _pump(self, stream: asyncio.StreamReader, signal_type: RunStatus):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await stream.read(self.chunk_size)
+            text = decoder.decode(chunk, final=not chunk)  # a truncated sequence at EOF becomes U+FFFD
+            if not chunk and not text:
+                return
+            if not text:  # incomplete multibyte sequence, wait for the rest
+                continue
+            if signal_type == RunStatus.OUTPUT:
+                await self._signals.put({"type": RunStatus.OUTPUT, "result": {"output": text}, "reason": None})
+            else:
+                await self._signals.put({"type": RunStatus.EXCEPTION, "result": None, "reason": text})
+
+    async def _pump_all(self):
+        try:
+            await asyncio.gather(
+                self._pump(self.process.stdout, RunStatus.OUTPUT),
+                self._pump(self.process.stderr, RunStatus.EXCEPTION)
+            )
+        finally:
+            await self._signals.put(None)  # both pipes reached EOF
+
+    async def send(self, interaction: Interaction) -> bool:
+        await self._started.wait()  # input may arrive before the engine is up
+        if interaction['type'] != InteractionType.INPUT or self.process.returncode is not None:
+            return False
+        try:
+            self.process.stdin.write(interaction['data'].encode('utf-8'))
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+        return True
+
+    def is_waiting_for_input(self) -> bool:
+        """通过 /proc/{pid}/wchan 判断引擎是否阻塞在读stdin上；无法判断时（非Linux）视为等待中。"""
+        if self.process is None:
+            return False
+        try:
+            with open(f"/proc/{self.process.pid}/wchan") as file:
+                return "pipe_read" in file.read()
+        except OSError:
+            return self.process.returncode is None
+
+    async def wait_for_input_request(self, max_interval: float = 0.1) -> bool:
+        """等待引擎请求输入，进程已结束时返回False。只读取本地/proc，不涉及redis。"""
+        await self._started.wait()
+        interval = 0.005
+        while self.process.returncode is None:
+            if self.is_waiting_for_input():
+                return True
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_interval)
+        return False
+
+    async def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+
+    async def run(self) -> typing.AsyncIterator[Signal]:
+        async with async_engine_slot():  # interactive engines count against the same slots as judged ones
+            await self.setup_runtime()
+            pump_task = asyncio.create_task(self._pump_all())
+            try:
+                yield {
+                    "type": RunStatus.RUNNING,
+                    "result": "Process started",
+                    "reason": None
+                }
+                while (signal := await self._signals.get()) is not None:
+                    yield signal
+                return_code = await self.process.wait()
+                yield {
+                    "type": RunStatus.STOPPED,
+                    "result": {"return_code": return_code},
+                    "reason": None
+                }
+            finally:  # also reached when the consumer stops iterating early
+                pump_task.cancel()
+                await self.kill()
+                supervisor.unregister(self.execution_id)
+                if self.staged is not None:
+                    self.staged.close()
+
+
 class ExecutionManager:
     def __init__(self,
                  source_code,
                  connection_id,
-                 redis_instance: redis.Redis,
-                 logger: loguru.Logger | logging.Logger = None,
+                 redis_instance: redis.asyncio.Redis,
+                 logger: "loguru.Logger" = None,
                  _debug: bool = False
                  ):
         self.connection_id = connection_id  # redis的队列名为connection_id
-        self.executor = CodeExecutor(source_code)
+        self.executor = AsyncCodeExecutor(source_code)
         self.redis_instance = redis_instance
         # 实现通过websocket获得input的功能，假设它将会由fastapi中的ws路由调用且使用celery执行
-        self._input_queue = asyncio.Queue()
-        self.max_taken_amount = 200
+        self.input_channel = InputChannel(redis_instance, connection_id)
+        self.control_channel = InputChannel(redis_instance, connection_id, prefix="control")
+        self.cancelled = False
         self._debug = _debug
 
-    async def fetch_user_input(self):
-        try:
-            items = await self.redis_instance.lpop(
-                f"input_{self.connection_id}",
-                self.max_taken_amount
-            )
-            for item in items:
-                await self._input_queue.put(item.decode('utf-8'))
-        except redis.exceptions.ConnectionError as e:
-            print(repr(e))
+    async def _forward_input(self):
+        while True:
+            data = await self.input_channel.receive()
+            if data is None:  # no input within the session timeout
+                if self.executor.is_waiting_for_input():
+                    await self.executor.kill()
+                    return
+                continue
+            if not await self.executor.wait_for_input_request():
+                return  # process ended, remaining input is meaningless
+            await self.executor.send({
+                "type": InteractionType.INPUT,
+                "data": data
+            })
+
+    async def _watch_control(self):
+        while await self.control_channel.receive() != "cancel":
+            continue  # None on timeout, other operations are not meant for a running engine
+        self.cancelled = True
+        await self.executor._started.wait()  # a cancel may arrive before the engine is up
+        await self.executor.kill()
 
     async def run(self):
-        code_iter: typing.Generator = self.executor.run()
-        interaction = None
-        while (signal := code_iter.send(interaction)) != StopIteration:
-            await self.fetch_user_input()
-            item = await self._input_queue.get()
-            if signal["type"] == RunStatus.OUTPUT:
-                await self.redis_instance.lpush(
-                    f"output_{self.connection_id}",
-                    f"{signal['result'].get('output')}".encode('utf-8')
-                )  # 需要cache优化
-            interaction = {
-                "type": InteractionType.INPUT,
-                "data": item
-            }
-
-
-if __name__ == "__main__":
-    code = \
-        """
-        DECLARE A:INTEGER
-        INPUT A
-        OUTPUT A
-        """
-    code_executor = CodeExecutor(code)
-    for _signal in code_executor.run():
-        print("Signal received:", _signal)
-        # if signal['type'] == RunStatus.OUTPUT and "INPUT" in signal['result']['data']:
-        #     # 当需要输入时，发送输入
-        #
-        #     signal = {"input": user_input}
+        input_task = asyncio.create_task(self._forward_input())
+        control_task = asyncio.create_task(self._watch_control())
+        return_code, reason = None, None
+        try:
+            async with OutputShipper(self.redis_instance, f"output_{self.connection_id}") as shipper:
+                async with contextlib.aclosing(self.executor.run()) as signals:  # kills the engine on early exit
+                    async for signal in signals:
+                        if signal["type"] == RunStatus.OUTPUT:
+                            await shipper.push(f"{signal['result'].get('output')}")
+                        elif signal["type"] == RunStatus.EXCEPTION:  # the engine reports errors on stderr
+                            await shipper.push(signal["reason"])
+                        elif signal["type"] == RunStatus.STOPPED:
+                            return_code = signal["result"]["return_code"]
+        except OutputStalled:
+            reason = "output not consumed"
+        finally:
+            input_task.cancel()
+            control_task.cancel()
+            if self.cancelled:
+                reason = "cancelled"
+            # pushed after the last output chunk, a reader popping both keys sees it last
+            async with self.redis_instance.pipeline(transaction=False) as pipe:
+                pipe.lpush(f"done_{self.connection_id}", json.dumps({"return_code": return_code, "reason": reason}))
+                pipe.expire(f"done_{self.connection_id}", OUTPUT_QUEUE_TTL)
+                await pipe.execute()
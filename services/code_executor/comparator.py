@@ -0,0 +1,124 @@
+"""
+流式输出比较：引擎的stdout按块输入，第一处不一致就给出结论，评测方可以立刻杀死引擎，
+答案错误且仍在大量输出或死循环的程序不再需要跑满时间限制。
+
+- exact:      逐字符完全一致
+- whitespace: 忽略每行行尾空白和末尾空行（与原先的normalize_output相同）
+- token:      按空白切分后逐个token比较，可选浮点误差
+"""
+import enum
+import math
+import typing
+
+
+class CompareMode(str, enum.Enum):
+    EXACT = "exact"
+    WHITESPACE = "whitespace"
+    TOKEN = "token"
+
+
+def _floats_close(actual: str, expected: str, tolerance: float) -> bool:
+    try:
+        a, e = float(actual), float(expected)
+    except ValueError:
+        return False
+    return math.isclose(a, e, rel_tol=tolerance, abs_tol=tolerance)
+
+
+class StreamingComparator:
+    def __init__(self, expected: str, mode: CompareMode = CompareMode.WHITESPACE,
+                 float_tolerance: typing.Optional[float] = None):
+        self.mode = mode
+        self.float_tolerance = float_tolerance
+        self.mismatched = False
+        self._pending = ""  # incomplete line / token carried over to the next chunk
+        self._index = 0  # characters, lines or tokens matched so far
+        if mode == CompareMode.EXACT:
+            self._expected: str | typing.List[str] = expected
+        elif mode == CompareMode.WHITESPACE:
+            lines = [line.rstrip() for line in expected.replace("\r\n", "\n").split("\n")]
+            while lines and lines[-1] == "":
+                lines.pop()
+            self._expected = lines
+        else:
+            self._expected = expected.split()
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next piece of output; False as soon as it can no longer match."""
+        if self.mismatched:
+            return False
+        if self.mode == CompareMode.EXACT:
+            self._feed_exact(chunk)
+        elif self.mode == CompareMode.WHITESPACE:
+            self._feed_lines(chunk)
+        else:
+            self._feed_tokens(chunk)
+        return not self.mismatched
+
+    def finish(self) -> bool:
+        """Output ended; True when everything matched."""
+        if self.mismatched:
+            return False
+        if self.mode == CompareMode.EXACT:
+            return self._index == len(self._expected)
+        if self.mode == CompareMode.WHITESPACE:
+            if self._pending:
+                self._match_line(self._pending.rstrip())
+            return not self.mismatched and self._index >= len(self._expected)
+        if self._pending:
+            self._match_token(self._pending)
+        return not self.mismatched and self._index == len(self._expected)
+
+    def _feed_exact(self, chunk: str):
+        if self._expected[self._index:self._index + len(chunk)] != chunk:
+            self.mismatched = True
+        self._index += len(chunk)
+
+    def _expected_line(self) -> str:
+        # lines past the end of the expected output may only be trailing blank lines
+        return self._expected[self._index] if self._index < len(self._expected) else ""
+
+    def _match_line(self, line: str):
+        if line != self._expected_line():
+            self.mismatched = True
+        self._index += 1
+
+    def _feed_lines(self, chunk: str):
+        *lines, self._pending = (self._pending + chunk.replace("\r\n", "\n")).split("\n")
+        for line in lines:
+            self._match_line(line.rstrip())
+            if self.mismatched:
+                return
+        expected = self._expected_line()
+        if self._pending.startswith(expected) and self._pending[len(expected):].isspace():
+            self._pending = expected + " "  # only trailing spaces so far, no need to keep them all
+        elif not expected.startswith(self._pending) and self._pending.rstrip() != expected:
+            self.mismatched = True
+
+    def _match_token(self, token: str):
+        if self._index >= len(self._expected):
+            self.mismatched = True
+            return
+        expected = self._expected[self._index]
+        if token != expected and not (self.float_tolerance is not None
+                                      and _floats_close(token, expected, self.float_tolerance)):
+            self.mismatched = True
+        self._index += 1
+
+    def _feed_tokens(self, chunk: str):
+        text = self._pending + chunk
+        tokens = text.split()
+        # the last token may continue in the next chunk unless whitespace follows it
+        self._pending = tokens.pop() if tokens and not text[-1].isspace() else ""
+        for token in tokens:
+            self._match_token(token)
+            if self.mismatched:
+                return
+        if not self._pending:
+            return
+        if self._index >= len(self._expected):
+            self.mismatched = True
+        elif self.float_tolerance is None:
+            self.mismatched = not self._expected[self._index].startswith(self._pending)
+        else:  # a float may be printed with more digits than expected, but not endlessly
+            self.mismatched = len(self._pending) > len(self._expected[self._index]) + 32
@@ -0,0 +1,162 @@
+"""
+PseudoEngine2 进程池：提前fork好空闲的引擎槽位，运行时只需把源文件路径交给槽位即可exec引擎。
+
+每个槽位是一个阻塞在 `read` 上的 /bin/sh，它已经带好了stdin/stdout/stderr管道；
+收到源文件路径后直接 `exec` 成引擎，pid与管道保持不变。fork和shell启动的开销因此由后台补充线程提前支付，
+不在运行的关键路径上。exec之后槽位即被消耗，不能复用；空闲过久的槽位会被回收重建。
+池子被取空时现场启动一个槽位；rlimit总是在写入源文件路径（即exec引擎）之前设置在槽位进程上。
+"""
+import atexit
+import os
+import pathlib
+import threading
+import time
+import typing
+from subprocess import PIPE
+
+from services.code_executor.limits import MeasuredPopen, ResourceLimits, apply_limits
+from services.config import ENGINE_POOL_SIZE, ENGINE_POOL_LOW_WATER, ENGINE_POOL_MAX_IDLE
+from utils.logger import logger
+
+# "$0" is the engine path; an empty line or a closed stdin (parent gone) exits without starting the engine
+_PREFORK_SCRIPT = 'read -r source_path && [ -n "$source_path" ] && exec "$0" "$source_path"'
+
+
+def slot_command(engine_path: pathlib.Path) -> typing.List[str]:
+    """A shell waiting for the source path on stdin before it execs the engine."""
+    return ['/bin/sh', '-c', _PREFORK_SCRIPT, str(engine_path)]
+
+
+def start_slot(process: MeasuredPopen, source_path: pathlib.Path, limits: ResourceLimits | None = None):
+    """Limit a waiting slot, then let it exec the engine; the limits are inherited through exec."""
+    if limits is not None:
+        apply_limits(process.pid, limits)
+    process.stdin.write(f"{source_path}\n")
+    process.stdin.flush()
+
+
+def spawn_engine(engine_path: pathlib.Path,
+                 source_path: pathlib.Path,
+                 limits: ResourceLimits | None = None) -> MeasuredPopen:
+    """Start the engine right away; used when no idle slot is available."""
+    if limits is None:  # nothing to set up before exec, skip the shell
+        return MeasuredPopen([str(engine_path), str(source_path)], stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True)
+    process = MeasuredPopen(slot_command(engine_path), stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True)
+    try:
+        start_slot(process, source_path, limits)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    return process
+
+
+class EngineSlot(typing.NamedTuple):
+    process: MeasuredPopen
+    created_at: float
+
+
+class EnginePool:
+    def __init__(self,
+                 engine_path: pathlib.Path,
+                 size: int = ENGINE_POOL_SIZE,
+                 low_water: int = ENGINE_POOL_LOW_WATER,
+                 max_idle: float = ENGINE_POOL_MAX_IDLE
+                 ):
+        self.engine_path = engine_path
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.max_idle = max_idle
+        self._idle: typing.List[EngineSlot] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._maintainer = threading.Thread(target=self._maintain, name="engine-pool", daemon=True)
+        self._maintainer.start()
+
+    def _spawn_slot(self) -> EngineSlot:
+        process = MeasuredPopen(slot_command(self.engine_path), stdin=PIPE, stdout=PIPE, stderr=PIPE, text=True)
+        return EngineSlot(process, time.monotonic())
+
+    def acquire(self, source_path: pathlib.Path, limits: ResourceLimits | None = None) -> MeasuredPopen:
+        """Return a running engine process for `source_path`, taken from the idle slots when possible."""
+        while True:
+            with self._cond:
+                slot = self._idle.pop() if self._idle else None
+                if len(self._idle) < self.low_water:
+                    self._cond.notify()
+            if slot is None:
+                return spawn_engine(self.engine_path, source_path, limits)
+            if slot.process.poll() is not None:  # died while idle
+                continue
+            try:
+                start_slot(slot.process, source_path, limits)
+            except (BrokenPipeError, OSError):
+                slot.process.kill()
+                slot.process.wait()
+                continue
+            return slot.process
+
+    def _recycle_stale(self):
+        now = time.monotonic()
+        with self._cond:
+            stale = [slot for slot in self._idle if now - slot.created_at > self.max_idle]
+            self._idle = [slot for slot in self._idle if now - slot.created_at <= self.max_idle]
+        for slot in stale:
+            self._discard(slot)
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) >= self.size:
+                    return
+            try:
+                slot = self._spawn_slot()
+            except OSError as e:
+                logger.error(f"Failed to pre-spawn engine slot: {repr(e)}")
+                return
+            with self._cond:
+                self._idle.append(slot)
+
+    def _maintain(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._idle) < self.low_water, timeout=self.max_idle)
+                if self._closed:
+                    return
+            self._recycle_stale()
+            self._fill()
+
+    @staticmethod
+    def _discard(slot: EngineSlot):
+        slot.process.stdin.close()  # the slot sees EOF and exits by itself
+        slot.process.wait()
+        slot.process.stdout.close()
+        slot.process.stderr.close()
+
+    def idle_count(self) -> int:
+        with self._cond:
+            return len(self._idle)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for slot in idle:
+            self._discard(slot)
+
+
+_pool: EnginePool | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def get_engine_pool(engine_path: pathlib.Path) -> EnginePool:
+    """Process-wide pool; re-created after a fork because the maintainer thread does not survive it."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = EnginePool(engine_path)
+            _pool_pid = os.getpid()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,102 @@
+"""
+评测引擎后端：judge_sample只依赖EngineBackend.communicate，由JUDGE_ENGINE选择具体实现。
+
+- external:    PseudoEngine2子进程（CodeExecutor），占用一个引擎槽位
+- interpreter: 进程内解释器，不启动子进程；CPU时间按步数预算限制，内存按数组与字符串的分配计数
+- auto:        优先使用解释器，源码用到解释器未实现的语法或解释器认为有语法错误时改用外部引擎
+"""
+import abc
+import mmap
+
+from services.code_executor.code_manager import CodeExecutor, CommunicateResult
+from services.code_executor.comparator import StreamingComparator
+from services.code_executor.interpreter import compile_program, PseudoSyntaxError, StepBudgetExceeded, \
+    MemoryBudgetExceeded
+from services.code_executor.limits import ResourceLimits
+from services.code_executor.slots import engine_slot
+from services.config import JUDGE_ENGINE, INTERPRETER_STEPS_PER_SECOND
+
+
+class EngineBackend(abc.ABC):
+    @abc.abstractmethod
+    def communicate(self, source_code: str, input_data: str | bytes | mmap.mmap, limits: ResourceLimits,
+                    timeout: float, comparator: StreamingComparator | None = None) -> CommunicateResult:
+        """Run the source once on input_data; same contract as CodeExecutor.communicate."""
+
+
+class ExternalEngine(EngineBackend):
+    def communicate(self, source_code, input_data, limits, timeout, comparator=None):
+        with engine_slot():
+            return CodeExecutor(source_code, limits).communicate(input_data, timeout=timeout, comparator=comparator)
+
+
+class InterpreterEngine(EngineBackend):
+    def communicate(self, source_code, input_data, limits, timeout, comparator=None):
+        try:
+            program = compile_program(source_code)
+        except PseudoSyntaxError as e:  # unsupported syntax included, reported like an engine error
+            return self._result(False, "", str(e), False, None, 0, 0)
+        if not isinstance(input_data, str):
+            input_data = bytes(input_data).decode(errors="replace")
+
+        output = []
+        if comparator is None:
+            def write(text: str) -> bool:
+                output.append(text)
+                return True
+        else:
+            write = comparator.feed
+
+        outcome = program.run(input_data, write, max_steps=int(limits.cpu_time * INTERPRETER_STEPS_PER_SECOND),
+                              max_memory=limits.memory * 1024 * 1024)
+        cpu_time = round(outcome.cpu_time * 1000)
+        timed_out = isinstance(outcome.error, StepBudgetExceeded)
+        matched = None
+        if comparator is not None and not timed_out:  # same rules as CodeExecutor.communicate
+            matched = False if outcome.rejected else comparator.finish() if outcome.error is None else None
+        peak_memory = outcome.peak_memory // 1024
+        if isinstance(outcome.error, MemoryBudgetExceeded):  # reported through the usage, like a real MLE
+            peak_memory = max(peak_memory, limits.memory * 1024 + 1)
+        error = str(outcome.error) if outcome.error is not None else ""
+        return self._result(outcome.error is None, "".join(output), error, timed_out, matched, cpu_time, peak_memory)
+
+    @staticmethod
+    def _result(good: bool, result: str, error: str, timed_out: bool, matched: bool | None,
+                cpu_time: int, peak_memory: int) -> CommunicateResult:
+        return {
+            "process_id": 0,  # nothing was spawned
+            "good": good,
+            "result": result,
+            "error": error,
+            "return_code": 0 if good else 1,
+            "timed_out": timed_out,
+            "matched": matched,
+            "usage": {"cpu_time": cpu_time, "peak_memory": peak_memory}
+        }
+
+
+class AutoEngine(EngineBackend):
+    def __init__(self):
+        self.interpreter = InterpreterEngine()
+        self.external = ExternalEngine()
+
+    def communicate(self, source_code, input_data, limits, timeout, comparator=None):
+        try:
+            compile_program(source_code)  # cached, the interpreter gets the same object back
+        except PseudoSyntaxError:  # unsupported syntax, or an error the engine reports in its own words
+            return self.external.communicate(source_code, input_data, limits, timeout, comparator)
+        return self.interpreter.communicate(source_code, input_data, limits, timeout, comparator)
+
+
+ENGINES = {
+    "external": ExternalEngine,
+    "interpreter": InterpreterEngine,
+    "auto": AutoEngine
+}
+_instances: dict[str, EngineBackend] = {}
+
+
+def get_engine(name: str = JUDGE_ENGINE) -> EngineBackend:
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
@@ -0,0 +1,30 @@
+"""
+交互式运行的输入通道：用BLPOP阻塞等待 `input_{connection_id}`，只有输入到达时才会唤醒，
+空闲会话不会再对redis产生任何轮询负载。生产者应使用RPUSH以保证输入顺序。
+同样的通道也用于运行的控制消息（`control_{connection_id}`，例如取消）。
+"""
+import typing
+
+import redis.asyncio
+
+from services.config import INPUT_SESSION_TIMEOUT
+
+
+class InputChannel:
+    def __init__(self,
+                 redis_instance: redis.asyncio.Redis,
+                 connection_id: str,
+                 timeout: float = INPUT_SESSION_TIMEOUT,
+                 prefix: str = "input"
+                 ):
+        self.redis_instance = redis_instance
+        self.key = f"{prefix}_{connection_id}"
+        self.timeout = timeout
+
+    async def receive(self) -> typing.Optional[str]:
+        """Block until one input item arrives; None when the session timeout elapses first."""
+        item = await self.redis_instance.blpop([self.key], timeout=self.timeout)
+        if item is None:
+            return None
+        _, data = item
+        return data.decode('utf-8') if isinstance(data, bytes) else data
@@ -0,0 +1,13 @@
+"""
+进程内的CAIE伪代码解释器：源码解析为语法树后编译成Python闭包，直接在评测线程中运行，
+省去每个样例启动一次外部引擎进程的开销。
+
+只实现评测题目常用的子集（变量、数组、选择、循环、过程与函数、常用字符串和数学函数）；
+遇到未实现的语法（CASE、TYPE、文件操作、未实现的内置函数等）抛出UnsupportedFeature，由调用方改用外部引擎。
+CPU时间与内存由步数预算和分配计数近似，不依赖进程级的rlimit。
+"""
+from services.code_executor.interpreter.compiler import CompiledProgram, RunOutcome, compile_program
+from services.code_executor.interpreter.errors import PseudoError, PseudoSyntaxError, UnsupportedFeature, \
+    PseudoRuntimeError, StepBudgetExceeded, MemoryBudgetExceeded
+from services.code_executor.interpreter.parser import parse
+from services.code_executor.interpreter.linter import linter
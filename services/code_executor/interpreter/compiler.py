@@ -0,0 +1,622 @@
+"""
+把语法树编译成嵌套的Python闭包：每个节点在编译时只处理一次（运算符分派、字面量、参数个数检查都在这里完成），
+运行时只剩闭包调用，不再遍历语法树。
+
+语句闭包返回None表示继续执行，返回_Returned表示RETURN；每执行一条语句、每次循环迭代都消耗一步预算。
+
+伪代码的一层调用对应若干层嵌套的Python调用（语句块、IF/WHILE、表达式），程序在单独的线程中运行，
+线程栈和递归上限按INTERPRETER_MAX_CALL_DEPTH放大，调用深度只由伪代码的计数限制。
+"""
+import functools
+import sys
+import threading
+import time
+import typing
+
+from services.code_executor.interpreter import nodes
+from services.code_executor.interpreter.parser import parse
+from services.code_executor.interpreter.errors import PseudoRuntimeError, PseudoSyntaxError, StepBudgetExceeded, \
+    UnsupportedFeature
+from services.code_executor.interpreter.runtime import DEFAULTS, Array, Cell, Context, ElementCell, Frame, \
+    OutputRejected, coerce, format_value, type_name
+from services.config import INTERPRETER_CACHE_SIZE, INTERPRETER_MAX_CALL_DEPTH, INTERPRETER_STACK_SIZE
+
+PYTHON_FRAMES_PER_CALL = 100  # Python frames one pseudocode call may nest, blocks and expressions included
+_stack_lock = threading.Lock()  # threading.stack_size applies to every thread started while it is set
+
+Closure = typing.Callable[[Frame], typing.Any]
+
+
+class _Returned:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _number(value, line: int):
+    if type(value) is not int and type(value) is not float:
+        raise PseudoRuntimeError(f"Expected a number but got {type_name(value)}", line)
+    return value
+
+
+def _integer(value, line: int) -> int:
+    if type(value) is not int:
+        raise PseudoRuntimeError(f"Expected an INTEGER but got {type_name(value)}", line)
+    return value
+
+
+def _string(value, line: int) -> str:
+    if type(value) is not str:
+        raise PseudoRuntimeError(f"Expected a STRING but got {type_name(value)}", line)
+    return value
+
+
+def _boolean(value, line: int) -> bool:
+    if type(value) is not bool:
+        raise PseudoRuntimeError(f"Expected a BOOLEAN but got {type_name(value)}", line)
+    return value
+
+
+def _div(a, b, line: int) -> int:
+    a, b = _number(a, line), _number(b, line)
+    if b == 0:
+        raise PseudoRuntimeError("Division by zero", line)
+    return int(a / b)  # truncates toward zero
+
+
+def _mod(a, b, line: int):
+    a, b = _number(a, line), _number(b, line)
+    if b == 0:
+        raise PseudoRuntimeError("Division by zero", line)
+    return a - b * int(a / b)
+
+
+def _divide(a, b, line: int) -> float:
+    a, b = _number(a, line), _number(b, line)
+    if b == 0:
+        raise PseudoRuntimeError("Division by zero", line)
+    return a / b
+
+
+def _power(a, b, line: int):
+    a, b = _number(a, line), _number(b, line)
+    if type(a) is int and type(b) is int and b >= 0:
+        return a ** b
+    try:
+        return float(a) ** b
+    except (OverflowError, ZeroDivisionError) as e:
+        raise PseudoRuntimeError(f"Invalid power: {e}", line)
+
+
+def _compare(op: str, a, b, line: int) -> bool:
+    numeric_a, numeric_b = type(a) in (int, float), type(b) in (int, float)
+    if not (numeric_a and numeric_b) and type(a) is not type(b):
+        raise PseudoRuntimeError(f"Cannot compare {type_name(a)} with {type_name(b)}", line)
+    if type(a) is bool and op not in ("=", "<>"):
+        raise PseudoRuntimeError("BOOLEAN values can only be compared with = or <>", line)
+    if op == "=":
+        return a == b
+    if op == "<>":
+        return a != b
+    if op == "<":
+        return a < b
+    if op == ">":
+        return a > b
+    if op == "<=":
+        return a <= b
+    return a >= b
+
+
+def _substring(text, start, length, line: int) -> str:
+    text, start, length = _string(text, line), _integer(start, line), _integer(length, line)
+    if start < 1 or length < 0 or start + length - 1 > len(text):
+        raise PseudoRuntimeError("Substring out of range", line)
+    return text[start - 1:start - 1 + length]
+
+
+def _left(text, length, line: int) -> str:
+    text, length = _string(text, line), _integer(length, line)
+    if not 0 <= length <= len(text):
+        raise PseudoRuntimeError("Substring out of range", line)
+    return text[:length]
+
+
+def _right(text, length, line: int) -> str:
+    text, length = _string(text, line), _integer(length, line)
+    if not 0 <= length <= len(text):
+        raise PseudoRuntimeError("Substring out of range", line)
+    return text[len(text) - length:]
+
+
+def _str_to_num(text, line: int):
+    text = _string(text, line).strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        raise PseudoRuntimeError(f"{text!r} is not a number", line)
+
+
+def _is_num(text, line: int) -> bool:
+    try:
+        _str_to_num(text, line)
+    except PseudoRuntimeError:
+        return False
+    return True
+
+
+def _chr(code, line: int) -> str:
+    try:
+        return chr(_integer(code, line))
+    except ValueError:
+        raise PseudoRuntimeError(f"{code} is not a character code", line)
+
+
+def _asc(char, line: int) -> int:
+    char = _string(char, line)
+    if len(char) != 1:
+        raise PseudoRuntimeError("ASC expects a CHAR", line)
+    return ord(char)
+
+
+# name: (number of arguments, implementation taking the evaluated arguments and the line)
+BUILTINS: typing.Dict[str, typing.Tuple[int, typing.Callable]] = {
+    "LENGTH": (1, lambda s, line: len(_string(s, line))),
+    "LEFT": (2, _left),
+    "RIGHT": (2, _right),
+    "MID": (3, _substring),
+    "SUBSTRING": (3, _substring),
+    "ONECHAR": (2, lambda s, i, line: _substring(s, i, 1, line)),
+    "LCASE": (1, lambda s, line: _string(s, line).lower()),
+    "UCASE": (1, lambda s, line: _string(s, line).upper()),
+    "TO_LOWER": (1, lambda s, line: _string(s, line).lower()),
+    "TO_UPPER": (1, lambda s, line: _string(s, line).upper()),
+    "INT": (1, lambda x, line: int(_number(x, line))),
+    "ROUND": (2, lambda x, places, line: round(float(_number(x, line)), _integer(places, line))),
+    "MOD": (2, _mod),
+    "DIV": (2, _div),
+    "NUM_TO_STR": (1, lambda x, line: format_value(_number(x, line))),
+    "STR_TO_NUM": (1, _str_to_num),
+    "IS_NUM": (1, _is_num),
+    "ASC": (1, _asc),
+    "CHR": (1, _chr),
+}
+
+
+def _parse_input(text: str, type_: str, line: int):
+    try:
+        if type_ == "INTEGER":
+            return int(text.strip())
+        if type_ == "REAL":
+            return float(text.strip())
+        if type_ == "BOOLEAN" and text.strip().upper() in ("TRUE", "FALSE"):
+            return text.strip().upper() == "TRUE"
+        if type_ == "CHAR" and len(text) == 1:
+            return text
+        if type_ == "STRING":
+            return text
+    except ValueError:
+        pass
+    raise PseudoRuntimeError(f"Cannot read {text!r} as {type_}", line)
+
+
+class Compiler:
+    def __init__(self, program: nodes.Program, max_call_depth: int):
+        self.program = program
+        self.max_call_depth = max_call_depth
+        self.routines: typing.Dict[str, typing.Callable] = {}  # filled before anything runs
+
+    def compile(self) -> Closure:
+        for name, routine in self.program.routines.items():
+            if name.upper() in BUILTINS:  # whether a built-in may be redefined is up to the engine
+                raise UnsupportedFeature(f"{name} is a built-in function", routine.line)
+            self.routines[name] = self._routine(routine)
+        return self.block(self.program.body)
+
+    # --- statements ---
+
+    def block(self, statements: typing.List[nodes.Stmt]) -> Closure:
+        compiled = [(self.statement(statement), statement.line) for statement in statements]
+
+        def run_block(frame: Frame):
+            context = frame.context
+            for statement, line in compiled:
+                context.steps -= 1
+                if context.steps < 0:
+                    raise StepBudgetExceeded("Step budget exceeded", line)
+                result = statement(frame)
+                if result is not None:
+                    return result
+            return None
+
+        return run_block
+
+    def statement(self, node: nodes.Stmt) -> Closure:
+        method = getattr(self, f"_{type(node).__name__.lower()}")
+        return method(node)
+
+    def _declare(self, node: nodes.Declare) -> Closure:
+        names, base, line = node.names, node.type.base, node.line
+        if node.type.bounds is None:
+            def declare(frame: Frame):
+                for name in names:
+                    frame.declare(name, Cell(DEFAULTS[base], base), line)
+            return declare
+        bounds = [(self.expression(low), self.expression(high)) for low, high in node.type.bounds]
+
+        def declare_array(frame: Frame):
+            evaluated = [(_integer(low(frame), line), _integer(high(frame), line)) for low, high in bounds]
+            for name in names:
+                frame.declare(name, Cell(Array(base, evaluated, frame.context, line), "ARRAY"), line)
+        return declare_array
+
+    def _constant(self, node: nodes.Constant) -> Closure:
+        name, value, line = node.name, self.expression(node.value), node.line
+
+        def constant(frame: Frame):
+            evaluated = value(frame)
+            frame.declare(name, Cell(evaluated, type_name(evaluated), constant=True), line)
+        return constant
+
+    def _assign(self, node: nodes.Assign) -> Closure:
+        value, line = self.expression(node.value), node.line
+        target = node.target
+        if isinstance(target, nodes.Name):
+            name = target.name
+
+            def assign(frame: Frame):
+                cell = frame.cell(name, line)
+                if cell.constant:
+                    raise PseudoRuntimeError(f"Cannot assign to constant {name}", line)
+                if cell.type == "ARRAY":
+                    raise PseudoRuntimeError(f"Cannot assign to array {name} as a whole", line)
+                result = value(frame)
+                if type(result) is str:
+                    frame.context.check_string(result, line)
+                cell.value = coerce(cell.type, result, line)
+            return assign
+        name, indices = target.name, [self.expression(index) for index in target.indices]
+
+        def assign_element(frame: Frame):
+            array = _array(frame.cell(name, line), name, line)
+            array.set([index(frame) for index in indices], value(frame), line)
+        return assign_element
+
+    def _input(self, node: nodes.Input) -> Closure:
+        target, line = node.target, node.line
+        if isinstance(target, nodes.Name):
+            name = target.name
+
+            def read(frame: Frame):
+                cell = frame.cell(name, line)
+                if cell.constant or cell.type == "ARRAY":
+                    raise PseudoRuntimeError(f"Cannot INPUT into {name}", line)
+                cell.value = _parse_input(frame.context.read_line(line), cell.type, line)
+            return read
+        name, indices = target.name, [self.expression(index) for index in target.indices]
+
+        def read_element(frame: Frame):
+            array = _array(frame.cell(name, line), name, line)
+            evaluated = [index(frame) for index in indices]
+            array.set(evaluated, _parse_input(frame.context.read_line(line), array.type, line), line)
+        return read_element
+
+    def _output(self, node: nodes.Output) -> Closure:
+        values = [self.expression(value) for value in node.values]
+
+        def output(frame: Frame):
+            frame.context.output("".join([format_value(value(frame)) for value in values]) + "\n")
+        return output
+
+    def _if(self, node: nodes.If) -> Closure:
+        condition, line = self.expression(node.condition), node.line
+        then_body, else_body = self.block(node.then_body), self.block(node.else_body)
+
+        def branch(frame: Frame):
+            if _boolean(condition(frame), line):
+                return then_body(frame)
+            return else_body(frame)
+        return branch
+
+    def _while(self, node: nodes.While) -> Closure:
+        condition, body, line = self.expression(node.condition), self.block(node.body), node.line
+
+        def loop(frame: Frame):
+            context = frame.context
+            while _boolean(condition(frame), line):
+                context.step(line)
+                result = body(frame)
+                if result is not None:
+                    return result
+            return None
+        return loop
+
+    def _repeat(self, node: nodes.Repeat) -> Closure:
+        condition, body, line = self.expression(node.condition), self.block(node.body), node.line
+
+        def loop(frame: Frame):
+            context = frame.context
+            while True:
+                context.step(line)
+                result = body(frame)
+                if result is not None:
+                    return result
+                if _boolean(condition(frame), line):
+                    return None
+        return loop
+
+    def _for(self, node: nodes.For) -> Closure:
+        name, line = node.variable, node.line
+        start, end = self.expression(node.start), self.expression(node.end)
+        step = self.expression(node.step) if node.step is not None else None
+        body = self.block(node.body)
+
+        def loop(frame: Frame):
+            context = frame.context
+            cell = frame.vars.get(name) or frame.globals.get(name)
+            if cell is None:  # an undeclared loop counter is taken as a local INTEGER
+                cell = Cell(0, "INTEGER")
+                frame.vars[name] = cell
+            if cell.constant or cell.type not in ("INTEGER", "REAL"):
+                raise PseudoRuntimeError(f"{name} cannot be used as a loop counter", line)
+            value, last = _number(start(frame), line), _number(end(frame), line)
+            increment = _number(step(frame), line) if step is not None else 1
+            if increment == 0:
+                raise PseudoRuntimeError("STEP must not be 0", line)
+            while (value <= last) if increment > 0 else (value >= last):
+                context.step(line)
+                cell.value = coerce(cell.type, value, line)
+                result = body(frame)
+                if result is not None:
+                    return result
+                value += increment
+            return None
+        return loop
+
+    def _callstatement(self, node: nodes.CallStatement) -> Closure:
+        call = self._call(node.name, node.args, node.line, procedure=True)
+
+        def call_statement(frame: Frame):
+            call(frame)
+        return call_statement
+
+    def _return(self, node: nodes.Return) -> Closure:
+        if node.value is None:
+            returned = _Returned(None)
+
+            def return_nothing(frame: Frame):
+                return returned
+            return return_nothing
+        value = self.expression(node.value)
+
+        def return_(frame: Frame):
+            return _Returned(value(frame))
+        return return_
+
+    # --- routines ---
+
+    def _routine(self, routine: nodes.Routine) -> typing.Callable:
+        body = self.block(routine.body)
+        params, returns, line = routine.params, routine.returns, routine.line
+        max_depth = self.max_call_depth
+
+        def invoke(frame: Frame, args: typing.List[typing.Any], call_line: int):
+            if frame.depth >= max_depth:
+                raise PseudoRuntimeError("Stack overflow", call_line)
+            callee = Frame(frame.context, frame.globals, frame.depth + 1)
+            for param, arg in zip(params, args):
+                if param.by_ref:  # arg is a Cell / ElementCell
+                    if param.type.bounds is not None and arg.type != "ARRAY":
+                        raise PseudoRuntimeError(f"{param.name} expects an ARRAY", call_line)
+                    callee.vars[param.name] = arg
+                elif param.type.bounds is not None:
+                    array = coerce("ARRAY", arg, call_line)
+                    callee.vars[param.name] = Cell(array.copy(frame.context, call_line), "ARRAY")
+                else:
+                    callee.vars[param.name] = Cell(coerce(param.type.base, arg, call_line), param.type.base)
+            result = body(callee)
+            if returns is None:
+                return None
+            if result is None:
+                raise PseudoRuntimeError(f"FUNCTION {routine.name} ended without RETURN", line)
+            return coerce(returns.base, result.value, line)
+
+        invoke.routine = routine
+        return invoke
+
+    def _call(self, name: str, args: typing.List[nodes.Expr], line: int, procedure: bool) -> Closure:
+        routine = self.program.routines.get(name)
+        if routine is None:
+            if procedure:
+                raise PseudoSyntaxError(f"{name} is not defined", line)
+            if name.upper() not in BUILTINS:  # DAY, TODAY, SQRT, ... may still be built into the engine
+                raise UnsupportedFeature(f"Function {name} is not supported", line)
+            arity, implementation = BUILTINS[name.upper()]
+            if len(args) != arity:
+                raise PseudoSyntaxError(f"{name} expects {arity} arguments but got {len(args)}", line)
+            compiled = [self.expression(arg) for arg in args]
+
+            def call_builtin(frame: Frame):
+                return implementation(*[arg(frame) for arg in compiled], line)
+            return call_builtin
+
+        if procedure != (routine.returns is None):
+            kind = "PROCEDURE" if routine.returns is None else "FUNCTION"
+            raise PseudoSyntaxError(f"{name} is a {kind}", line)
+        if len(args) != len(routine.params):
+            raise PseudoSyntaxError(f"{name} expects {len(routine.params)} arguments but got {len(args)}", line)
+        compiled = []
+        for param, arg in zip(routine.params, args):
+            if param.by_ref:
+                if not isinstance(arg, (nodes.Name, nodes.Index)):
+                    raise PseudoSyntaxError(f"BYREF parameter {param.name} needs a variable", line)
+                compiled.append(self._reference(arg))
+            else:
+                compiled.append(self.expression(arg))
+        routines = self.routines
+
+        def call_routine(frame: Frame):
+            return routines[name](frame, [arg(frame) for arg in compiled], line)
+        return call_routine
+
+    def _reference(self, target: nodes.Target) -> Closure:
+        name, line = target.name, target.line
+        if isinstance(target, nodes.Name):
+            def reference(frame: Frame):
+                cell = frame.cell(name, line)
+                if cell.constant:
+                    raise PseudoRuntimeError(f"Constant {name} cannot be passed BYREF", line)
+                return cell
+            return reference
+        indices = [self.expression(index) for index in target.indices]
+
+        def element_reference(frame: Frame):
+            array = _array(frame.cell(name, line), name, line)
+            evaluated = [index(frame) for index in indices]
+            array.offset(evaluated, line)  # bounds are checked at the call
+            return ElementCell(array, evaluated, line)
+        return element_reference
+
+    # --- expressions ---
+
+    def expression(self, node: nodes.Expr) -> Closure:
+        line = node.line
+        if isinstance(node, nodes.Literal):
+            value = node.value
+            return lambda frame: value
+        if isinstance(node, nodes.Name):
+            name = node.name
+
+            def variable(frame: Frame):
+                cell = frame.vars.get(name)
+                if cell is None:
+                    cell = frame.cell(name, line)
+                return cell.value
+            return variable
+        if isinstance(node, nodes.Index):
+            name, indices = node.name, [self.expression(index) for index in node.indices]
+            if len(indices) == 1:
+                index = indices[0]
+
+                def element(frame: Frame):
+                    return _array(frame.cell(name, line), name, line).get([index(frame)], line)
+                return element
+
+            def element_nd(frame: Frame):
+                return _array(frame.cell(name, line), name, line).get([index(frame) for index in indices], line)
+            return element_nd
+        if isinstance(node, nodes.Call):
+            return self._call(node.name, node.args, line, procedure=False)
+        if isinstance(node, nodes.Unary):
+            operand = self.expression(node.operand)
+            if node.op == "NOT":
+                return lambda frame: not _boolean(operand(frame), line)
+            if node.op == "-":
+                return lambda frame: -_number(operand(frame), line)
+            return lambda frame: _number(operand(frame), line)
+        return self._binary(node)
+
+    def _binary(self, node: nodes.Binary) -> Closure:
+        op, line = node.op, node.line
+        left, right = self.expression(node.left), self.expression(node.right)
+        if op == "AND":
+            return lambda frame: _boolean(left(frame), line) and _boolean(right(frame), line)
+        if op == "OR":
+            return lambda frame: _boolean(left(frame), line) or _boolean(right(frame), line)
+        if op == "+":
+            return lambda frame: _number(left(frame), line) + _number(right(frame), line)
+        if op == "-":
+            return lambda frame: _number(left(frame), line) - _number(right(frame), line)
+        if op == "*":
+            return lambda frame: _number(left(frame), line) * _number(right(frame), line)
+        if op == "/":
+            return lambda frame: _divide(left(frame), right(frame), line)
+        if op == "DIV":
+            return lambda frame: _div(left(frame), right(frame), line)
+        if op == "MOD":
+            return lambda frame: _mod(left(frame), right(frame), line)
+        if op == "^":
+            return lambda frame: _power(left(frame), right(frame), line)
+        if op == "&":
+            def concat(frame: Frame):
+                result = _string(left(frame), line) + _string(right(frame), line)
+                frame.context.check_string(result, line)
+                return result
+            return concat
+        return lambda frame: _compare(op, left(frame), right(frame), line)
+
+
+def _array(cell: Cell, name: str, line: int) -> Array:
+    if cell.type != "ARRAY":
+        raise PseudoRuntimeError(f"{name} is not an array", line)
+    return cell.value
+
+
+class RunOutcome(typing.NamedTuple):
+    error: typing.Optional[PseudoRuntimeError]  # None when the program ran to its end
+    rejected: bool  # stopped because the output sink refused more output
+    peak_memory: int  # bytes charged for arrays and strings
+    cpu_time: float = 0.0  # seconds of CPU time of the thread that ran the program
+
+
+class CompiledProgram:
+    def __init__(self, program: nodes.Program, max_call_depth: int):
+        self._main = Compiler(program, max_call_depth).compile()
+        self._max_call_depth = max_call_depth
+
+    def run(self, stdin: str, write: typing.Callable[[str], bool], max_steps: int, max_memory: int) -> RunOutcome:
+        return _on_deep_stack(functools.partial(self._run, Context(stdin, write, max_steps, max_memory)),
+                              self._max_call_depth)
+
+    def _run(self, context: Context) -> RunOutcome:
+        started = time.thread_time()
+        outcome = self._execute(context)
+        return outcome._replace(cpu_time=time.thread_time() - started)
+
+    def _execute(self, context: Context) -> RunOutcome:
+        try:
+            self._main(Frame(context))
+        except OutputRejected:
+            return RunOutcome(None, True, context.peak_memory)
+        except PseudoRuntimeError as e:
+            return RunOutcome(e, False, context.peak_memory)
+        except RecursionError:  # only for blocks nested beyond PYTHON_FRAMES_PER_CALL
+            return RunOutcome(PseudoRuntimeError("Stack overflow"), False, context.peak_memory)
+        return RunOutcome(None, False, context.peak_memory)
+
+
+def _on_deep_stack(function: typing.Callable[[], RunOutcome], max_call_depth: int) -> RunOutcome:
+    """Run `function` on a new thread whose stack holds max_call_depth pseudocode calls."""
+    needed = (max_call_depth + 1) * PYTHON_FRAMES_PER_CALL
+    if sys.getrecursionlimit() < needed:  # the limit is per thread, other threads keep their own depth
+        sys.setrecursionlimit(needed)
+    result: typing.List[RunOutcome] = []
+    error: typing.List[BaseException] = []
+
+    def target():
+        try:
+            result.append(function())
+        except BaseException as e:
+            error.append(e)
+
+    with _stack_lock:
+        previous = threading.stack_size(INTERPRETER_STACK_SIZE)
+        try:
+            thread = threading.Thread(target=target, name="interpreter", daemon=True)
+            thread.start()
+        finally:
+            threading.stack_size(previous)
+    thread.join()
+    if error:
+        raise error[0]
+    return result[0]
+
+
+@functools.lru_cache(maxsize=INTERPRETER_CACHE_SIZE)
+def compile_program(source: str) -> CompiledProgram:
+    """Parse and compile once per distinct source; every sample of a submission reuses the result."""
+    return CompiledProgram(parse(source), INTERPRETER_MAX_CALL_DEPTH)
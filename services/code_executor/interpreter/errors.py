@@ -0,0 +1,28 @@
+class PseudoError(Exception):
+    def __init__(self, message: str, line: int | None = None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+    def __str__(self):
+        return f"Line {self.line}: {self.message}" if self.line is not None else self.message
+
+
+class PseudoSyntaxError(PseudoError):
+    pass
+
+
+class UnsupportedFeature(PseudoSyntaxError):
+    """Valid pseudocode this interpreter does not implement; the external engine should run it instead."""
+
+
+class PseudoRuntimeError(PseudoError):
+    pass
+
+
+class StepBudgetExceeded(PseudoRuntimeError):
+    pass
+
+
+class MemoryBudgetExceeded(PseudoRuntimeError):
+    pass
@@ -0,0 +1,133 @@
+"""
+提交前的语法预检：在入队之前用解释器的解析器检查源码，语法错误（块不配对、DECLARE写法错误、未声明的标识符、
+调用未定义的过程或参数个数不符）直接返回给用户，不再占用队列、写文件和启动引擎。
+
+结果按源码的哈希缓存；只有确定是错误时才拒绝，解释器未实现的语法、不认识的字符和内置函数一律放行，交给外部引擎判断。
+标识符不区分大小写（由词法分析统一拼写）。
+"""
+import collections
+import hashlib
+import threading
+import typing
+
+from services.code_executor.interpreter import nodes
+from services.code_executor.interpreter.compiler import Compiler
+from services.code_executor.interpreter.errors import PseudoSyntaxError, UnsupportedFeature
+from services.code_executor.interpreter.parser import parse
+from services.code_executor.verdict_cache import normalize_source
+from services.config import INTERPRETER_MAX_CALL_DEPTH, LINT_CACHE_SIZE
+
+
+def _declared(statements: typing.List[nodes.Stmt], names: typing.Set[str]) -> typing.Set[str]:
+    """Every name a block (and the blocks nested in it) declares, a FOR counter included."""
+    for statement in statements:
+        if isinstance(statement, nodes.Declare):
+            names.update(statement.names)
+        elif isinstance(statement, nodes.Constant):
+            names.add(statement.name)
+        elif isinstance(statement, nodes.For):
+            names.add(statement.variable)
+            _declared(statement.body, names)
+        elif isinstance(statement, nodes.If):
+            _declared(statement.then_body, names)
+            _declared(statement.else_body, names)
+        elif isinstance(statement, (nodes.While, nodes.Repeat)):
+            _declared(statement.body, names)
+    return names
+
+
+def _check_expression(expression: nodes.Expr, names: typing.Set[str]):
+    if isinstance(expression, (nodes.Name, nodes.Index)):
+        if expression.name not in names:
+            raise PseudoSyntaxError(f"{expression.name} is not declared", expression.line)
+        if isinstance(expression, nodes.Index):
+            for index in expression.indices:
+                _check_expression(index, names)
+    elif isinstance(expression, nodes.Unary):
+        _check_expression(expression.operand, names)
+    elif isinstance(expression, nodes.Binary):
+        _check_expression(expression.left, names)
+        _check_expression(expression.right, names)
+    elif isinstance(expression, nodes.Call):
+        for arg in expression.args:
+            _check_expression(arg, names)
+
+
+def _check_block(statements: typing.List[nodes.Stmt], names: typing.Set[str]):
+    for statement in statements:
+        if isinstance(statement, nodes.Declare):
+            for low, high in statement.type.bounds or []:
+                _check_expression(low, names)
+                _check_expression(high, names)
+        elif isinstance(statement, (nodes.Constant, nodes.Return)):
+            _check_expression(statement.value, names)
+        elif isinstance(statement, nodes.Assign):
+            _check_expression(statement.target, names)
+            _check_expression(statement.value, names)
+        elif isinstance(statement, nodes.Input):
+            _check_expression(statement.target, names)
+        elif isinstance(statement, nodes.Output):
+            for value in statement.values:
+                _check_expression(value, names)
+        elif isinstance(statement, nodes.CallStatement):
+            for arg in statement.args:
+                _check_expression(arg, names)
+        elif isinstance(statement, nodes.If):
+            _check_expression(statement.condition, names)
+            _check_block(statement.then_body, names)
+            _check_block(statement.else_body, names)
+        elif isinstance(statement, (nodes.While, nodes.Repeat)):
+            _check_expression(statement.condition, names)
+            _check_block(statement.body, names)
+        elif isinstance(statement, nodes.For):
+            for expression in (statement.start, statement.end, statement.step):
+                if expression is not None:
+                    _check_expression(expression, names)
+            _check_block(statement.body, names)
+
+
+def check_declarations(program: nodes.Program):
+    """Raise PseudoSyntaxError for an identifier no scope declares; routines also see every global."""
+    globals_ = _declared(program.body, set())
+    _check_block(program.body, globals_)
+    for routine in program.routines.values():
+        names = _declared(routine.body, {param.name for param in routine.params} | globals_)
+        _check_block(routine.body, names)
+
+
+def _lint(source: str) -> typing.Optional[str]:
+    try:
+        program = parse(source)
+        check_declarations(program)
+        Compiler(program, INTERPRETER_MAX_CALL_DEPTH).compile()  # undefined routines, wrong argument counts
+    except UnsupportedFeature:
+        return None
+    except PseudoSyntaxError as e:
+        return str(e)
+    except RecursionError:  # absurdly deep nesting, let the engine decide
+        return None
+    return None
+
+
+class Linter:
+    def __init__(self, capacity: int = LINT_CACHE_SIZE):
+        self.capacity = capacity
+        self._results: collections.OrderedDict[str, typing.Optional[str]] = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def lint(self, source: str) -> typing.Optional[str]:
+        """The syntax error of the source as "Line N: message", None when it may run."""
+        key = hashlib.sha256(normalize_source(source).encode()).hexdigest()
+        with self.lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        result = _lint(source)
+        with self.lock:
+            self._results[key] = result
+            while len(self._results) > self.capacity:
+                self._results.popitem(last=False)
+        return result
+
+
+linter = Linter()
@@ -0,0 +1,156 @@
+import dataclasses
+import typing
+
+
+@dataclasses.dataclass
+class TypeSpec:
+    base: str  # INTEGER, REAL, STRING, CHAR or BOOLEAN
+    bounds: typing.Optional[typing.List[typing.Tuple["Expr", "Expr"]]] = None  # set for arrays
+
+
+@dataclasses.dataclass
+class Literal:
+    value: typing.Any
+    line: int
+
+
+@dataclasses.dataclass
+class Name:
+    name: str
+    line: int
+
+
+@dataclasses.dataclass
+class Index:
+    name: str
+    indices: typing.List["Expr"]
+    line: int
+
+
+@dataclasses.dataclass
+class Unary:
+    op: str
+    operand: "Expr"
+    line: int
+
+
+@dataclasses.dataclass
+class Binary:
+    op: str
+    left: "Expr"
+    right: "Expr"
+    line: int
+
+
+@dataclasses.dataclass
+class Call:
+    name: str
+    args: typing.List["Expr"]
+    line: int
+
+
+Expr = typing.Union[Literal, Name, Index, Unary, Binary, Call]
+Target = typing.Union[Name, Index]
+
+
+@dataclasses.dataclass
+class Declare:
+    names: typing.List[str]
+    type: TypeSpec
+    line: int
+
+
+@dataclasses.dataclass
+class Constant:
+    name: str
+    value: Expr
+    line: int
+
+
+@dataclasses.dataclass
+class Assign:
+    target: Target
+    value: Expr
+    line: int
+
+
+@dataclasses.dataclass
+class Input:
+    target: Target
+    line: int
+
+
+@dataclasses.dataclass
+class Output:
+    values: typing.List[Expr]
+    line: int
+
+
+@dataclasses.dataclass
+class If:
+    condition: Expr
+    then_body: typing.List["Stmt"]
+    else_body: typing.List["Stmt"]
+    line: int
+
+
+@dataclasses.dataclass
+class While:
+    condition: Expr
+    body: typing.List["Stmt"]
+    line: int
+
+
+@dataclasses.dataclass
+class Repeat:
+    body: typing.List["Stmt"]
+    condition: Expr
+    line: int
+
+
+@dataclasses.dataclass
+class For:
+    variable: str
+    start: Expr
+    end: Expr
+    step: typing.Optional[Expr]
+    body: typing.List["Stmt"]
+    line: int
+
+
+@dataclasses.dataclass
+class CallStatement:
+    name: str
+    args: typing.List[Expr]
+    line: int
+
+
+@dataclasses.dataclass
+class Return:
+    value: typing.Optional[Expr]  # None for a bare RETURN in a procedure
+    line: int
+
+
+Stmt = typing.Union[Declare, Constant, Assign, Input, Output, If, While, Repeat, For, CallStatement, Return]
+
+
+@dataclasses.dataclass
+class Param:
+    name: str
+    type: TypeSpec
+    by_ref: bool
+
+
+@dataclasses.dataclass
+class Routine:
+    name: str
+    params: typing.List[Param]
+    returns: typing.Optional[TypeSpec]  # None for a PROCEDURE
+    body: typing.List[Stmt]
+    line: int
+
+
+@dataclasses.dataclass
+class Program:
+    body: typing.List[Stmt]
+    routines: typing.Dict[str, Routine]
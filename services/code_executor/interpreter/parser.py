@@ -0,0 +1,349 @@
+import typing
+
+from services.code_executor.interpreter import nodes
+from services.code_executor.interpreter.errors import PseudoSyntaxError, UnsupportedFeature
+from services.code_executor.interpreter.tokenizer import Token, tokenize
+
+BASE_TYPES = ("INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN")
+COMPARISONS = ("=", "<>", "<", ">", "<=", ">=")
+INLINE_TERMINATORS = ("ELSE", "ENDIF")  # IF x THEN OUTPUT x ELSE OUTPUT y ENDIF on one line
+
+
+class Parser:
+    def __init__(self, tokens: typing.List[Token]):
+        self.tokens = tokens
+        self.position = 0
+        self.in_function = False  # a bare RETURN is only allowed in a PROCEDURE
+
+    # --- token helpers ---
+
+    @property
+    def current(self) -> Token:
+        return self.tokens[self.position]
+
+    def _check(self, kind: str, value: typing.Any = None) -> bool:
+        token = self.current
+        if token.kind == "unsupported":
+            raise UnsupportedFeature(f"{token.value} is not supported", token.line)
+        return token.kind == kind and (value is None or token.value == value)
+
+    def _accept(self, kind: str, value: typing.Any = None) -> Token | None:
+        if self._check(kind, value):
+            token = self.current
+            self.position += 1
+            return token
+        return None
+
+    def _expect(self, kind: str, value: typing.Any = None) -> Token:
+        token = self._accept(kind, value)
+        if token is None:
+            expected = value if value is not None else kind
+            found = self.current.value if self.current.value is not None else self.current.kind
+            raise PseudoSyntaxError(f"Expected {expected} but found {found}", self.current.line)
+        return token
+
+    def _keyword(self, *values: str) -> bool:
+        return any(self._check("keyword", value) for value in values)
+
+    def _at_end_of_statement(self) -> bool:
+        return self._check("newline") or self._check("end") or self._keyword(*INLINE_TERMINATORS)
+
+    def _end_of_statement(self):
+        if not self._at_end_of_statement():
+            raise PseudoSyntaxError(f"Unexpected {self.current.value}", self.current.line)
+        self._accept("newline")
+
+    # --- program structure ---
+
+    def parse_program(self) -> nodes.Program:
+        body: typing.List[nodes.Stmt] = []
+        routines: typing.Dict[str, nodes.Routine] = {}
+        self._accept("newline")
+        while not self._check("end"):
+            if self._keyword("PROCEDURE", "FUNCTION"):
+                routine = self.parse_routine()
+                if routine.name in routines:
+                    raise PseudoSyntaxError(f"{routine.name} is defined twice", routine.line)
+                routines[routine.name] = routine
+            else:
+                body.append(self.parse_statement())
+        return nodes.Program(body, routines)
+
+    def parse_block(self, *terminators: str) -> typing.List[nodes.Stmt]:
+        body = []
+        while not self._keyword(*terminators):
+            if self._check("end"):
+                raise PseudoSyntaxError(f"Missing {' / '.join(terminators)}", self.current.line)
+            if self._keyword("PROCEDURE", "FUNCTION"):
+                raise PseudoSyntaxError("Procedures and functions must be defined at the top level",
+                                        self.current.line)
+            body.append(self.parse_statement())
+        return body
+
+    def parse_routine(self) -> nodes.Routine:
+        line = self.current.line
+        is_function = self._accept("keyword", "FUNCTION") is not None
+        if not is_function:
+            self._expect("keyword", "PROCEDURE")
+        name = self._expect("name").value
+        params = []
+        if self._accept("op", "("):
+            by_ref = False  # BYREF / BYVAL applies to the following parameters until changed
+            untyped = []  # names waiting for their type, A, B : INTEGER declares both
+            while not self._accept("op", ")"):
+                if params or untyped:
+                    self._expect("op", ",")
+                if self._accept("keyword", "BYREF"):
+                    by_ref = True
+                elif self._accept("keyword", "BYVAL"):
+                    by_ref = False
+                untyped.append((self._expect("name").value, by_ref))
+                if self._accept("op", ":"):
+                    param_type = self.parse_type(allow_open_array=True)
+                    params.extend(nodes.Param(param_name, param_type, ref) for param_name, ref in untyped)
+                    untyped = []
+            if untyped:
+                raise PseudoSyntaxError(f"Parameter {untyped[-1][0]} has no type", line)
+        returns = None
+        if is_function:
+            self._expect("keyword", "RETURNS")
+            returns = self.parse_type()
+        self._end_of_statement()
+        self.in_function = is_function
+        body = self.parse_block("ENDFUNCTION" if is_function else "ENDPROCEDURE")
+        self.in_function = False
+        self.position += 1
+        self._end_of_statement()
+        return nodes.Routine(name, params, returns, body, line)
+
+    def parse_type(self, allow_open_array: bool = False) -> nodes.TypeSpec:
+        if self._accept("keyword", "ARRAY"):
+            bounds = None
+            if self._accept("op", "["):
+                bounds = []
+                while True:
+                    lower = self.parse_expression()
+                    self._expect("op", ":")
+                    bounds.append((lower, self.parse_expression()))
+                    if not self._accept("op", ","):
+                        break
+                self._expect("op", "]")
+            elif not allow_open_array:
+                raise PseudoSyntaxError("Array bounds are required", self.current.line)
+            self._expect("keyword", "OF")
+            base = self._base_type()
+            return nodes.TypeSpec(base, bounds if bounds is not None else [])
+        return nodes.TypeSpec(self._base_type())
+
+    def _base_type(self) -> str:
+        token = self.current
+        if token.kind == "keyword" and token.value in BASE_TYPES:
+            self.position += 1
+            return token.value
+        if token.kind == "unsupported" or token.kind == "name":
+            raise UnsupportedFeature(f"Type {token.value} is not supported", token.line)
+        raise PseudoSyntaxError(f"Expected a type but found {token.value}", token.line)
+
+    # --- statements ---
+
+    def parse_statement(self) -> nodes.Stmt:
+        token = self.current
+        line = token.line
+        if token.kind == "unsupported":
+            raise UnsupportedFeature(f"{token.value} is not supported", line)
+        if token.kind == "name":
+            target = self.parse_target()
+            if not self._check("op", "<-"):  # a lowercase keyword, a bare procedure call, ...
+                raise UnsupportedFeature(f"Statement starting with {token.value} is not supported", line)
+            self.position += 1
+            statement = nodes.Assign(target, self.parse_expression(), line)
+        elif token.kind != "keyword":
+            raise PseudoSyntaxError(f"Unexpected {token.value if token.value is not None else token.kind}", line)
+        elif self._accept("keyword", "DECLARE"):
+            names = [self._expect("name").value]
+            while self._accept("op", ","):
+                names.append(self._expect("name").value)
+            self._expect("op", ":")
+            statement = nodes.Declare(names, self.parse_type(), line)
+        elif self._accept("keyword", "CONSTANT"):
+            name = self._expect("name").value
+            if not self._accept("op", "="):
+                self._expect("op", "<-")
+            statement = nodes.Constant(name, self.parse_expression(), line)
+        elif self._accept("keyword", "INPUT"):
+            statement = nodes.Input(self.parse_target(), line)
+        elif self._accept("keyword", "OUTPUT"):
+            values = [self.parse_expression()]
+            while self._accept("op", ","):
+                values.append(self.parse_expression())
+            statement = nodes.Output(values, line)
+        elif self._accept("keyword", "IF"):
+            condition = self.parse_expression()
+            self._accept("newline")
+            self._expect("keyword", "THEN")
+            self._accept("newline")
+            then_body = self.parse_block("ELSE", "ENDIF")
+            else_body = []
+            if self._accept("keyword", "ELSE"):
+                self._accept("newline")
+                else_body = self.parse_block("ENDIF")
+            self._expect("keyword", "ENDIF")
+            statement = nodes.If(condition, then_body, else_body, line)
+        elif self._accept("keyword", "WHILE"):
+            condition = self.parse_expression()
+            self._accept("keyword", "DO")
+            self._end_of_statement()
+            body = self.parse_block("ENDWHILE")
+            self.position += 1
+            statement = nodes.While(condition, body, line)
+        elif self._accept("keyword", "REPEAT"):
+            self._end_of_statement()
+            body = self.parse_block("UNTIL")
+            self.position += 1
+            statement = nodes.Repeat(body, self.parse_expression(), line)
+        elif self._accept("keyword", "FOR"):
+            variable = self._expect("name").value
+            self._expect("op", "<-")
+            start = self.parse_expression()
+            self._expect("keyword", "TO")
+            end = self.parse_expression()
+            step = self.parse_expression() if self._accept("keyword", "STEP") else None
+            self._end_of_statement()
+            body = self.parse_block("NEXT")
+            self.position += 1
+            if self._check("name"):
+                if self.current.value != variable:
+                    raise PseudoSyntaxError(f"NEXT {self.current.value} does not match FOR {variable}",
+                                            self.current.line)
+                self.position += 1
+            statement = nodes.For(variable, start, end, step, body, line)
+        elif self._accept("keyword", "CALL"):
+            name = self._expect("name").value
+            args = self.parse_arguments() if self._check("op", "(") else []
+            statement = nodes.CallStatement(name, args, line)
+        elif self._accept("keyword", "RETURN"):
+            if self.in_function or not self._at_end_of_statement():
+                statement = nodes.Return(self.parse_expression(), line)
+            else:  # leaves a procedure
+                statement = nodes.Return(None, line)
+        else:
+            raise PseudoSyntaxError(f"Unexpected {token.value}", line)
+        self._end_of_statement()
+        return statement
+
+    def parse_target(self) -> nodes.Target:
+        token = self._expect("name")
+        if self._accept("op", "["):
+            indices = [self.parse_expression()]
+            while self._accept("op", ","):
+                indices.append(self.parse_expression())
+            self._expect("op", "]")
+            return nodes.Index(token.value, indices, token.line)
+        if self._check("op", "."):
+            raise UnsupportedFeature("Records are not supported", token.line)
+        return nodes.Name(token.value, token.line)
+
+    def parse_arguments(self) -> typing.List[nodes.Expr]:
+        self._expect("op", "(")
+        args = []
+        if not self._accept("op", ")"):
+            args.append(self.parse_expression())
+            while self._accept("op", ","):
+                args.append(self.parse_expression())
+            self._expect("op", ")")
+        return args
+
+    # --- expressions, lowest precedence first ---
+
+    def parse_expression(self) -> nodes.Expr:
+        left = self._parse_and()
+        while self._check("keyword", "OR"):
+            line = self.current.line
+            self.position += 1
+            left = nodes.Binary("OR", left, self._parse_and(), line)
+        return left
+
+    def _parse_and(self) -> nodes.Expr:
+        left = self._parse_not()
+        while self._check("keyword", "AND"):
+            line = self.current.line
+            self.position += 1
+            left = nodes.Binary("AND", left, self._parse_not(), line)
+        return left
+
+    def _parse_not(self) -> nodes.Expr:
+        if self._check("keyword", "NOT"):
+            line = self.current.line
+            self.position += 1
+            return nodes.Unary("NOT", self._parse_not(), line)
+        return self._parse_comparison()
+
+    def _parse_comparison(self) -> nodes.Expr:
+        left = self._parse_additive()
+        while self.current.kind == "op" and self.current.value in COMPARISONS:
+            token = self.current
+            self.position += 1
+            left = nodes.Binary(token.value, left, self._parse_additive(), token.line)
+        return left
+
+    def _parse_additive(self) -> nodes.Expr:
+        left = self._parse_multiplicative()
+        while self.current.kind == "op" and self.current.value in ("+", "-", "&"):
+            token = self.current
+            self.position += 1
+            left = nodes.Binary(token.value, left, self._parse_multiplicative(), token.line)
+        return left
+
+    def _parse_multiplicative(self) -> nodes.Expr:
+        left = self._parse_unary()
+        while (self.current.kind == "op" and self.current.value in ("*", "/")) or self._keyword("MOD", "DIV"):
+            token = self.current
+            self.position += 1
+            left = nodes.Binary(token.value, left, self._parse_unary(), token.line)
+        return left
+
+    def _parse_unary(self) -> nodes.Expr:
+        if self._check("op", "-") or self._check("op", "+"):
+            token = self.current
+            self.position += 1
+            return nodes.Unary(token.value, self._parse_unary(), token.line)
+        return self._parse_power()
+
+    def _parse_power(self) -> nodes.Expr:
+        base = self._parse_primary()
+        if self._check("op", "^"):
+            line = self.current.line
+            self.position += 1
+            return nodes.Binary("^", base, self._parse_unary(), line)  # right associative
+        return base
+
+    def _parse_primary(self) -> nodes.Expr:
+        token = self.current
+        if token.kind in ("int", "real", "string", "char"):
+            self.position += 1
+            return nodes.Literal(token.value, token.line)
+        if self._accept("keyword", "TRUE"):
+            return nodes.Literal(True, token.line)
+        if self._accept("keyword", "FALSE"):
+            return nodes.Literal(False, token.line)
+        if self._accept("op", "("):
+            expression = self.parse_expression()
+            self._expect("op", ")")
+            return expression
+        if token.kind == "keyword" and token.value in ("MOD", "DIV"):  # also usable as MOD(a, b)
+            self.position += 1
+            return nodes.Call(token.value, self.parse_arguments(), token.line)
+        if token.kind == "name":
+            following = self.tokens[self.position + 1]
+            if following.kind == "op" and following.value == "(":
+                self.position += 1
+                return nodes.Call(token.value, self.parse_arguments(), token.line)
+            return self.parse_target()
+        if token.kind == "unsupported":
+            raise UnsupportedFeature(f"{token.value} is not supported", token.line)
+        found = token.value if token.value is not None else "end of line"
+        raise PseudoSyntaxError(f"Expected an expression but found {found}", token.line)
+
+
+def parse(source: str) -> nodes.Program:
+    return Parser(tokenize(source)).parse_program()
@@ -0,0 +1,183 @@
+import math
+import typing
+
+from services.code_executor.interpreter.errors import PseudoRuntimeError, StepBudgetExceeded, MemoryBudgetExceeded
+
+CELL_SIZE = 8  # bytes charged per array element
+DEFAULTS = {"INTEGER": 0, "REAL": 0.0, "STRING": "", "CHAR": " ", "BOOLEAN": False}
+
+
+class OutputRejected(Exception):
+    """The output sink wants no more output (e.g. the comparator already found a difference)."""
+
+
+class Context:
+    """Per-run state shared by all frames of one run, so a compiled program can run in several threads at once."""
+    __slots__ = ("steps", "max_memory", "memory", "peak_memory", "lines", "next_line", "write")
+
+    def __init__(self, stdin: str, write: typing.Callable[[str], bool], max_steps: int, max_memory: int):
+        self.steps = max_steps
+        self.max_memory = max_memory
+        self.memory = 0
+        self.peak_memory = 0
+        self.lines = stdin.split("\n")
+        if self.lines and self.lines[-1] == "":  # the newline ending the last line does not start another one
+            self.lines.pop()
+        self.next_line = 0
+        self.write = write
+
+    def step(self, line: int):
+        self.steps -= 1
+        if self.steps < 0:
+            raise StepBudgetExceeded("Step budget exceeded", line)
+
+    def allocate(self, size: int, line: int):
+        self.memory += size
+        self.peak_memory = max(self.peak_memory, self.memory)
+        if self.memory > self.max_memory:
+            raise MemoryBudgetExceeded("Memory budget exceeded", line)
+
+    def check_string(self, text: str, line: int):
+        if len(text) > self.max_memory:
+            self.peak_memory = max(self.peak_memory, self.memory + len(text))
+            raise MemoryBudgetExceeded("Memory budget exceeded", line)
+
+    def read_line(self, line: int) -> str:
+        if self.next_line >= len(self.lines):
+            raise PseudoRuntimeError("No more input", line)
+        text = self.lines[self.next_line].rstrip("\r")
+        self.next_line += 1
+        return text
+
+    def output(self, text: str):
+        if self.write(text) is False:
+            raise OutputRejected()
+
+
+class Cell:
+    __slots__ = ("value", "type", "constant")
+
+    def __init__(self, value: typing.Any, type_: str, constant: bool = False):
+        self.value = value
+        self.type = type_  # a base type, or "ARRAY"
+        self.constant = constant
+
+
+class ElementCell:
+    """An array element passed BYREF."""
+    constant = False
+
+    def __init__(self, array: "Array", indices: typing.List[int], line: int):
+        self.array = array
+        self.indices = indices
+        self.line = line
+        self.type = array.type
+
+    @property
+    def value(self):
+        return self.array.get(self.indices, self.line)
+
+    @value.setter
+    def value(self, value):
+        self.array.set(self.indices, value, self.line)
+
+
+class Array:
+    __slots__ = ("type", "lows", "sizes", "data")
+
+    def __init__(self, type_: str, bounds: typing.List[typing.Tuple[int, int]], context: Context, line: int):
+        self.type = type_
+        self.lows = [low for low, _ in bounds]
+        self.sizes = [high - low + 1 for low, high in bounds]
+        if any(size <= 0 for size in self.sizes):
+            raise PseudoRuntimeError("Array upper bound is below its lower bound", line)
+        count = math.prod(self.sizes)
+        context.allocate(count * CELL_SIZE, line)
+        self.data = [DEFAULTS[type_]] * count
+
+    def copy(self, context: Context, line: int) -> "Array":
+        context.allocate(len(self.data) * CELL_SIZE, line)
+        copied = Array.__new__(Array)
+        copied.type, copied.lows, copied.sizes, copied.data = self.type, self.lows, self.sizes, list(self.data)
+        return copied
+
+    def offset(self, indices: typing.List[int], line: int) -> int:
+        if len(indices) != len(self.sizes):
+            raise PseudoRuntimeError(f"Expected {len(self.sizes)} indices but got {len(indices)}", line)
+        offset = 0
+        for index, low, size in zip(indices, self.lows, self.sizes):
+            if type(index) is not int:
+                raise PseudoRuntimeError("Array index must be an INTEGER", line)
+            if not low <= index < low + size:
+                raise PseudoRuntimeError(f"Array index {index} out of bounds", line)
+            offset = offset * size + index - low
+        return offset
+
+    def get(self, indices: typing.List[int], line: int):
+        return self.data[self.offset(indices, line)]
+
+    def set(self, indices: typing.List[int], value, line: int):
+        self.data[self.offset(indices, line)] = coerce(self.type, value, line)
+
+
+class Frame:
+    __slots__ = ("vars", "globals", "context", "depth")
+
+    def __init__(self, context: Context, globals_: typing.Dict[str, Cell] | None = None, depth: int = 0):
+        self.vars: typing.Dict[str, Cell] = {}
+        self.globals = globals_ if globals_ is not None else self.vars
+        self.context = context
+        self.depth = depth
+
+    def cell(self, name: str, line: int) -> Cell:
+        cell = self.vars.get(name)
+        if cell is None:
+            cell = self.globals.get(name)
+            if cell is None:
+                raise PseudoRuntimeError(f"{name} is not declared", line)
+        return cell
+
+    def declare(self, name: str, cell: Cell, line: int):
+        if name in self.vars:
+            raise PseudoRuntimeError(f"{name} is already declared", line)
+        self.vars[name] = cell
+
+
+def type_name(value) -> str:
+    if type(value) is bool:
+        return "BOOLEAN"
+    if type(value) is int:
+        return "INTEGER"
+    if type(value) is float:
+        return "REAL"
+    if type(value) is str:
+        return "CHAR" if len(value) == 1 else "STRING"
+    return "ARRAY"
+
+
+def coerce(type_: str, value, line: int):
+    """Check a value against a declared type; INTEGER widens to REAL and a CHAR is also a STRING."""
+    kind = type(value)
+    if type_ == "INTEGER" and kind is int:
+        return value
+    if type_ == "REAL" and (kind is float or kind is int):
+        return float(value)
+    if type_ == "STRING" and kind is str:
+        return value
+    if type_ == "CHAR" and kind is str and len(value) == 1:
+        return value
+    if type_ == "BOOLEAN" and kind is bool:
+        return value
+    if type_ == "ARRAY" and kind is Array:
+        return value
+    raise PseudoRuntimeError(f"Cannot use {type_name(value)} as {type_}", line)
+
+
+def format_value(value) -> str:
+    if value is True:
+        return "TRUE"
+    if value is False:
+        return "FALSE"
+    if type(value) is float:
+        return format(value, "g")  # as a C++ ostream prints a double by default
+    return str(value)
@@ -0,0 +1,75 @@
+import re
+import typing
+
+from services.code_executor.interpreter.errors import UnsupportedFeature
+
+KEYWORDS = {
+    "DECLARE", "CONSTANT", "ARRAY", "OF", "INPUT", "OUTPUT", "IF", "THEN", "ELSE", "ENDIF",
+    "WHILE", "DO", "ENDWHILE", "REPEAT", "UNTIL", "FOR", "TO", "STEP", "NEXT",
+    "PROCEDURE", "ENDPROCEDURE", "FUNCTION", "ENDFUNCTION", "RETURNS", "RETURN", "CALL", "BYREF", "BYVAL",
+    "AND", "OR", "NOT", "MOD", "DIV", "TRUE", "FALSE",
+    "INTEGER", "REAL", "STRING", "CHAR", "BOOLEAN",
+}
+# valid pseudocode that is left to the external engine
+UNSUPPORTED_KEYWORDS = {
+    "CASE", "OTHERWISE", "ENDCASE", "TYPE", "ENDTYPE", "CLASS", "ENDCLASS", "DATE",
+    "OPENFILE", "READFILE", "WRITEFILE", "CLOSEFILE", "SEEK", "GETRECORD", "PUTRECORD", "EOF",
+    "RAND", "RANDOM", "RANDOMBETWEEN", "NEW", "SUPER", "INHERITS", "PRIVATE", "PUBLIC", "PRINT",
+}
+
+
+class Token(typing.NamedTuple):
+    kind: str  # "int", "real", "string", "char", "name", "keyword", "op", "newline", "end"
+    value: typing.Any
+    line: int
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<space>[ \t\r]+)
+  | (?P<comment>//[^\n]*)
+  | (?P<newline>\n)
+  | (?P<real>\d+\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+)
+  | (?P<int>\d+)
+  | (?P<string>"[^"\n]*"|“[^”\n]*”)
+  | (?P<char>'[^'\n]')
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><-|←|<=|>=|<>|[=<>+\-*/^&()\[\],:.])
+""", re.VERBOSE)
+
+
+def tokenize(source: str) -> typing.List[Token]:
+    """Identifiers are case-insensitive: every spelling of a name becomes the first spelling seen."""
+    tokens: typing.List[Token] = []
+    spellings: typing.Dict[str, str] = {}
+    line, position = 1, 0
+    while position < len(source):
+        match = _TOKEN_RE.match(source, position)
+        if match is None:  # e.g. a multi-character '...' literal, the external engine decides
+            raise UnsupportedFeature(f"Unexpected character {source[position]!r}", line)
+        kind, text = match.lastgroup, match.group()
+        position = match.end()
+        if kind in ("space", "comment"):
+            continue
+        if kind == "newline":
+            if tokens and tokens[-1].kind != "newline":
+                tokens.append(Token("newline", None, line))
+            line += 1
+            continue
+        if kind == "int":
+            tokens.append(Token("int", int(text), line))
+        elif kind == "real":
+            tokens.append(Token("real", float(text), line))
+        elif kind in ("string", "char"):
+            tokens.append(Token(kind, text[1:-1], line))
+        elif kind == "name" and text in KEYWORDS:
+            tokens.append(Token("keyword", text, line))
+        elif kind == "name" and text in UNSUPPORTED_KEYWORDS:
+            tokens.append(Token("unsupported", text, line))
+        elif kind == "op":
+            tokens.append(Token("op", "<-" if text == "←" else text, line))
+        else:
+            tokens.append(Token("name", spellings.setdefault(text.lower(), text), line))
+    if tokens and tokens[-1].kind != "newline":
+        tokens.append(Token("newline", None, line))
+    tokens.append(Token("end", None, line))
+    return tokens
@@ -0,0 +1,163 @@
+"""
+批量评测：把一次提交分发到题目的全部测试样例上并行运行，结果一次性批量写入runtime_info。
+
+评测的CPU开销发生在引擎子进程中，这里的线程只负责喂输入、收输出，
+因此并发度（JUDGE_MAX_WORKERS）即同时存活的引擎进程数，默认等于CPU核数。
+"""
+import concurrent.futures
+import datetime
+import enum
+import signal
+import typing
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+import database
+from models.problem import Problem
+from models.runtime_info import RuntimeInfo
+from models.submission import Submission
+from models.test_sample import TestSample
+from services import problem_stats
+from services.blob_store import blob_store
+from services.code_executor.code_manager import CommunicateResult
+from services.code_executor.comparator import CompareMode, StreamingComparator
+from services.code_executor.engines import get_engine
+from services.code_executor.limits import ResourceLimits, parse_limits
+from services.code_executor.verdict_cache import verdict_cache, make_key, test_set_fingerprint
+from services.config import JUDGE_MAX_WORKERS, JUDGE_WALL_TIME_FACTOR, JUDGE_COMPARE_MODE, JUDGE_FLOAT_TOLERANCE, \
+    MEMORY_LIMIT_CRASH_RATIO, ALLOCATION_FAILURE_MARKERS
+from utils.logger import logger
+
+
+class Verdict(str, enum.Enum):
+    ACCEPTED = "accepted"
+    WRONG_ANSWER = "wrong answer"
+    RUNTIME_ERROR = "runtime error"
+    TIME_LIMIT_EXCEEDED = "time limit exceeded"
+    MEMORY_LIMIT_EXCEEDED = "memory limit exceeded"
+
+
+class SampleCase(typing.TypedDict):
+    sample_id: int
+    input_digest: str  # blobs in the blob store
+    output_digest: str
+
+
+class SampleResult(typing.TypedDict):
+    sample_id: int
+    status: Verdict
+    msg: typing.Optional[str]
+    time_used: typing.Optional[int]  # ms of CPU time
+    memory_used: typing.Optional[int]  # KB of peak RSS
+
+
+# Shared by every judging in this process so the number of live engines stays bounded
+_judge_pool = concurrent.futures.ThreadPoolExecutor(max_workers=JUDGE_MAX_WORKERS, thread_name_prefix="judge")
+
+
+def sample_case(sample: TestSample) -> SampleCase:
+    # the whitespace comparison can start from the output normalized at upload
+    normalized = JUDGE_COMPARE_MODE == CompareMode.WHITESPACE and sample.normalized_output_digest is not None
+    return {
+        "sample_id": sample.sid,
+        "input_digest": sample.input_digest,
+        "output_digest": sample.normalized_output_digest if normalized else sample.output_digest
+    }
+
+
+def get_verdict(result: CommunicateResult, limits: ResourceLimits) -> Verdict:
+    usage = result["usage"]
+    killed_by = -result["return_code"] if result["return_code"] < 0 else None
+    if result["timed_out"] or killed_by == signal.SIGXCPU \
+            or (usage is not None and usage["cpu_time"] > limits.cpu_time * 1000):
+        return Verdict.TIME_LIMIT_EXCEEDED
+    if usage is not None and usage["peak_memory"] > limits.memory * 1024:
+        return Verdict.MEMORY_LIMIT_EXCEEDED
+    # False only for a clean exit or a run killed on the first difference (which makes return_code -9)
+    if result["matched"] is False:
+        return Verdict.WRONG_ANSWER
+    if not result["good"]:
+        return Verdict.MEMORY_LIMIT_EXCEEDED if ran_out_of_memory(result, limits) else Verdict.RUNTIME_ERROR
+    return Verdict.ACCEPTED
+
+
+def ran_out_of_memory(result: CommunicateResult, limits: ResourceLimits) -> bool:
+    """A crash under RLIMIT_AS: the engine reports the failed allocation, or dies with its RSS near the limit."""
+    error = result["error"].lower()
+    if any(marker in error for marker in ALLOCATION_FAILURE_MARKERS):
+        return True
+    usage = result["usage"]
+    return usage is not None and usage["peak_memory"] >= limits.memory * 1024 * MEMORY_LIMIT_CRASH_RATIO
+
+
+def judge_sample(source_code: str, case: SampleCase, limits: ResourceLimits) -> SampleResult:
+    expected = blob_store.read_text(case["output_digest"])
+    comparator = StreamingComparator(expected, CompareMode(JUDGE_COMPARE_MODE), JUDGE_FLOAT_TOLERANCE)
+    with blob_store.open(case["input_digest"]) as input_data:
+        result = get_engine().communicate(source_code, input_data, limits,
+                                          timeout=limits.cpu_time * JUDGE_WALL_TIME_FACTOR + 1, comparator=comparator)
+    verdict = get_verdict(result, limits)
+    usage = result["usage"]
+    return {
+        "sample_id": case["sample_id"],
+        "status": verdict,
+        "msg": result["error"] if verdict == Verdict.RUNTIME_ERROR else None,
+        "time_used": usage["cpu_time"] if usage is not None else None,
+        "memory_used": usage["peak_memory"] if usage is not None else None
+    }
+
+
+def judge_cases(source_code: str, cases: typing.List[SampleCase], limits: ResourceLimits) -> typing.List[SampleResult]:
+    futures = [_judge_pool.submit(judge_sample, source_code, case, limits) for case in cases]
+    return [future.result() for future in futures]  # keep the order of samples
+
+
+def judge_submission(session: Session, submission: Submission) -> bool | None:
+    """Run the submission against all samples of its problem, store every RuntimeInfo in one insert."""
+    started_at = datetime.datetime.utcnow()  # judged_at; samples edited after this are rejudged
+    samples = session.scalars(
+        select(TestSample).where(TestSample.problem_id == submission.pid).order_by(TestSample.num)
+    ).all()
+    if not samples:
+        logger.warning(f"Problem({submission.pid}) has no test sample, submission({submission.submit_id}) skipped")
+        return None
+    problem = session.get(Problem, submission.pid)
+    source_code = submission.source_code
+    cache_key = make_key(source_code.code, source_code.language, test_set_fingerprint(problem, samples))
+    results = verdict_cache.get(cache_key)
+    if results is not None:
+        for result in results:
+            result["status"] = Verdict(result["status"])
+        logger.info(f"Submission({submission.submit_id}) reuses a cached verdict")
+    else:
+        cases: typing.List[SampleCase] = [sample_case(sample) for sample in samples]
+        results = judge_cases(source_code.code, cases, parse_limits(problem.time_limit, problem.memory_limit))
+        # a TLE depends on the load of the judge at that moment, so it is not worth remembering
+        if all(result["status"] != Verdict.TIME_LIMIT_EXCEEDED for result in results):
+            verdict_cache.put(cache_key, results)
+
+    submit_id, pid, sid = submission.submit_id, submission.pid, submission.sid
+    valid = all(result["status"] == Verdict.ACCEPTED for result in results)
+
+    def store(write_session: Session):
+        write_session.execute(insert(RuntimeInfo), [
+            {
+                "sample_id": result["sample_id"],
+                "problem_id": pid,
+                "submission_id": submit_id,
+                "status": result["status"].value,
+                "msg": result["msg"],
+                "time_used": result["time_used"],
+                "memory_used": result["memory_used"]
+            }
+            for result in results
+        ])
+        write_session.execute(update(Submission).where(Submission.submit_id == submit_id)
+                              .values(valid=valid, judged_at=started_at))
+
+    session.rollback()  # ends the read transaction before the writer commits
+    database.writer.write(store)  # group-committed with the verdicts of concurrent judgings
+    problem_stats.record_judged(pid, sid, submit_id, valid)
+    logger.info(f"Submission({submit_id}) judged on {len(results)} samples, valid={valid}")
+    return valid
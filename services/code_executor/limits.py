@@ -0,0 +1,120 @@
+"""
+运行资源控制：对引擎进程施加CPU时间与地址空间rlimit，回收进程时通过wait4取得CPU时间与峰值RSS（ru_maxrss）。
+
+ru_maxrss包含子进程exec之前从评测进程继承的RSS，因此启动时记下评测进程当时的VmHWM，
+ru_maxrss不超过它时说明不了引擎自身的用量，此时以运行期间采样的VmHWM为准。
+
+rlimit通过 `resource.prlimit` 在进程exec引擎之前设置：引擎总是由阻塞在读源文件路径上的槽位shell exec出来
+（见engine_pool），写入路径之前先对shell设置rlimit，因此不需要在多线程进程中不安全的preexec_fn。
+"""
+import math
+import os
+import resource
+import signal
+import threading
+import time
+import typing
+from subprocess import Popen, TimeoutExpired
+
+from services.config import ENGINE_ADDRESS_SPACE_OVERHEAD
+
+
+class ResourceLimits(typing.NamedTuple):
+    cpu_time: float  # seconds
+    memory: int  # MB, compared with the peak RSS
+
+
+class ResourceUsage(typing.TypedDict):
+    cpu_time: int  # ms, user + sys
+    peak_memory: int  # KB, peak RSS: wait4's ru_maxrss, or the VmHWM sampled while the process ran
+
+
+def parse_limits(time_limit: str, memory_limit: str) -> ResourceLimits:
+    """Problem stores both limits as strings, e.g. "1" (seconds) and "16" (MB)."""
+    return ResourceLimits(float(time_limit), int(float(memory_limit)))
+
+
+def apply_limits(pid: int, limits: ResourceLimits):
+    # The soft CPU limit delivers SIGXCPU, the hard one a SIGKILL a second later
+    cpu_soft = math.ceil(limits.cpu_time)
+    resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_soft, cpu_soft + 1))
+    # The engine maps shared libraries and its own heap, hence the overhead on top of the problem limit
+    address_space = (limits.memory + ENGINE_ADDRESS_SPACE_OVERHEAD) * 1024 * 1024
+    resource.prlimit(pid, resource.RLIMIT_AS, (address_space, address_space))
+
+
+def read_peak_rss(pid: int) -> int:
+    """VmHWM of a live process in KB, 0 once it is gone."""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+class MeasuredPopen(Popen):
+    """Popen that reaps its child with wait4 and keeps the rusage, and kills the whole process group."""
+    rusage: resource.struct_rusage | None = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, start_new_session=True, **kwargs)
+        # the child counted this process's pages until it exec'ed, ru_maxrss never drops below them
+        self.inherited_rss = read_peak_rss(os.getpid())
+        self._reap_lock = threading.Lock()
+
+    def reap(self, block: bool = True) -> int | None:
+        """Reap the child with wait4 and keep its rusage; the return code, None while it still runs."""
+        if not self._reap_lock.acquire(blocking=block):  # another thread is reaping it
+            return None
+        try:
+            if self.returncode is None:
+                try:
+                    pid, status, rusage = os.wait4(self.pid, 0 if block else os.WNOHANG)
+                except ChildProcessError:  # reaped by someone else, the status is lost
+                    self.returncode = 0
+                else:
+                    if pid == self.pid:
+                        self.rusage = rusage
+                        self.returncode = os.waitstatus_to_exitcode(status)
+            return self.returncode
+        finally:
+            self._reap_lock.release()
+
+    def poll(self) -> int | None:
+        return self.reap(block=False)
+
+    def wait(self, timeout: float | None = None) -> int:
+        if timeout is None:
+            return self.reap()
+        deadline = time.monotonic() + timeout
+        interval = 0.0005
+        while (returncode := self.reap(block=False)) is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutExpired(self.args, timeout)
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 0.05)
+        return returncode
+
+    def kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    @property
+    def cpu_time(self) -> int | None:
+        """user + sys CPU time in ms, available after the process is reaped."""
+        if self.rusage is None:
+            return None
+        return round((self.rusage.ru_utime + self.rusage.ru_stime) * 1000)
+
+    @property
+    def peak_rss(self) -> int | None:
+        """ru_maxrss in KB after the process is reaped, None when it may be only what the child inherited."""
+        if self.rusage is None or self.rusage.ru_maxrss <= self.inherited_rss:
+            return None
+        return self.rusage.ru_maxrss
@@ -0,0 +1,105 @@
+"""
+交互式运行的输出发送器：输出先进入内存缓冲，达到大小或时间阈值后通过一个pipeline批量写入redis。
+
+每次flush把缓冲合并为一个元素LPUSH到 `output_{connection_id}`（消费者从右侧弹出，顺序不变），
+同时LTRIM到最大长度并刷新过期时间，三条命令只需一次往返。
+
+背压：队列中积压的块达到high_water时，push会等待消费者取走到一半以下再返回。
+运行方因此停止读取引擎输出，管道写满后引擎自身阻塞，输出快于客户端读取的程序不会无限占用内存。
+消费者停滞超过stall_timeout时抛出OutputStalled，由调用方结束运行；定时flush中发生的停滞在下一次push或退出时抛出。
+"""
+import asyncio
+import typing
+
+import redis.asyncio
+
+from services.config import OUTPUT_FLUSH_BYTES, OUTPUT_FLUSH_INTERVAL, OUTPUT_QUEUE_MAX_LEN, OUTPUT_QUEUE_TTL, \
+    OUTPUT_QUEUE_HIGH_WATER, OUTPUT_STALL_TIMEOUT
+
+
+class OutputStalled(Exception):
+    """Nobody has consumed the output for too long."""
+
+
+class OutputShipper:
+    def __init__(self,
+                 redis_instance: redis.asyncio.Redis,
+                 key: str,
+                 flush_bytes: int = OUTPUT_FLUSH_BYTES,
+                 flush_interval: float = OUTPUT_FLUSH_INTERVAL,
+                 max_len: int = OUTPUT_QUEUE_MAX_LEN,
+                 ttl: int = OUTPUT_QUEUE_TTL,
+                 high_water: int = OUTPUT_QUEUE_HIGH_WATER,
+                 stall_timeout: float = OUTPUT_STALL_TIMEOUT
+                 ):
+        self.redis_instance = redis_instance
+        self.key = key
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_len = max_len
+        self.ttl = ttl
+        self.high_water = min(high_water, max_len)
+        self.stall_timeout = stall_timeout
+        self._buffer: typing.List[str] = []
+        self._buffered_bytes = 0
+        self._lock = asyncio.Lock()  # keeps size- and timer-triggered flushes in order
+        self._timer: asyncio.Task | None = None
+
+    async def push(self, text: str):
+        self._check_timer()
+        self._buffer.append(text)
+        self._buffered_bytes += len(text)
+        if self._buffered_bytes >= self.flush_bytes:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            chunk = "".join(self._buffer)
+            self._buffer.clear()
+            self._buffered_bytes = 0
+            async with self.redis_instance.pipeline(transaction=False) as pipe:
+                pipe.lpush(self.key, chunk.encode('utf-8'))
+                pipe.ltrim(self.key, 0, self.max_len - 1)
+                pipe.expire(self.key, self.ttl)
+                length, _, _ = await pipe.execute()
+            if length >= self.high_water:
+                await self._wait_for_consumer()
+
+    async def _wait_for_consumer(self, max_interval: float = 0.1):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.stall_timeout
+        interval = 0.005
+        while await self.redis_instance.llen(self.key) > self.high_water // 2:
+            if loop.time() >= deadline:
+                raise OutputStalled(self.key)
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_interval)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _check_timer(self):
+        """Re-raise what ended the periodic flush (OutputStalled, a redis error) in the pushing task."""
+        if self._timer is not None and self._timer.done() and not self._timer.cancelled():
+            error = self._timer.exception()
+            if error is not None:
+                raise error
+
+    async def __aenter__(self):
+        self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._timer.cancel()
+        # also retrieves the error that ended the timer; a CancelledError if it was still running
+        timer_error, = await asyncio.gather(self._timer, return_exceptions=True)
+        if not isinstance(timer_error, Exception):
+            timer_error = None
+        if exc_type is not OutputStalled and not isinstance(timer_error, OutputStalled):
+            await self.flush()  # after a stall the flush would only stall again
+        if exc_type is None and timer_error is not None:
+            raise timer_error
@@ -0,0 +1,122 @@
+"""
+增量重测：只运行自上次评测以来新增或修改过的测试样例，把新结果合并进已有的runtime_info并重新计算Submission.valid。
+
+样例是否需要重跑：该提交没有这个样例的结果，或样例的updated_at晚于提交的judged_at。
+judged_at记录的是评测开始（读取样例之前）的时间，评测进行中被修改的样例在下一次重测时仍会重跑。
+进度记录在redis的 `rejudge_{pid}` 哈希中（total / done）；上一次重测尚未完成时再次重测同一题，total累加而不是清零。
+"""
+import datetime
+import typing
+
+import redis
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+import database
+from models.problem import Problem
+from models.runtime_info import RuntimeInfo
+from models.submission import Submission
+from models.test_sample import TestSample
+from services import problem_stats
+from services.code_executor.judge import SampleCase, Verdict, judge_cases, sample_case
+from services.code_executor.limits import parse_limits
+from services.config import REDIS_SERVER_IP, REDIS_PORT, REJUDGE_PROGRESS_TTL
+from utils.logger import logger
+
+_redis = redis.Redis(host=REDIS_SERVER_IP, port=REDIS_PORT, db=0)
+
+# KEYS: progress hash; ARGV: submissions added, ttl
+_START_PROGRESS = """
+local total = tonumber(redis.call('hget', KEYS[1], 'total') or '0')
+local done = tonumber(redis.call('hget', KEYS[1], 'done') or '0')
+if done >= total then
+    redis.call('del', KEYS[1])
+end
+redis.call('hincrby', KEYS[1], 'total', ARGV[1])
+redis.call('hincrby', KEYS[1], 'done', 0)
+redis.call('expire', KEYS[1], ARGV[2])
+"""
+
+
+def stale_samples(session: Session, submission: Submission,
+                  samples: typing.List[TestSample]) -> typing.List[TestSample]:
+    judged_sample_ids = set(session.scalars(
+        select(RuntimeInfo.sample_id).where(RuntimeInfo.submission_id == submission.submit_id)
+    ))
+    return [
+        sample for sample in samples
+        if sample.sid not in judged_sample_ids
+        or submission.judged_at is None
+        or (sample.updated_at is not None and sample.updated_at > submission.judged_at)
+    ]
+
+
+def rejudge_submission(session: Session, submission: Submission) -> int:
+    """Re-run the stale samples of one submission; returns how many samples were run."""
+    started_at = datetime.datetime.utcnow()  # before the samples are read, a later edit makes them stale again
+    samples = session.scalars(
+        select(TestSample).where(TestSample.problem_id == submission.pid).order_by(TestSample.num)
+    ).all()
+    stale = stale_samples(session, submission, samples)
+    results = []
+    if stale:
+        problem = session.get(Problem, submission.pid)
+        cases: typing.List[SampleCase] = [sample_case(sample) for sample in stale]
+        results = judge_cases(submission.source_code.code, cases,
+                              parse_limits(problem.time_limit, problem.memory_limit))
+    submit_id, pid, sid = submission.submit_id, submission.pid, submission.sid
+    sample_ids = [sample.sid for sample in samples]
+
+    def store(write_session: Session) -> typing.Tuple[bool | None, bool]:
+        was_valid = write_session.scalar(select(Submission.valid).where(Submission.submit_id == submit_id))
+        if stale:
+            write_session.execute(delete(RuntimeInfo).where(
+                RuntimeInfo.submission_id == submit_id,
+                RuntimeInfo.sample_id.in_([sample.sid for sample in stale])
+            ))
+            write_session.execute(insert(RuntimeInfo), [
+                {
+                    "sample_id": result["sample_id"],
+                    "problem_id": pid,
+                    "submission_id": submit_id,
+                    "status": result["status"].value,
+                    "msg": result["msg"],
+                    "time_used": result["time_used"],
+                    "memory_used": result["memory_used"]
+                }
+                for result in results
+            ])
+        # valid is re-derived from the merged results of the current sample set
+        statuses = dict(write_session.execute(
+            select(RuntimeInfo.sample_id, RuntimeInfo.status).where(RuntimeInfo.submission_id == submit_id)
+        ).all())
+        valid = bool(sample_ids) and all(statuses.get(sid) == Verdict.ACCEPTED.value for sid in sample_ids)
+        write_session.execute(update(Submission).where(Submission.submit_id == submit_id)
+                              .values(valid=valid, judged_at=started_at))
+        return was_valid, valid
+
+    session.rollback()  # ends the read transaction before the writer commits
+    was_valid, valid = database.writer.write(store)
+    problem_stats.record_rejudged(pid, sid, submit_id, was_valid, valid)
+    logger.info(f"Submission({submit_id}) rejudged on {len(stale)} samples, valid={valid}")
+    return len(stale)
+
+
+def _progress_key(pid: int) -> str:
+    return f"rejudge_{pid}"
+
+
+def start_progress(pid: int, total: int):
+    """Start counting a rejudge of `total` submissions, on top of a rejudge of the problem still running."""
+    _redis.eval(_START_PROGRESS, 1, _progress_key(pid), total, REJUDGE_PROGRESS_TTL)
+
+
+def advance_progress(pid: int):
+    _redis.hincrby(_progress_key(pid), "done", 1)
+
+
+def get_progress(pid: int) -> typing.Dict[str, int] | None:
+    progress = _redis.hgetall(_progress_key(pid))
+    if not progress:
+        return None
+    return {key.decode(): int(value) for key, value in progress.items()}
@@ -0,0 +1,75 @@
+"""
+引擎槽位计数：限制一台机器上同时运行的引擎进程数，评测、重测、交互三类worker节点及其全部子进程共用。
+
+每个槽位是 ENGINE_SLOT_DIR 下的一个锁文件，持有槽位即持有该文件的flock（LOCK_EX）。
+各个节点独立启动，不共享任何内存，但看到的是同一组文件；进程退出（包括被杀死）时内核释放它的锁，槽位不会泄漏。
+没有空闲槽位时按递增的间隔重试。
+"""
+import asyncio
+import contextlib
+import fcntl
+import multiprocessing
+import os
+import random
+import time
+
+from services.config import ENGINE_SLOTS, ENGINE_SLOT_DIR
+
+_in_use = multiprocessing.Value('i', 0)  # slots held by this worker node, prefork children included
+
+
+def _slot_path(index: int) -> str:
+    return os.path.join(ENGINE_SLOT_DIR, f"slot_{index}.lock")
+
+
+def _try_acquire() -> int | None:
+    """The descriptor holding a free slot's lock, None when every slot is taken."""
+    os.makedirs(ENGINE_SLOT_DIR, exist_ok=True)
+    start = random.randrange(ENGINE_SLOTS)  # spreads the waiters over the files
+    for offset in range(ENGINE_SLOTS):
+        fd = os.open(_slot_path((start + offset) % ENGINE_SLOTS), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        with _in_use.get_lock():
+            _in_use.value += 1
+        return fd
+    return None
+
+
+def _release(fd: int):
+    with _in_use.get_lock():
+        _in_use.value -= 1
+    os.close(fd)  # drops the lock
+
+
+@contextlib.contextmanager
+def engine_slot(max_interval: float = 0.05):
+    interval = 0.001
+    while (fd := _try_acquire()) is None:
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+    try:
+        yield
+    finally:
+        _release(fd)
+
+
+@contextlib.asynccontextmanager
+async def async_engine_slot(max_interval: float = 0.05):
+    """engine_slot for interactive runs, waits without blocking the event loop."""
+    interval = 0.001
+    while (fd := _try_acquire()) is None:
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, max_interval)
+    try:
+        yield
+    finally:
+        _release(fd)
+
+
+def slots_in_use() -> int:
+    """Slots held by this worker node; the other nodes of the machine hold theirs in the same files."""
+    return _in_use.value
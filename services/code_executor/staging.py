@@ -0,0 +1,66 @@
+"""
+源代码暂存：运行前把源代码放到引擎可以按路径打开的位置，运行结束后立即清理。
+
+- memfd: 匿名内存文件，路径为 /proc/{pid}/fd/{fd}（不用/proc/self，预fork的槽位并没有继承这个fd），关闭即释放
+- tmpfs: 写入内存文件系统上的目录，结束后删除
+- disk:  旧行为，写入工作目录下的Buffer/，结束后删除
+目录形式的暂存由后台清理线程兜底，处理进程崩溃等情况留下的文件。
+"""
+import os
+import pathlib
+import threading
+import typing
+
+from services.code_executor.utils import start_reaper
+from services.config import SOURCE_STAGING, SOURCE_STAGING_TMPFS_DIR
+
+
+class StagedSource:
+    def __init__(self, path: pathlib.Path, fd: int | None = None):
+        self.path = path
+        self._fd = fd
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        elif self.path is not None:
+            self.path.unlink(missing_ok=True)
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_reaped: typing.Set[typing.Tuple[int, pathlib.Path]] = set()  # (pid, directory), threads do not survive a fork
+_reaper_lock = threading.Lock()
+
+
+def _ensure_reaper(directory: pathlib.Path):
+    with _reaper_lock:
+        if (os.getpid(), directory) not in _reaped:
+            start_reaper([directory])
+            _reaped.add((os.getpid(), directory))
+
+
+def _stage_in_directory(directory: pathlib.Path, name: str, source_code: str) -> StagedSource:
+    directory.mkdir(parents=True, exist_ok=True)
+    _ensure_reaper(directory)
+    path = directory / f"{name}.pseudo"
+    with open(path, 'w') as file:
+        file.write(source_code)
+    return StagedSource(path)
+
+
+def stage_source(source_code: str, name: str, mode: typing.Literal["memfd", "tmpfs", "disk"] = SOURCE_STAGING,
+                 disk_root: pathlib.Path | None = None) -> StagedSource:
+    if mode == "memfd" and hasattr(os, "memfd_create"):
+        fd = os.memfd_create(f"{name}.pseudo", os.MFD_CLOEXEC)
+        os.write(fd, source_code.encode('utf-8'))
+        return StagedSource(pathlib.Path(f"/proc/{os.getpid()}/fd/{fd}"), fd)
+    if mode in ("memfd", "tmpfs") and pathlib.Path(SOURCE_STAGING_TMPFS_DIR).parent.is_dir():
+        return _stage_in_directory(pathlib.Path(SOURCE_STAGING_TMPFS_DIR), name, source_code)
+    return _stage_in_directory((disk_root or pathlib.Path.cwd()) / "Buffer", name, source_code)
@@ -0,0 +1,178 @@
+"""
+进程监管：所有存活的引擎进程登记在同一个监管线程中，按固定间隔批量采样CPU时间、RSS、峰值RSS与状态，
+执行墙钟时间截止，回收僵尸进程，并发布快照供其他组件读取。每个运行不再各自创建psutil对象或轮询。
+
+快照字典在每轮采样后整体替换，读取方不需要加锁，也不会拖慢采样。
+"""
+import os
+import signal
+import threading
+import time
+import typing
+from subprocess import Popen
+
+import psutil
+
+from services.code_executor.limits import read_peak_rss
+from services.config import SUPERVISOR_INTERVAL
+
+PSUTIL_STATUS_MAPPER = {
+    psutil.STATUS_RUNNING: "running",
+    psutil.STATUS_SLEEPING: "sleeping",
+    psutil.STATUS_DISK_SLEEP: "disk sleeping",
+    psutil.STATUS_STOPPED: "stopped",
+    psutil.STATUS_TRACING_STOP: "tracing stop",
+    psutil.STATUS_ZOMBIE: "zombie",
+    psutil.STATUS_DEAD: "dead",
+    psutil.STATUS_WAKING: "waking",
+    psutil.STATUS_IDLE: "idle",
+    psutil.STATUS_LOCKED: "locked"
+}
+
+
+class ThreadSafeDict:
+    def __init__(self):
+        self.dict: dict[str, typing.Any] = {}
+        self.lock = threading.Lock()
+
+    def set_item(self, key, value):
+        with self.lock:
+            self.dict[key] = value
+
+    def get_item(self, key):
+        with self.lock:
+            return self.dict.get(key)
+
+    def remove_item(self, key):
+        with self.lock:
+            return self.dict.pop(key, None)
+
+    def items(self):
+        with self.lock:
+            return list(self.dict.items())  # a copy, so callers can iterate without holding the lock
+
+    def __len__(self):
+        with self.lock:
+            return len(self.dict)
+
+
+class ProcessSnapshot(typing.TypedDict):
+    pid: int
+    status: str  # one of PSUTIL_STATUS_MAPPER's values
+    cpu_time: int  # ms, user + sys
+    rss: int  # KB
+    peak_memory: int  # KB, highest VmHWM seen
+    elapsed: float  # seconds since the process was registered
+    timed_out: bool  # killed by the supervisor at its deadline
+
+
+class _Watched:
+    def __init__(self, process: "Popen | typing.Any", deadline: float | None):
+        self.process = process
+        self.handle = psutil.Process(process.pid)
+        self.registered_at = time.monotonic()
+        self.deadline = deadline
+        self.snapshot: ProcessSnapshot = {
+            "pid": process.pid,
+            "status": PSUTIL_STATUS_MAPPER[psutil.STATUS_RUNNING],
+            "cpu_time": 0,
+            "rss": 0,
+            "peak_memory": 0,
+            "elapsed": 0.0,
+            "timed_out": False
+        }
+
+
+def _kill(process: "Popen | typing.Any"):
+    if isinstance(process, Popen):
+        process.kill()  # MeasuredPopen kills the whole process group
+        return
+    try:  # asyncio processes: Process.kill is not thread-safe, a plain signal is
+        os.kill(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _reap(process: "Popen | typing.Any"):
+    # asyncio processes are reaped by their event loop's child watcher
+    if isinstance(process, Popen):
+        process.poll()  # MeasuredPopen reaps with wait4 and keeps the rusage
+
+
+class Supervisor:
+    def __init__(self, interval: float = SUPERVISOR_INTERVAL):
+        self.interval = interval
+        self._watched = ThreadSafeDict()
+        self._snapshots: typing.Dict[str, ProcessSnapshot] = {}
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_running(self):
+        with self._start_lock:
+            # the thread does not survive a fork, and neither do the parent's processes
+            if self._thread is None or self._thread_pid != os.getpid():
+                if self._thread_pid is not None and self._thread_pid != os.getpid():
+                    self._watched = ThreadSafeDict()
+                    self._snapshots = {}
+                self._thread = threading.Thread(target=self._loop, name="supervisor", daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def register(self, key: str, process: "Popen | typing.Any", timeout: float | None = None):
+        """Watch `process` until `unregister(key)`; it is killed once it has run `timeout` seconds."""
+        self._ensure_running()
+        try:
+            watched = _Watched(process, None if timeout is None else time.monotonic() + timeout)
+        except psutil.NoSuchProcess:  # already gone, nothing left to watch
+            return
+        self._sample(watched, watched.registered_at)  # short runs may end before the next pass
+        self._watched.set_item(key, watched)
+        self._wakeup.set()
+
+    def unregister(self, key: str) -> ProcessSnapshot | None:
+        """Stop watching; returns the last snapshot taken."""
+        watched = self._watched.remove_item(key)
+        return watched.snapshot if watched is not None else None
+
+    def snapshot(self, key: str) -> ProcessSnapshot | None:
+        return self._snapshots.get(key)
+
+    def snapshots(self) -> typing.Dict[str, ProcessSnapshot]:
+        """All live processes as of the last pass; the dict is replaced, never mutated, so it can be kept."""
+        return self._snapshots
+
+    def _sample(self, watched: _Watched, now: float) -> ProcessSnapshot:
+        snapshot = dict(watched.snapshot)
+        try:
+            with watched.handle.oneshot():
+                cpu = watched.handle.cpu_times()
+                snapshot["rss"] = watched.handle.memory_info().rss // 1024
+                status = watched.handle.status()
+            snapshot["cpu_time"] = round((cpu.user + cpu.system) * 1000)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            status = psutil.STATUS_DEAD
+        snapshot["peak_memory"] = max(snapshot["peak_memory"], read_peak_rss(watched.process.pid))
+        snapshot["status"] = PSUTIL_STATUS_MAPPER.get(status, status)
+        snapshot["elapsed"] = now - watched.registered_at
+        if status == psutil.STATUS_ZOMBIE:
+            _reap(watched.process)
+        elif status != psutil.STATUS_DEAD and watched.deadline is not None and now >= watched.deadline:
+            _kill(watched.process)
+            snapshot["timed_out"] = True
+        watched.snapshot = snapshot
+        return snapshot
+
+    def _loop(self):
+        while True:
+            started = time.monotonic()
+            self._snapshots = {key: self._sample(watched, started) for key, watched in self._watched.items()}
+            if not self._snapshots:  # idle until the next register
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+supervisor = Supervisor()
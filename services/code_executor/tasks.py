@@ -0,0 +1,88 @@
+import asyncio
+
+import redis.asyncio
+from sqlalchemy import select
+
+import database
+from models import user, test_sample, problem, runtime_info, source_code, submission
+from models.submission import Submission
+from services.code_executor.code_manager import ExecutionManager
+from services.code_executor.judge import judge_submission
+from services.code_executor.rejudge import rejudge_submission, start_progress, advance_progress
+from services.config import REDIS_SERVER_IP, REDIS_PORT, REJUDGE_RATE_LIMIT
+from services.main import app
+from services.scheduler import QueueClass, release_user_share
+from utils.logger import logger
+
+
+@app.task(name="judge_submission")
+def judge_submission_task(submit_id: int):
+    session = database.SessionLocal()
+    submission = session.get(Submission, submit_id)
+    try:
+        if submission is None:  # deleted while queued; acknowledged without a retry
+            logger.warning(f"Submission({submit_id}) to judge no longer exists")
+            return
+        judge_submission(session, submission)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to judge submission({submit_id}): {e.args}")
+        raise
+    finally:
+        if submission is not None:
+            release_user_share(QueueClass.JUDGE, submission.sid)
+        session.close()
+
+
+@app.task(name="rejudge_problem")
+def rejudge_problem_task(pid: int):
+    """Fan out one throttled rejudge task per judged submission of the problem."""
+    session = database.SessionLocal()
+    try:
+        submit_ids = session.scalars(
+            select(Submission.submit_id).where(Submission.pid == pid, Submission.judged_at.is_not(None))
+        ).all()
+    finally:
+        session.close()
+    start_progress(pid, len(submit_ids))
+    for submit_id in submit_ids:
+        rejudge_submission_task.delay(submit_id, pid)
+
+
+@app.task(name="rejudge_submission", rate_limit=REJUDGE_RATE_LIMIT)
+def rejudge_submission_task(submit_id: int, pid: int):
+    session = database.SessionLocal()
+    submission = session.get(Submission, submit_id)
+    try:
+        if submission is None:
+            logger.warning(f"Submission({submit_id}) to rejudge no longer exists")
+            return
+        rejudge_submission(session, submission)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to rejudge submission({submit_id}): {e.args}")
+        raise
+    finally:
+        advance_progress(pid)  # counted even when it failed, so the progress can finish
+        session.close()
+
+
+async def _interactive_run(source_code: str, connection_id: str):
+    redis_instance = redis.asyncio.Redis(host=REDIS_SERVER_IP, port=REDIS_PORT)
+    try:
+        await ExecutionManager(source_code, connection_id, redis_instance).run()
+    finally:
+        await redis_instance.aclose()
+
+
+@app.task(name="interactive_run")
+def interactive_run_task(source_code: str, connection_id: str, sid: str | None = None):
+    """Run one interactive session; output goes to output_{connection_id}, input comes from input_{connection_id}."""
+    try:
+        asyncio.run(_interactive_run(source_code, connection_id))
+    except Exception as e:
+        logger.error(f"Interactive run({connection_id}) failed: {e.args}")
+        raise
+    finally:
+        if sid is not None:
+            release_user_share(QueueClass.INTERACTIVE, sid)
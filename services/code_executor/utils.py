@@ -1,10 +1,64 @@
 import pathlib
 import datetime
+import threading
+import time
+import typing
+
+from services.config import BUFFER_REAP_INTERVAL, BUFFER_MAX_AGE, BUFFER_MAX_SIZE
+from utils.logger import logger
 
 FORMAT = ''
 
 
 def clean_files(
         until_date: datetime.datetime,
-):
-    ...
+        directory: pathlib.Path = pathlib.Path.cwd() / "Buffer",
+        max_total_size: int | None = BUFFER_MAX_SIZE,
+) -> int:
+    """删除目录中修改时间早于until_date的文件；剩余文件总大小仍超过max_total_size(字节)时从最旧的开始删除。返回删除的文件数。"""
+    if not directory.is_dir():
+        return 0
+    deadline = until_date.timestamp()
+    removed = 0
+    remaining: typing.List[typing.Tuple[float, int, pathlib.Path]] = []
+    for path in directory.iterdir():
+        try:
+            stat = path.stat()
+            if not path.is_file():
+                continue
+            if stat.st_mtime < deadline:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                remaining.append((stat.st_mtime, stat.st_size, path))
+        except OSError:  # removed concurrently by the run that owns it
+            continue
+    if max_total_size is not None:
+        total_size = sum(size for _, size, _ in remaining)
+        for _, size, path in sorted(remaining):
+            if total_size <= max_total_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+            removed += 1
+    return removed
+
+
+def start_reaper(directories: typing.List[pathlib.Path], interval: float = BUFFER_REAP_INTERVAL) -> threading.Thread:
+    """后台线程，定期清理运行结束后未被删除的暂存源文件（例如进程崩溃时留下的）。"""
+    def reap():
+        while True:
+            until_date = datetime.datetime.now() - datetime.timedelta(seconds=BUFFER_MAX_AGE)
+            for directory in directories:
+                try:
+                    removed = clean_files(until_date, directory)
+                except Exception as e:
+                    logger.error(f"Failed to clean {directory}: {repr(e)}")
+                    continue
+                if removed:
+                    logger.info(f"Reaped {removed} leftover files from {directory}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=reap, name="buffer-reaper", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,98 @@
+"""
+评测结果缓存：以 (规范化源代码, 语言, 题目测试数据指纹) 的哈希为键，命中时直接复用各样例的结果，无需运行引擎。
+
+缓存放在redis中（`verdict_{键}`），所有评测进程（celery prefork子进程）共用。
+测试数据指纹覆盖每个样例的sid/输入与输出的摘要以及时间、内存限制，样例一旦变化键随之变化，旧条目不会再被命中，
+因此不需要主动失效。
+
+条目数按LRU限制在VERDICT_CACHE_SIZE以内：有序集合 `verdict_cache_lru` 记录每个键最近一次读写的时间，
+写入后超出容量时删除最久未用的条目，读写与淘汰各在一个Lua脚本中完成。不依赖redis服务器的maxmemory-policy，
+broker与其他计数器也在同一个redis中，不能被全局的LRU淘汰。长期不用的条目另外在VERDICT_CACHE_TTL后过期。
+"""
+import hashlib
+import json
+import time
+import typing
+
+import redis
+
+from services.config import REDIS_SERVER_IP, REDIS_PORT, VERDICT_CACHE_TTL, VERDICT_CACHE_SIZE
+from utils.logger import logger
+
+if typing.TYPE_CHECKING:
+    from models.problem import Problem
+    from models.test_sample import TestSample
+    from services.code_executor.judge import SampleResult
+
+
+_redis = redis.Redis(host=REDIS_SERVER_IP, port=REDIS_PORT, db=0)
+ENTRY_PREFIX = "verdict_"
+LRU_KEY = "verdict_cache_lru"
+
+# KEYS: entry, lru index; ARGV: now, cache key, ttl. A hit counts as a use
+_GET = """
+local entry = redis.call('get', KEYS[1])
+if entry then
+    redis.call('zadd', KEYS[2], ARGV[1], ARGV[2])
+    redis.call('expire', KEYS[1], ARGV[3])
+end
+return entry
+"""
+# KEYS: entry, lru index; ARGV: now, cache key, ttl, value, capacity, entry prefix
+_PUT = """
+redis.call('set', KEYS[1], ARGV[4], 'EX', ARGV[3])
+redis.call('zadd', KEYS[2], ARGV[1], ARGV[2])
+local excess = redis.call('zcard', KEYS[2]) - tonumber(ARGV[5])
+if excess > 0 then
+    for _, key in ipairs(redis.call('zrange', KEYS[2], 0, excess - 1)) do
+        redis.call('del', ARGV[6] .. key)
+    end
+    redis.call('zremrangebyrank', KEYS[2], 0, excess - 1)
+end
+return excess
+"""
+
+
+def normalize_source(code: str) -> str:
+    """Line endings, trailing spaces and trailing blank lines do not change what a program does."""
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    while lines and lines[-1] == "":
+        lines.pop()
+    return "\n".join(lines)
+
+
+def test_set_fingerprint(problem: "Problem", samples: typing.Iterable["TestSample"]) -> str:
+    digest = hashlib.sha256(f"{problem.time_limit}\0{problem.memory_limit}".encode())
+    for sample in samples:
+        digest.update(f"\0{sample.sid}\0{sample.input_digest}\0{sample.output_digest}".encode())
+    return digest.hexdigest()
+
+
+def make_key(code: str, language: str, fingerprint: str) -> str:
+    return hashlib.sha256(f"{language}\0{fingerprint}\0{normalize_source(code)}".encode()).hexdigest()
+
+
+class VerdictCache:
+    """Shared through redis by every judging process; an unreachable redis only means a miss."""
+
+    def __init__(self, capacity: int = VERDICT_CACHE_SIZE, ttl: int = VERDICT_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+
+    def get(self, key: str) -> typing.Optional[typing.List["SampleResult"]]:
+        try:
+            entry = _redis.eval(_GET, 2, f"{ENTRY_PREFIX}{key}", LRU_KEY, time.time(), key, self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Verdict cache unavailable: {e.args}")
+            return None
+        return json.loads(entry) if entry is not None else None  # statuses come back as plain strings
+
+    def put(self, key: str, results: typing.List["SampleResult"]):
+        try:
+            _redis.eval(_PUT, 2, f"{ENTRY_PREFIX}{key}", LRU_KEY, time.time(), key, self.ttl, json.dumps(results),
+                        self.capacity, ENTRY_PREFIX)
+        except redis.RedisError as e:
+            logger.warning(f"Verdict cache unavailable: {e.args}")
+
+
+verdict_cache = VerdictCache()
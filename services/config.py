@@ -1,2 +1,101 @@
+import os
+import tempfile
+
 REDIS_SERVER_IP = "127.0.0.1"
 REDIS_PORT = 6379
+
+# Judging
+JUDGE_MAX_WORKERS = os.cpu_count() or 1  # 同时运行的评测引擎进程上限
+
+# Engine pool
+ENGINE_POOL_ENABLED = True
+ENGINE_POOL_SIZE = JUDGE_MAX_WORKERS  # pre-forked idle engine slots kept per process
+ENGINE_POOL_LOW_WATER = max(1, ENGINE_POOL_SIZE // 2)  # refill once the idle slots drop below this
+ENGINE_POOL_MAX_IDLE = 300  # seconds before an idle slot is recycled
+
+# Interactive output shipping
+OUTPUT_FLUSH_BYTES = 8 * 1024  # flush once this much output is buffered
+OUTPUT_FLUSH_INTERVAL = 0.05  # seconds, flush at least this often while output is pending
+OUTPUT_QUEUE_MAX_LEN = 1024  # chunks kept in output_{connection_id}, oldest are dropped
+OUTPUT_QUEUE_TTL = 600  # seconds, so abandoned sessions do not leak keys
+OUTPUT_QUEUE_HIGH_WATER = 64  # chunks waiting in redis before the run is paused until the reader catches up
+OUTPUT_STALL_TIMEOUT = 60  # seconds a paused run waits for its reader before it is ended
+
+# Interactive input delivery
+INPUT_SESSION_TIMEOUT = 300  # seconds a run may wait for input before it is killed
+
+# Interactive runner websockets
+RUNNER_MAX_CONNECTIONS = 256  # websockets per API process, each keeps one redis connection in a blocking read
+RUNNER_REDIS_POOL_SIZE = RUNNER_MAX_CONNECTIONS + 32  # the rest serves the short commands (input, cancel, cleanup)
+
+# Resource limits
+JUDGE_WALL_TIME_FACTOR = 3  # wall-clock timeout = CPU time limit * factor + 1s, catches sleeping/blocked runs
+ENGINE_ADDRESS_SPACE_OVERHEAD = 256  # MB of virtual memory allowed on top of a problem's memory limit
+MEMORY_LIMIT_CRASH_RATIO = 0.9  # a crashed run whose peak RSS reached this share of the memory limit ran out of memory
+ALLOCATION_FAILURE_MARKERS = ("bad_alloc", "out of memory", "cannot allocate memory")  # lowercased engine stderr
+INTERACTIVE_CPU_LIMIT = 10  # seconds
+INTERACTIVE_MEMORY_LIMIT = 64  # MB
+
+# Source staging
+SOURCE_STAGING = "memfd"  # "memfd", "tmpfs" or "disk"; falls back in that order when unsupported
+SOURCE_STAGING_TMPFS_DIR = "/dev/shm/pseudo-oj"
+BUFFER_REAP_INTERVAL = 60  # seconds between reaper passes
+BUFFER_MAX_AGE = 600  # seconds, staged files older than this are leftovers
+BUFFER_MAX_SIZE = 256 * 1024 * 1024  # bytes kept in a staging directory before the oldest are removed
+
+# Verdict cache
+VERDICT_CACHE_SIZE = 100_000  # judged (source, test set) pairs kept in redis, least recently used evicted first
+VERDICT_CACHE_TTL = 7 * 24 * 60 * 60  # seconds an unused entry is kept at most
+
+# Celery judge worker
+WORKER_POOL = "prefork"  # "prefork", "threads" or "solo"; celery has no asyncio pool, interactive runs use asyncio inside each task
+WORKER_CONCURRENCY = JUDGE_MAX_WORKERS  # tasks run at once by one worker
+WORKER_PREFETCH_MULTIPLIER = 1  # with late acks, a busy process does not hold queued tasks
+ENGINE_SLOTS = JUDGE_MAX_WORKERS  # engines running at once on this machine, across every worker node and interactive run
+ENGINE_SLOT_DIR = os.path.join(tempfile.gettempdir(), "pseudo-oj-slots")  # one lock file per slot, shared by the nodes
+
+# Scheduling
+QUEUE_WEIGHTS = {"interactive": 4, "judge": 3, "rejudge": 1}  # share of WORKER_CONCURRENCY per queue class
+USER_INFLIGHT_LIMIT = {"interactive": 2, "judge": 3, "rejudge": None}  # per-user tasks queued or running, None = no limit
+USER_INFLIGHT_TTL = 600  # seconds, releases the share of a task whose worker died
+
+# Rejudge
+REJUDGE_RATE_LIMIT = "60/m"  # rejudged submissions per worker node
+REJUDGE_PROGRESS_TTL = 24 * 3600  # seconds the progress of a finished rejudge stays readable
+
+# Output comparison
+JUDGE_COMPARE_MODE = "whitespace"  # "exact", "whitespace" or "token"
+JUDGE_FLOAT_TOLERANCE = None  # e.g. 1e-6, only used in token mode
+
+# Test data blob store
+BLOB_STORE_DIR = "./Blobs"  # content-addressed test inputs / outputs, named by sha256
+BLOB_CHUNK_SIZE = 1024 * 1024  # bytes read / written at a time when streaming a blob
+BLOB_GC_GRACE_PERIOD = 60 * 60  # seconds a blob no sample refers to is kept: a sample being added or judged may use it
+BLOB_GC_INTERVAL = 6 * 60 * 60  # seconds between sweeps of the blob store for unreferenced blobs
+
+# Process supervisor
+SUPERVISOR_INTERVAL = 0.02  # seconds between sampling passes over all live engine processes
+
+# Judging engine
+JUDGE_ENGINE = "external"  # "external" (PseudoEngine2), "interpreter" (in-process) or "auto" (interpreter, external for unsupported syntax)
+INTERPRETER_STEPS_PER_SECOND = 2_000_000  # statements / loop iterations that count as one second of CPU time
+INTERPRETER_MAX_CALL_DEPTH = 150  # nested procedure / function calls before "Stack overflow"
+INTERPRETER_STACK_SIZE = 256 * 1024 * 1024  # bytes of stack reserved for the thread running a program
+INTERPRETER_CACHE_SIZE = 256  # compiled programs kept per process
+LINT_CACHE_SIZE = 4096  # syntax pre-check results kept per API process, by source hash
+
+# Database access from the API
+DB_EXECUTOR_WORKERS = 8  # threads running blocking database calls for the async routes, also the pooled connections kept
+DB_READ_POOL_SIZE = DB_EXECUTOR_WORKERS  # read-only connections kept
+DB_WRITE_BATCH_SIZE = 256  # queued writes committed in one transaction at most
+
+# SQLite
+SQLITE_SYNCHRONOUS = "NORMAL"  # with WAL, a crash may lose the last commits but never corrupts the database
+SQLITE_BUSY_TIMEOUT = 5000  # ms a connection waits for another process's write lock before "database is locked"
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file read through mmap
+MIGRATION_LOCK_TIMEOUT = 10 * 60 * 1000  # ms a process waits at startup while another one applies the migrations
+
+# Problem statistics
+PROBLEM_STATS_FLUSH_INTERVAL = 5  # seconds between write-backs of the accepted / submit / solved increments
+PROBLEM_STATS_FLUSH_LOCK_TTL = 60  # seconds, frees the write-back lock of a process that died holding it
+PROBLEM_STATS_BATCH_RETENTION = 24 * 60 * 60  # seconds the ids of written back batches are kept to skip a retry
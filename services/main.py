@@ -1,27 +1,50 @@
+import argparse
 import time
 from celery import Celery
-from services.config import REDIS_SERVER_IP, REDIS_PORT
+from services.config import REDIS_SERVER_IP, REDIS_PORT, WORKER_POOL, WORKER_CONCURRENCY, \
+    WORKER_PREFETCH_MULTIPLIER
+from services.scheduler import QueueClass, TASK_ROUTES, start_scheduled_workers
+import services.code_executor.slots  # noqa: F401, the slot counter must exist before the pool forks
 
 broker_url = f"redis://{REDIS_SERVER_IP}:{REDIS_PORT}/{0}"
 
 app = Celery('services.main',
              broker=broker_url,
              backend=broker_url)
+app.conf.update(
+    task_acks_late=True,  # a task is acknowledged when it finishes, so it is only reserved by a free process
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=WORKER_PREFETCH_MULTIPLIER,
+    task_routes=TASK_ROUTES,
+    task_default_queue=QueueClass.JUDGE.value,
+)
 
 
-def start_celery(concurrency=10):
+def start_celery(concurrency=WORKER_CONCURRENCY, pool=WORKER_POOL, queues: str | None = None):
     argv = [
         'worker',
         '--loglevel=INFO',
-        '--pool=solo',
-        f'--concurrency={concurrency}'
+        f'--pool={pool}',
+        f'--concurrency={concurrency}',
+        f'--prefetch-multiplier={WORKER_PREFETCH_MULTIPLIER}'
     ]
-    app.autodiscover_tasks()
+    if queues is not None:
+        argv += [f'--queues={queues}', f'--hostname={queues}@%h']
+    app.autodiscover_tasks(['services.code_executor'])
     app.worker_main(argv)
 
 
 if __name__ == "__main__":
-    start_celery()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queues', default=None, help="consume only these queues; all classes when omitted")
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument('--pool', default=WORKER_POOL)
+    args = parser.parse_args()
+    if args.queues is None:
+        for worker in start_scheduled_workers(args.concurrency, args.pool):
+            worker.wait()
+    else:
+        start_celery(args.concurrency, args.pool, args.queues)
     from utils.logger import logger
 
 # 1. 需要一个cycle来根据条件来handle各种事件 beater
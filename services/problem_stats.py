@@ -0,0 +1,218 @@
+"""
+题目统计（accepted / submit / solved）的计数聚合：评测结果不再逐条更新热点的 problem 行。
+增量先用 HINCRBY 累积在redis哈希 `problem_stats_pending` 中（字段为 `{pid}:{计数名}`），
+后台线程每 PROBLEM_STATS_FLUSH_INTERVAL 秒把所有题目的增量在一个事务中写回数据库；
+读取时返回数据库中的值加上尚未写回的增量。
+
+- solved 是通过该题的不同用户数：通过的用户记在redis集合 `problem_solvers_{pid}` 中，SADD 新增成员时 solved 才加一；
+  集合丢失（如redis重启）时按数据库中已通过的提交重建
+- 同一时刻只有一个进程写回（`problem_stats_flush_lock`，值为持有者的随机令牌，只由持有者删除）：
+  待写回的哈希先整体改名为 `problem_stats_flushing` 并分配一个批次号，提交成功后删除；
+  进程在两步之间退出时，下一次写回先处理遗留的这一份
+- 批次号与增量在同一个事务中写入 problem_stats_batch，遗留的批次已经提交过时只删除，不会重复累加
+"""
+import datetime
+import os
+import threading
+import time
+import typing
+import uuid
+
+import redis
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+import database
+from models.problem import Problem, ProblemStatsBatch
+from models.submission import Submission
+from services.config import REDIS_SERVER_IP, REDIS_PORT, PROBLEM_STATS_FLUSH_INTERVAL, PROBLEM_STATS_FLUSH_LOCK_TTL, \
+    PROBLEM_STATS_BATCH_RETENTION
+from utils.logger import logger
+
+COUNTERS = ("accepted", "submit", "solved")
+PENDING_KEY = "problem_stats_pending"
+FLUSHING_KEY = "problem_stats_flushing"
+FLUSH_BATCH_KEY = "problem_stats_flushing_batch"
+FLUSH_LOCK_KEY = "problem_stats_flush_lock"
+_SEEDED = ""  # placeholder member, so a problem nobody has solved yet still has a (seeded) set
+
+_redis = redis.Redis(host=REDIS_SERVER_IP, port=REDIS_PORT, db=0)
+
+# KEYS: pending, flushing, batch id; ARGV: a new batch id. Returns the batch id to write back, nil if nothing is pending
+_TAKE_BATCH = """
+if redis.call('exists', KEYS[2]) == 0 then
+    if redis.call('exists', KEYS[1]) == 0 then
+        return false
+    end
+    redis.call('rename', KEYS[1], KEYS[2])
+    redis.call('del', KEYS[3])
+end
+redis.call('set', KEYS[3], ARGV[1], 'NX')
+return redis.call('get', KEYS[3])
+"""
+# KEYS: flushing, batch id; ARGV: the batch id written back. A later batch of another flusher is left alone
+_DROP_BATCH = """
+if redis.call('get', KEYS[2]) == ARGV[1] then
+    return redis.call('del', KEYS[1], KEYS[2])
+end
+return 0
+"""
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _field(pid: int, counter: str) -> str:
+    return f"{pid}:{counter}"
+
+
+def _solvers_key(pid: int) -> str:
+    return f"problem_solvers_{pid}"
+
+
+def _ensure_solvers(pid: int, submit_id: int):
+    """Rebuild a lost solver set from the accepted submissions stored before `submit_id` was counted."""
+    key = _solvers_key(pid)
+    if _redis.exists(key):
+        return
+    with database.SessionLocal() as session:
+        sids = session.scalars(select(Submission.sid).distinct().where(
+            Submission.pid == pid, Submission.valid.is_(True), Submission.submit_id != submit_id
+        )).all()
+    _redis.sadd(key, _SEEDED, *sids)
+
+
+def _add_solver(pid: int, sid: str, submit_id: int) -> int:
+    _ensure_solvers(pid, submit_id)
+    return _redis.sadd(_solvers_key(pid), sid)
+
+
+def _has_other_accepted(pid: int, sid: str, submit_id: int) -> bool:
+    with database.SessionLocal() as session:
+        return session.scalar(select(Submission.submit_id).where(
+            Submission.pid == pid, Submission.sid == sid, Submission.valid.is_(True), Submission.submit_id != submit_id
+        ).limit(1)) is not None
+
+
+def _increment(pid: int, deltas: typing.Dict[str, int]):
+    with _redis.pipeline() as pipe:
+        for counter, delta in deltas.items():
+            if delta:
+                pipe.hincrby(PENDING_KEY, _field(pid, counter), delta)
+        pipe.execute()
+    flusher.ensure_running()
+
+
+def record_judged(pid: int, sid: str, submit_id: int, valid: bool):
+    """Count a newly judged submission, once its verdict is stored."""
+    deltas = {"submit": 1}
+    if valid:
+        deltas["accepted"] = 1
+        deltas["solved"] = _add_solver(pid, sid, submit_id)
+    _increment(pid, deltas)
+
+
+def record_rejudged(pid: int, sid: str, submit_id: int, was_valid: bool | None, valid: bool):
+    """A rejudge that flips a verdict moves accepted, and solved when it was the user's only accepted one."""
+    if bool(was_valid) == valid:
+        return
+    if valid:
+        _increment(pid, {"accepted": 1, "solved": _add_solver(pid, sid, submit_id)})
+    elif _has_other_accepted(pid, sid, submit_id):
+        _increment(pid, {"accepted": -1})
+    else:
+        _increment(pid, {"accepted": -1, "solved": -_redis.srem(_solvers_key(pid), sid)})
+
+
+def live_counts(problem: Problem) -> typing.Dict[str, int]:
+    """The stored counters of `problem` plus the increments not written back yet.
+
+    A batch counts twice between the commit of its write-back and the deletion of `problem_stats_flushing`,
+    normally a single redis round trip; if the flusher dies in between, until the next write-back drops it.
+    """
+    fields = [_field(problem.pid, counter) for counter in COUNTERS]
+    try:
+        with _redis.pipeline() as pipe:
+            pipe.hmget(PENDING_KEY, fields)
+            pipe.hmget(FLUSHING_KEY, fields)
+            pending, flushing = pipe.execute()
+    except redis.RedisError as e:  # the problem page stays up, a few seconds behind
+        logger.warning(f"Problem statistics of problem({problem.pid}) without pending increments: {e.args}")
+        pending = flushing = [None] * len(COUNTERS)
+    return {
+        counter: (getattr(problem, counter) or 0) + int(pending[i] or 0) + int(flushing[i] or 0)
+        for i, counter in enumerate(COUNTERS)
+    }
+
+
+class StatsFlusher:
+    """Writes the pending increments back on an interval; every process may run one, the redis lock picks one."""
+
+    def __init__(self, interval: float = PROBLEM_STATS_FLUSH_INTERVAL):
+        self.interval = interval
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def ensure_running(self):
+        with self._start_lock:
+            # the thread does not survive a fork (prefork celery workers)
+            if self._thread is None or self._thread_pid != os.getpid():
+                self._thread = threading.Thread(target=self._loop, name="problem-stats-flusher", daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush problem statistics: {e.args}")
+
+    def flush(self) -> int:
+        """Write back everything pending in one transaction; returns the number of problems updated."""
+        token = uuid.uuid4().hex
+        if not _redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=PROBLEM_STATS_FLUSH_LOCK_TTL):
+            return 0
+        try:
+            # increments from now on go to a new pending hash; a batch left by a dead flusher keeps its id
+            batch_id = _redis.eval(_TAKE_BATCH, 3, PENDING_KEY, FLUSHING_KEY, FLUSH_BATCH_KEY, uuid.uuid4().hex)
+            if batch_id is None:
+                return 0
+            batch_id = batch_id.decode()
+            rows: typing.Dict[int, typing.Dict[str, int]] = {}
+            for field, delta in _redis.hgetall(FLUSHING_KEY).items():
+                pid, counter = field.decode().split(":")
+                rows.setdefault(int(pid), {f"d_{name}": 0 for name in COUNTERS})[f"d_{counter}"] = int(delta)
+
+            def store(write_session: Session) -> bool:
+                if write_session.get(ProblemStatsBatch, batch_id) is not None:  # committed before a crash
+                    return False
+                table = Problem.__table__
+                write_session.execute(  # coalesce: a NULL counter would swallow the increment
+                    update(table).where(table.c.pid == bindparam("b_pid")).values(
+                        {name: func.coalesce(table.c[name], 0) + bindparam(f"d_{name}") for name in COUNTERS}
+                    ),
+                    [{"b_pid": pid, **deltas} for pid, deltas in rows.items()]
+                )
+                now = datetime.datetime.utcnow()
+                write_session.execute(insert(ProblemStatsBatch).values(batch_id=batch_id, applied_at=now))
+                write_session.execute(delete(ProblemStatsBatch).where(
+                    ProblemStatsBatch.applied_at < now - datetime.timedelta(seconds=PROBLEM_STATS_BATCH_RETENTION)
+                ))
+                return True
+
+            applied = bool(rows) and database.writer.write(store)
+            if rows and not applied:
+                logger.info(f"Problem statistics batch {batch_id} was already written back")
+            _redis.eval(_DROP_BATCH, 2, FLUSHING_KEY, FLUSH_BATCH_KEY, batch_id)
+            return len(rows) if applied else 0
+        finally:
+            _redis.eval(_RELEASE_LOCK, 1, FLUSH_LOCK_KEY, token)
+
+
+flusher = StatsFlusher()
@@ -0,0 +1,86 @@
+"""
+调度层：交互运行、评测、重测三类任务分别进入独立的celery队列，每类队列由独立的worker节点消费，
+并发数按QUEUE_WEIGHTS分配，因此考试期间交互延迟与评测吞吐互不影响。
+
+每个用户在每类队列中排队或运行中的任务数受USER_INFLIGHT_LIMIT限制（redis计数器），
+防止单个学生刷提交饿死整个班级。
+"""
+import enum
+import subprocess
+import sys
+import typing
+
+import redis
+
+from services.config import REDIS_SERVER_IP, REDIS_PORT, QUEUE_WEIGHTS, USER_INFLIGHT_LIMIT, USER_INFLIGHT_TTL, \
+    WORKER_CONCURRENCY, WORKER_POOL
+
+
+class QueueClass(str, enum.Enum):
+    INTERACTIVE = "interactive"
+    JUDGE = "judge"
+    REJUDGE = "rejudge"
+
+
+TASK_ROUTES = {
+    "interactive_run": {"queue": QueueClass.INTERACTIVE.value},
+    "judge_submission": {"queue": QueueClass.JUDGE.value},
+    "rejudge_*": {"queue": QueueClass.REJUDGE.value},
+}
+
+_redis = redis.Redis(host=REDIS_SERVER_IP, port=REDIS_PORT, db=0)  # same db as the broker, so LLEN sees the queues
+
+
+def _inflight_key(queue: QueueClass, sid: str) -> str:
+    return f"inflight_{queue.value}_{sid}"
+
+
+def acquire_user_share(queue: QueueClass, sid: str) -> bool:
+    """Count one more task of `sid` in `queue`; False (and nothing counted) when the user is at the limit."""
+    limit = USER_INFLIGHT_LIMIT.get(queue.value)
+    if limit is None:
+        return True
+    key = _inflight_key(queue, sid)
+    with _redis.pipeline() as pipe:
+        pipe.incr(key)
+        pipe.expire(key, USER_INFLIGHT_TTL)
+        count, _ = pipe.execute()
+    if count > limit:
+        _redis.decr(key)
+        return False
+    return True
+
+
+def release_user_share(queue: QueueClass, sid: str):
+    if USER_INFLIGHT_LIMIT.get(queue.value) is None:
+        return
+    key = _inflight_key(queue, sid)
+    if _redis.decr(key) <= 0:
+        _redis.delete(key)
+
+
+def queue_depths() -> typing.Dict[str, int]:
+    """Tasks waiting in each queue class (not counting the ones already reserved by a worker)."""
+    with _redis.pipeline(transaction=False) as pipe:
+        for queue in QueueClass:
+            pipe.llen(queue.value)
+        depths = pipe.execute()
+    return {queue.value: depth for queue, depth in zip(QueueClass, depths)}
+
+
+def concurrency_for(queue: QueueClass, total: int = WORKER_CONCURRENCY) -> int:
+    share = QUEUE_WEIGHTS[queue.value] / sum(QUEUE_WEIGHTS.values())
+    return max(1, round(total * share))
+
+
+def start_scheduled_workers(total: int = WORKER_CONCURRENCY, pool: str = WORKER_POOL) -> typing.List[subprocess.Popen]:
+    """One worker node per queue class, with concurrency split by weight."""
+    workers = []
+    for queue in QueueClass:
+        workers.append(subprocess.Popen([
+            sys.executable, '-m', 'services.main',
+            '--queues', queue.value,
+            '--concurrency', str(concurrency_for(queue, total)),
+            '--pool', pool,
+        ]))
+    return workers
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import database
+from services.code_executor.limits import ResourceLimits
+
+
+@pytest.fixture
+def limits() -> ResourceLimits:
+    return ResourceLimits(cpu_time=1, memory=64)
+
+
+@pytest.fixture
+def sqlite_url(tmp_path, monkeypatch) -> str:
+    """A fresh database file; create_write_engine and the migration runner pick the URL up from `database`."""
+    url = f"sqlite:///{tmp_path / 'db.sqlite3'}"
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", url)
+    return url
+
+
+@pytest.fixture
+def writer(sqlite_url, monkeypatch) -> database.GroupCommitWriter:
+    """A group-commit writer on the fresh database, installed as `database.writer`."""
+    engine = database.create_write_engine(pool_size=1, max_overflow=0)
+    writer = database.GroupCommitWriter(sessionmaker(autoflush=False, bind=engine, expire_on_commit=False))
+    monkeypatch.setattr(database, "writer", writer)
+    yield writer
+    engine.dispose()
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from services.code_executor import code_manager
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """A stand-in for PseudoEngine2 under the working directory; its script is the shell body."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(code_manager, "ENGINE_POOL_ENABLED", False)
+    (tmp_path / "Pseudo").mkdir()
+    path = tmp_path / "Pseudo" / "PseudoEngine2"
+
+    def install(script: str):
+        path.write_text(f"#!/bin/sh\n{script}\n")
+        path.chmod(0o755)
+    return install
+
+
+def test_communicate_flushes_a_truncated_character_at_eof(engine):
+    engine(r"printf 'ab\344\270'; printf 'e\344' >&2")  # the first bytes of a three-byte character
+    result = code_manager.CodeExecutor("").communicate(timeout=5)
+    assert result["result"] == "ab\ufffd"
+    assert result["error"] == "e\ufffd"
+
+
+def test_async_run_flushes_a_truncated_character_at_eof(engine):
+    engine(r"printf 'ab\344\270'")
+
+    async def collect() -> str:
+        executor = code_manager.AsyncCodeExecutor("")
+        return "".join([signal["result"]["output"] async for signal in executor.run()
+                        if signal["type"] == code_manager.RunStatus.OUTPUT])
+    assert asyncio.run(collect()) == "ab\ufffd"
@@ -0,0 +1,75 @@
+import pytest
+
+from services.code_executor.comparator import CompareMode, StreamingComparator
+
+
+def compare(expected: str, chunks, mode: CompareMode, float_tolerance=None) -> bool:
+    comparator = StreamingComparator(expected, mode, float_tolerance)
+    for chunk in chunks:
+        if not comparator.feed(chunk):
+            return False
+    return comparator.finish()
+
+
+@pytest.mark.parametrize("mode", list(CompareMode))
+def test_identical_output_matches_however_it_is_chunked(mode):
+    expected = "1 2\n3\nabc\n"
+    assert compare(expected, [expected], mode)
+    assert compare(expected, list(expected), mode)
+    assert compare(expected, ["1 2\n3", "\nab", "c\n"], mode)
+
+
+def test_exact_mode_counts_every_character():
+    assert not compare("1\n", ["1\n\n"], CompareMode.EXACT)
+    assert not compare("1\n", ["1 \n"], CompareMode.EXACT)
+    assert not compare("1\n", ["1"], CompareMode.EXACT)
+
+
+def test_whitespace_mode_ignores_trailing_spaces_and_blank_lines():
+    assert compare("1\n2\n", ["1   \n", "2\r\n", "\n\n"], CompareMode.WHITESPACE)
+    assert compare("1\n2\n\n", ["1\n2"], CompareMode.WHITESPACE)
+    assert not compare("1 2\n", ["1  2\n"], CompareMode.WHITESPACE)
+    assert not compare("1\n2\n", ["1\n"], CompareMode.WHITESPACE)
+    assert not compare("1\n", ["1\n\nx"], CompareMode.WHITESPACE)
+
+
+def test_token_mode_compares_whitespace_separated_tokens():
+    assert compare("1 2\n3\n", ["1\n2    3"], CompareMode.TOKEN)
+    assert not compare("1 2\n", ["1 23"], CompareMode.TOKEN)
+    assert not compare("1 2\n", ["1"], CompareMode.TOKEN)
+    assert not compare("1\n", ["1 2"], CompareMode.TOKEN)
+
+
+def test_token_mode_float_tolerance():
+    assert compare("0.333333\n", ["0.3333331"], CompareMode.TOKEN, float_tolerance=1e-6)
+    assert compare("2\n", ["2.0000000001"], CompareMode.TOKEN, float_tolerance=1e-6)
+    assert not compare("0.333\n", ["0.334"], CompareMode.TOKEN, float_tolerance=1e-6)
+    assert not compare("0.333333\n", ["0.3333331"], CompareMode.TOKEN)
+
+
+@pytest.mark.parametrize("mode", list(CompareMode))
+def test_first_difference_stops_the_comparison(mode):
+    comparator = StreamingComparator("1\n2\n3\n", mode)
+    assert comparator.feed("1\n")
+    assert not comparator.feed("5")  # the judge kills the engine here
+    assert comparator.mismatched
+    assert not comparator.feed("\n2\n3\n")
+    assert not comparator.finish()
+
+
+@pytest.mark.parametrize("mode", list(CompareMode))
+def test_endless_output_is_rejected_once_it_runs_past_the_answer(mode):
+    comparator = StreamingComparator("1\n", mode)
+    fed = 0
+    while comparator.feed("1\n") and fed < 1000:
+        fed += 1
+    assert fed < 10
+
+
+def test_endless_trailing_spaces_are_not_buffered():
+    comparator = StreamingComparator("1\n", CompareMode.WHITESPACE)
+    assert comparator.feed("1")
+    for _ in range(1000):
+        assert comparator.feed(" " * 1000)
+    assert len(comparator._pending) < 10
+    assert comparator.finish()
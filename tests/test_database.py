@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import event, text
+
+
+@pytest.fixture
+def table(writer):
+    writer.write(lambda session: session.execute(text("CREATE TABLE item (name VARCHAR NOT NULL UNIQUE)")))
+    return "item"
+
+
+def insert(name: str):
+    def work(session):
+        session.execute(text("INSERT INTO item (name) VALUES (:name)"), {"name": name})
+        return name
+    return work
+
+
+def names(writer) -> list:
+    return writer.write(lambda session: session.scalars(text("SELECT name FROM item ORDER BY name")).all())
+
+
+def test_write_returns_the_result_once_committed(writer, table):
+    assert writer.write(insert("a")) == "a"
+    assert names(writer) == ["a"]
+
+
+def test_queued_writes_share_one_commit_and_fail_alone(writer, table):
+    engine = writer.session_factory.kw["bind"]
+    commits = []
+    event.listen(engine, "commit", lambda connection: commits.append(connection))
+    started, release = threading.Event(), threading.Event()
+
+    def hold(session):  # keeps the writer busy while the others queue up
+        insert("0")(session)
+        started.set()
+        return release.wait(5)
+
+    blocker = writer.submit(hold)
+    assert started.wait(5)
+    futures = [writer.submit(insert(name)) for name in ("a", "b", "a", "c")]
+    release.set()
+    assert blocker.result()
+    assert [future.result() for future in futures[:2]] == ["a", "b"]
+    with pytest.raises(Exception, match="UNIQUE"):
+        futures[2].result()
+    assert futures[3].result() == "c"
+    assert len(commits) == 2
+    assert names(writer) == ["0", "a", "b", "c"]
+
+
+def test_run_awaits_the_commit(writer, table):
+    async def main():
+        return await asyncio.gather(*(writer.run(insert(name)) for name in "xyz"))
+
+    assert asyncio.run(main()) == ["x", "y", "z"]
+    assert names(writer) == ["x", "y", "z"]
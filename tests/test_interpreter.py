@@ -0,0 +1,206 @@
+import pytest
+
+from services.code_executor.interpreter import MemoryBudgetExceeded, PseudoRuntimeError, PseudoSyntaxError, \
+    StepBudgetExceeded, UnsupportedFeature, compile_program, parse
+from services.code_executor.interpreter.tokenizer import tokenize
+from services.config import INTERPRETER_MAX_CALL_DEPTH
+
+
+def run(source: str, stdin: str = "", max_steps: int = 100_000, max_memory: int = 1 << 20):
+    output = []
+    outcome = compile_program(source).run(stdin, lambda text: output.append(text) or True, max_steps, max_memory)
+    return "".join(output), outcome
+
+
+def test_tokenizer_kinds_and_lines():
+    tokens = tokenize('DECLARE x : REAL\nx <- 1.5e3 + 2 // comment\nOUTPUT "a", \'b\'\n')
+    assert [(token.kind, token.value) for token in tokens if token.line == 2] == [
+        ("name", "x"), ("op", "<-"), ("real", 1500.0), ("op", "+"), ("int", 2), ("newline", None)
+    ]
+    assert ("string", "a") in [(token.kind, token.value) for token in tokens]
+    assert ("char", "b") in [(token.kind, token.value) for token in tokens]
+    assert tokens[-1].kind == "end"
+
+
+def test_tokenizer_makes_identifiers_case_insensitive():
+    names = [token.value for token in tokenize("Count count COUNT\n") if token.kind == "name"]
+    assert names == ["Count", "Count", "Count"]
+
+
+def test_tokenizer_leaves_unknown_characters_to_the_engine():
+    with pytest.raises(UnsupportedFeature):
+        tokenize("OUTPUT 'ab'\n")
+    with pytest.raises(UnsupportedFeature):
+        tokenize("OUTPUT 1 # 2\n")
+
+
+@pytest.mark.parametrize("source", [
+    "IF TRUE THEN\nOUTPUT 1\n",  # missing ENDIF
+    "DECLARE x INTEGER\n",
+    "OUTPUT (1\n",
+    "FOR i <- 1 TO 3\nOUTPUT i\n",
+    "OUTPUT 1 ENDIF\n",
+    "PROCEDURE P(A, B)\nENDPROCEDURE\n",  # parameters without a type
+    "FUNCTION F() RETURNS INTEGER\n    RETURN\nENDFUNCTION\n",
+])
+def test_parser_rejects_broken_blocks(source):
+    with pytest.raises(PseudoSyntaxError) as error:
+        parse(source)
+    assert not isinstance(error.value, UnsupportedFeature)
+
+
+def test_parser_hands_unsupported_syntax_on():
+    with pytest.raises(UnsupportedFeature):
+        parse("DECLARE x : INTEGER\nCASE OF x\n1 : OUTPUT 1\nENDCASE\n")
+
+
+def test_arithmetic_and_output_formatting():
+    output, outcome = run("OUTPUT 7 DIV 2, \" \", 7 MOD 2, \" \", 7 / 2, \" \", 2 ^ 3\nOUTPUT 1 < 2 AND NOT FALSE\n")
+    assert outcome.error is None
+    assert output == "3 1 3.5 8\nTRUE\n"
+
+
+def test_loops_arrays_and_input():
+    source = """
+DECLARE n : INTEGER
+DECLARE values : ARRAY[1:10] OF INTEGER
+DECLARE total : INTEGER
+INPUT n
+total <- 0
+FOR i <- 1 TO n
+    INPUT values[i]
+    total <- total + values[i]
+NEXT i
+WHILE total > 10 DO
+    total <- total - 10
+ENDWHILE
+REPEAT
+    total <- total + 1
+UNTIL total >= 5
+OUTPUT total
+"""
+    output, outcome = run(source, "3\n4\n5\n6\n")
+    assert outcome.error is None
+    assert output == "6\n"  # 15, 5, then the REPEAT body runs once
+
+
+def test_procedures_functions_and_builtins():
+    source = """
+PROCEDURE Swap(BYREF a : INTEGER, BYREF b : INTEGER)
+    DECLARE t : INTEGER
+    t <- a
+    a <- b
+    b <- t
+ENDPROCEDURE
+FUNCTION Fact(n : INTEGER) RETURNS INTEGER
+    IF n <= 1 THEN
+        RETURN 1
+    ENDIF
+    RETURN n * Fact(n - 1)
+ENDFUNCTION
+DECLARE x : INTEGER
+DECLARE y : INTEGER
+x <- 1
+y <- 2
+CALL swap(X, Y)
+OUTPUT x, y, " ", fact(5)
+OUTPUT UCASE("ab") & MID("hello", 2, 3), " ", length("abc"), " ", NUM_TO_STR(4)
+"""
+    output, outcome = run(source)
+    assert outcome.error is None
+    assert output == "21 120\nABell 3 4\n"
+
+
+def test_single_line_if_shared_parameter_types_and_bare_return():
+    output, outcome = run(
+        "PROCEDURE Copy(BYREF A, B : INTEGER)\n"
+        "    IF B < 0 THEN RETURN ENDIF\n"
+        "    A <- B\n"
+        "    B <- 0\n"
+        "ENDPROCEDURE\n"
+        "DECLARE x, y : INTEGER\n"
+        "x <- 1\n"
+        "y <- -2\n"
+        "CALL Copy(x, y)\n"
+        "IF x = 1 THEN OUTPUT \"kept\" ELSE OUTPUT \"copied\" ENDIF\n"
+        "y <- 5\n"
+        "CALL Copy(x, y)\n"
+        "OUTPUT x, y\n"
+    )
+    assert outcome.error is None
+    assert output == "kept\n50\n"
+
+@pytest.mark.parametrize("source, message", [
+    ("OUTPUT 1 DIV 0\n", "Line 1"),
+    ("DECLARE a : ARRAY[1:3] OF INTEGER\nOUTPUT a[4]\n", "Line 2"),
+    ("DECLARE n : INTEGER\nINPUT n\n", "Line 2"),
+])
+def test_runtime_errors_carry_the_line(source, message):
+    output, outcome = run(source, "x\n")
+    assert isinstance(outcome.error, PseudoRuntimeError)
+    assert message in str(outcome.error)
+
+
+def test_step_budget_stops_endless_loops():
+    output, outcome = run("WHILE TRUE DO\nENDWHILE\n", max_steps=1000)
+    assert isinstance(outcome.error, StepBudgetExceeded)
+
+
+def test_memory_budget_counts_arrays():
+    output, outcome = run("DECLARE a : ARRAY[1:1000000] OF INTEGER\n", max_memory=1024)
+    assert isinstance(outcome.error, MemoryBudgetExceeded)
+
+
+def test_unbounded_recursion_is_a_runtime_error():
+    source = "FUNCTION F(n : INTEGER) RETURNS INTEGER\n    RETURN F(n + 1)\nENDFUNCTION\nOUTPUT F(1)\n"
+    output, outcome = run(source)
+    assert isinstance(outcome.error, PseudoRuntimeError)
+    assert "Stack overflow" in str(outcome.error)
+
+
+def test_recursion_nested_in_blocks_reaches_the_call_depth_limit():
+    depth = INTERPRETER_MAX_CALL_DEPTH - 1  # the main program is the first frame
+    source = f"""
+FUNCTION F(n : INTEGER) RETURNS INTEGER
+    IF n > 0 THEN
+        WHILE TRUE DO
+            IF n MOD 2 = 0 OR n > 0 THEN
+                RETURN F(n - 1) + 1
+            ENDIF
+        ENDWHILE
+    ENDIF
+    RETURN 0
+ENDFUNCTION
+OUTPUT F({depth})
+"""
+    output, outcome = run(source)
+    assert outcome.error is None
+    assert output == f"{depth}\n"
+
+
+def test_call_depth_limit_reports_the_call_line():
+    source = "FUNCTION F(n : INTEGER) RETURNS INTEGER\n    IF n > 0 THEN\n        RETURN F(n + 1)\n    ENDIF\n" \
+             "    RETURN 0\nENDFUNCTION\nOUTPUT F(1)\n"
+    output, outcome = run(source)
+    assert str(outcome.error) == "Line 3: Stack overflow"
+
+
+def test_cpu_time_is_measured_on_the_thread_that_ran_the_program():
+    output, outcome = run("DECLARE i : INTEGER\ni <- 0\nWHILE i < 20000 DO\n    i <- i + 1\nENDWHILE\n")
+    assert outcome.error is None
+    assert outcome.cpu_time > 0
+
+
+def test_rejected_output_stops_the_program():
+    outcome = compile_program("WHILE TRUE DO\n    OUTPUT 1\nENDWHILE\n").run("", lambda text: False, 100_000, 1 << 20)
+    assert outcome.rejected
+    assert outcome.error is None
+
+
+@pytest.mark.parametrize("source", [
+    "OUTPUT DAY(TODAY())\n",  # built-ins the interpreter lacks
+    "PROCEDURE Length(s : STRING)\nENDPROCEDURE\n",  # redefines a built-in
+])
+def test_compiler_hands_unsupported_programs_on(source):
+    with pytest.raises(UnsupportedFeature):
+        compile_program(source)
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+import pytest
+
+from services.code_executor.limits import MeasuredPopen
+
+ALLOCATE = "x = bytearray({size} << 20)\nfor i in range(0, len(x), 4096): x[i] = 1\n"
+
+
+def test_wait4_keeps_the_usage():
+    process = MeasuredPopen([sys.executable, "-c", ALLOCATE.format(size=512)])
+    assert process.wait() == 0
+    assert process.cpu_time is not None
+    assert process.peak_rss >= 512 * 1024
+
+
+def test_inherited_rss_is_not_reported():
+    process = MeasuredPopen(["true"])
+    assert process.wait() == 0
+    assert process.peak_rss is None  # ru_maxrss holds at most what it inherited from this process
+
+
+def test_wait_timeout_and_kill():
+    process = MeasuredPopen(["sleep", "10"])
+    assert process.poll() is None
+    with pytest.raises(subprocess.TimeoutExpired):
+        process.wait(timeout=0.05)
+    process.kill()
+    assert process.wait(timeout=5) == -9
+    assert process.rusage is not None
+
@@ -0,0 +1,53 @@
+import pytest
+
+from services.code_executor.interpreter.linter import Linter
+
+
+@pytest.fixture
+def lint():
+    return Linter().lint
+
+
+@pytest.mark.parametrize("source", [
+    "DECLARE x : INTEGER\nINPUT x\nOUTPUT x * 2\n",
+    "FOR i <- 1 TO 3\n    OUTPUT i\nNEXT i\n",
+    "PROCEDURE P(n : INTEGER)\n    OUTPUT n\nENDPROCEDURE\nCALL P(1)\n",
+    # identifiers and keywords as the engine reads them
+    "DECLARE Count : INTEGER\ncount <- 1\nOUTPUT COUNT\n",
+    "PROCEDURE Greet()\n    OUTPUT 1\nENDPROCEDURE\nCALL greet()\n",
+    "output 1\n",
+    "OUTPUT length(\"abc\"), Length(\"a\")\n",
+    "DECLARE x : INTEGER\nx <- 1\nIF x > 0 THEN OUTPUT x ENDIF\n",
+    "PROCEDURE Swap(BYREF A, B : INTEGER)\n    RETURN\nENDPROCEDURE\n",
+    "PROCEDURE P(n : INTEGER)\n    IF n > 0 THEN\n        RETURN\n    ENDIF\n    OUTPUT n\nENDPROCEDURE\nCALL P(1)\n",
+    # valid pseudocode the interpreter does not implement is left to the engine
+    "OUTPUT DAY(TODAY())\n",
+    "OUTPUT SQRT(4)\n",
+    "OUTPUT NUM_TO_STRING(4)\n",
+    "OUTPUT 1.5e3\n",
+    "OUTPUT 'ab'\n",
+    "DECLARE x : INTEGER\nx = 1\n",
+    "DECLARE x : INTEGER\nx <- 1\nCASE OF x\n    1 : OUTPUT 1\nENDCASE\n",
+])
+def test_valid_sources_pass(lint, source):
+    assert lint(source) is None
+
+
+@pytest.mark.parametrize("source, error", [
+    ("OUTPUT x\n", "Line 1: x is not declared"),
+    ("IF TRUE THEN\n    OUTPUT 1\n", "ENDIF"),
+    ("CALL Foo()\n", "Line 1: Foo is not defined"),
+    ("PROCEDURE P(n : INTEGER)\nENDPROCEDURE\nCALL P()\n", "Line 3"),
+    ("DECLARE x : INTEGER\nDECLARE y INTEGER\n", "Line 2"),
+])
+def test_syntax_errors_are_reported(lint, source, error):
+    assert error in lint(source)
+
+
+def test_results_are_cached_per_normalized_source():
+    linter = Linter(capacity=2)
+    assert linter.lint("OUTPUT x\n") is not None
+    assert linter.lint("OUTPUT x   \n") == linter.lint("OUTPUT x\n")
+    linter.lint("OUTPUT 1\n")
+    linter.lint("OUTPUT 2\n")
+    assert len(linter._results) == 2
@@ -0,0 +1,146 @@
+import sqlite3
+
+import pytest
+
+from migrations import runner
+
+# the tables as create_all made them before migrations existed
+LEGACY_SCHEMA = """
+CREATE TABLE user (
+    uid INTEGER NOT NULL PRIMARY KEY, username VARCHAR(50) NOT NULL, email VARCHAR(50) NOT NULL UNIQUE,
+    disabled BOOLEAN NOT NULL, verified BOOLEAN NOT NULL, password VARCHAR NOT NULL,
+    created_at DATETIME, updated_at DATETIME
+);
+CREATE TABLE problem (
+    pid INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR NOT NULL, input VARCHAR NOT NULL,
+    output VARCHAR NOT NULL, sample_input VARCHAR NOT NULL, sample_output VARCHAR NOT NULL, labels VARCHAR NOT NULL,
+    source VARCHAR NOT NULL, hint VARCHAR NOT NULL, difficulty VARCHAR NOT NULL, time_limit VARCHAR NOT NULL,
+    memory_limit VARCHAR NOT NULL, accepted INTEGER NOT NULL, submit INTEGER NOT NULL, solved INTEGER NOT NULL,
+    defunct BOOLEAN NOT NULL
+);
+CREATE TABLE test_sample (
+    sid INTEGER NOT NULL PRIMARY KEY, num INTEGER NOT NULL, input VARCHAR NOT NULL, output VARCHAR NOT NULL,
+    problem_id INTEGER NOT NULL REFERENCES problem (pid)
+);
+CREATE TABLE source_code (
+    code_id INTEGER NOT NULL PRIMARY KEY, language VARCHAR NOT NULL, code VARCHAR NOT NULL,
+    pid INTEGER NOT NULL REFERENCES problem (pid), sid VARCHAR NOT NULL
+);
+CREATE TABLE submission (
+    submit_id INTEGER NOT NULL PRIMARY KEY, code_id INTEGER NOT NULL REFERENCES source_code (code_id),
+    sid VARCHAR NOT NULL, pid INTEGER NOT NULL REFERENCES problem (pid), valid BOOLEAN
+);
+CREATE TABLE runtime_info (
+    run_id INTEGER NOT NULL PRIMARY KEY, sample_id INTEGER NOT NULL REFERENCES test_sample (sid),
+    problem_id INTEGER NOT NULL REFERENCES problem (pid), status VARCHAR NOT NULL, msg VARCHAR,
+    submission_id INTEGER NOT NULL REFERENCES submission (submit_id)
+);
+"""
+
+
+def add_problem(connection: sqlite3.Connection, pid: int, difficulty: str | None = "easy", defunct: bool | None = False):
+    connection.execute(
+        "INSERT INTO problem VALUES (?, 't', 'd', 'i', 'o', 'si', 'so', 'l', 's', 'h', ?, '1', '16', 0, 0, 0, ?)",
+        (pid, difficulty, defunct)
+    )
+
+
+@pytest.fixture
+def database_file(sqlite_url) -> str:
+    return sqlite_url.removeprefix("sqlite:///")
+
+
+@pytest.fixture
+def legacy_database(database_file) -> str:
+    with sqlite3.connect(database_file) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+        add_problem(connection, 1)
+        add_problem(connection, 2, "hard")
+        add_problem(connection, 3, "hard", defunct=True)
+        # numbered by sample count before, so numbers of one problem could repeat
+        connection.executemany("INSERT INTO test_sample (sid, num, input, output, problem_id) VALUES (?, ?, ?, ?, ?)",
+                               [(1, 1, "1", "1", 1), (2, 2, "2", "2", 1), (3, 2, "3", "3", 1), (4, 1, "4", "4", 2)])
+    connection.close()
+    return database_file
+
+
+def columns(connection: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+
+def test_revisions_are_numbered_without_gaps():
+    migrations = runner.load_migrations()
+    assert [migration.revision for migration in migrations] == list(range(1, len(migrations) + 1))
+
+
+def test_new_database_is_created_at_the_latest_revision(database_file):
+    latest = len(runner.load_migrations())
+    assert runner.upgrade_database() == latest
+    with sqlite3.connect(database_file) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM schema_version").fetchone() == (latest,)
+        add_problem(connection, 1)
+        assert connection.execute("SELECT * FROM problem_count").fetchall() == [("easy", 0, 1)]
+    connection.close()
+    assert runner.upgrade_database() == latest
+
+
+def test_legacy_database_is_migrated(legacy_database):
+    latest = len(runner.load_migrations())
+    assert runner.upgrade_database() == latest
+    with sqlite3.connect(legacy_database) as connection:
+        assert {"time_used", "memory_used"} <= set(columns(connection, "runtime_info"))
+        assert "judged_at" in columns(connection, "submission")
+        assert {"input_digest", "output_digest", "updated_at"} <= set(columns(connection, "test_sample"))
+        # duplicate numbers renumbered in their old order, the unique index holds
+        assert connection.execute("SELECT sid, num FROM test_sample WHERE problem_id = 1 ORDER BY sid").fetchall() \
+            == [(1, 1), (2, 2), (3, 3)]
+        with pytest.raises(sqlite3.IntegrityError):
+            connection.execute("INSERT INTO test_sample (num, problem_id) VALUES (1, 2)")
+        # problem_count filled from the existing rows and kept by the triggers
+        count = "SELECT count FROM problem_count WHERE difficulty = ? AND defunct = ?"
+        assert connection.execute(count, ("hard", False)).fetchone() == (1,)
+        connection.execute("UPDATE problem SET defunct = 1 WHERE pid = 2")
+        connection.execute("DELETE FROM problem WHERE pid = 1")
+        assert connection.execute(count, ("hard", False)).fetchone() == (0,)
+        assert connection.execute(count, ("hard", True)).fetchone() == (2,)
+        assert connection.execute(count, ("easy", False)).fetchone() == (0,)
+        assert "problem_stats_batch" in [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")]
+    connection.close()
+    assert runner.upgrade_database() == latest  # nothing left to apply
+
+
+def test_problem_count_treats_null_as_the_column_default(database_file):
+    # difficulty and defunct are NOT NULL since create_all, a table made by hand may still hold NULLs
+    schema = LEGACY_SCHEMA.replace("difficulty VARCHAR NOT NULL", "difficulty VARCHAR") \
+        .replace("defunct BOOLEAN NOT NULL", "defunct BOOLEAN")
+    with sqlite3.connect(database_file) as connection:
+        connection.executescript(schema)
+        add_problem(connection, 1, None, None)
+        add_problem(connection, 2)
+    connection.close()
+    runner.upgrade_database()
+    with sqlite3.connect(database_file) as connection:
+        count = "SELECT count FROM problem_count WHERE difficulty = 'easy' AND defunct = 0"
+        assert connection.execute(count).fetchone() == (2,)
+        add_problem(connection, 3, None, None)
+        assert connection.execute(count).fetchone() == (3,)
+        connection.execute("UPDATE problem SET difficulty = 'hard' WHERE pid = 3")
+        connection.execute("DELETE FROM problem WHERE pid = 1")
+        assert connection.execute(count).fetchone() == (1,)
+        assert connection.execute("SELECT SUM(count) FROM problem_count").fetchone() == (2,)
+    connection.close()
+
+def test_failed_migration_rolls_back_every_step(legacy_database, monkeypatch):
+    def broken(connection):
+        raise RuntimeError("broken migration")
+
+    migrations = runner.load_migrations()
+    monkeypatch.setattr(runner, "load_migrations",
+                        lambda: migrations + [runner.Migration(len(migrations) + 1, "broken", broken)])
+    with pytest.raises(RuntimeError):
+        runner.upgrade_database()
+    with sqlite3.connect(legacy_database) as connection:
+        assert "input_digest" not in columns(connection, "test_sample")
+        assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'schema_version'").fetchone() is None
+    connection.close()
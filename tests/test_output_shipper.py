@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services.code_executor.output_shipper import OutputShipper, OutputStalled  # noqa: E402
+
+
+def shipper(client, high_water: int = 1) -> OutputShipper:
+    """Flushed by the timer only; by default a single unread chunk already waits for the consumer."""
+    return OutputShipper(client, "output_test", flush_bytes=1 << 20, flush_interval=0.01, high_water=high_water,
+                         stall_timeout=0.05)
+
+
+def test_buffered_output_is_flushed_on_exit():
+    client = fakeredis.FakeAsyncRedis()
+
+    async def run():
+        async with shipper(client, high_water=10) as output:
+            await output.push("a")
+            await output.push("b")
+        return await client.lrange("output_test", 0, -1)
+    assert asyncio.run(run()) == [b"ab"]
+
+
+def test_stall_in_the_timer_is_raised_by_the_next_push():
+    client = fakeredis.FakeAsyncRedis()
+
+    async def run():
+        with pytest.raises(OutputStalled):  # raised again on exit, the shipper stays stalled
+            async with shipper(client) as output:
+                await output.push("a")
+                await asyncio.sleep(0.2)  # nobody pops, the timer's flush stalls
+                with pytest.raises(OutputStalled):
+                    await output.push("b")
+        return await client.lrange("output_test", 0, -1)
+    assert asyncio.run(run()) == [b"a"]
+
+
+def test_stall_in_the_timer_is_raised_on_exit():
+    client = fakeredis.FakeAsyncRedis()
+
+    async def run():
+        with pytest.raises(OutputStalled):
+            async with shipper(client) as output:
+                await output.push("a")
+                await asyncio.sleep(0.2)
+        return await client.llen("output_test")
+    assert asyncio.run(run()) == 1  # no second flush after the stall
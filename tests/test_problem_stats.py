@@ -0,0 +1,101 @@
+import datetime
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs the Lua scripts with it
+
+from migrations.runner import upgrade_database  # noqa: E402
+from models.problem import Problem, ProblemStatsBatch  # noqa: E402
+from services import problem_stats  # noqa: E402
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(problem_stats, "_redis", client)
+    return client
+
+
+@pytest.fixture
+def flusher(writer, redis_client) -> problem_stats.StatsFlusher:
+    upgrade_database()
+    writer.write(lambda session: session.add_all([
+        Problem(pid=pid, title="", description="", input="", output="", sample_input="", sample_output="",
+                labels="", source="", hint="", accepted=1, submit=2, solved=1)
+        for pid in (1, 2)
+    ]))
+    return problem_stats.StatsFlusher()
+
+
+def pend(redis_client, pid: int, **deltas: int):
+    for counter, delta in deltas.items():
+        redis_client.hincrby(problem_stats.PENDING_KEY, f"{pid}:{counter}", delta)
+
+
+def stored(writer, pid: int) -> dict:
+    problem = writer.write(lambda session: session.get(Problem, pid))
+    return {counter: getattr(problem, counter) for counter in problem_stats.COUNTERS}
+
+
+def live(writer, pid: int) -> dict:
+    return problem_stats.live_counts(writer.write(lambda session: session.get(Problem, pid)))
+
+
+def test_flush_writes_every_problem_back_once(writer, redis_client, flusher):
+    pend(redis_client, 1, submit=3, accepted=1, solved=1)
+    pend(redis_client, 2, submit=1)
+    assert live(writer, 1) == {"accepted": 2, "submit": 5, "solved": 2}
+    assert flusher.flush() == 2
+    assert stored(writer, 1) == {"accepted": 2, "submit": 5, "solved": 2}
+    assert stored(writer, 2) == {"accepted": 1, "submit": 3, "solved": 1}
+    assert live(writer, 1) == stored(writer, 1)
+    assert not redis_client.exists(problem_stats.PENDING_KEY, problem_stats.FLUSHING_KEY,
+                                   problem_stats.FLUSH_BATCH_KEY, problem_stats.FLUSH_LOCK_KEY)
+    assert flusher.flush() == 0
+
+
+def test_batch_committed_before_a_crash_is_not_applied_twice(writer, redis_client, flusher, monkeypatch):
+    pend(redis_client, 1, submit=3)
+    with monkeypatch.context() as patch:
+        patch.setattr(problem_stats, "_DROP_BATCH", "return 0")  # the flusher dies right after the commit
+        assert flusher.flush() == 1
+    assert redis_client.exists(problem_stats.FLUSHING_KEY)
+    pend(redis_client, 1, submit=1)  # arrives while the old batch is still there
+    assert flusher.flush() == 0  # the old batch is only dropped
+    assert stored(writer, 1)["submit"] == 5
+    assert flusher.flush() == 1
+    assert stored(writer, 1)["submit"] == 6
+
+
+def test_batch_lost_before_its_commit_is_retried(writer, redis_client, flusher, monkeypatch):
+    pend(redis_client, 1, submit=3)
+
+    def fail(work):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(writer, "write", fail)
+        with pytest.raises(RuntimeError):
+            flusher.flush()
+    assert not redis_client.exists(problem_stats.FLUSH_LOCK_KEY)
+    assert live(writer, 1)["submit"] == 5  # still counted while it waits
+    assert flusher.flush() == 1
+    assert stored(writer, 1)["submit"] == 5
+
+
+def test_flush_leaves_a_lock_it_does_not_hold(redis_client, flusher):
+    pend(redis_client, 1, submit=1)
+    redis_client.set(problem_stats.FLUSH_LOCK_KEY, "other")
+    assert flusher.flush() == 0
+    assert redis_client.get(problem_stats.FLUSH_LOCK_KEY) == b"other"
+    assert redis_client.exists(problem_stats.PENDING_KEY)
+
+
+def test_old_batch_ids_are_pruned(writer, redis_client, flusher):
+    old = datetime.datetime.utcnow() - datetime.timedelta(seconds=problem_stats.PROBLEM_STATS_BATCH_RETENTION + 60)
+    writer.write(lambda session: session.add(ProblemStatsBatch(batch_id="old", applied_at=old)))
+    pend(redis_client, 1, submit=1)
+    flusher.flush()
+    batch_ids = writer.write(lambda session: [batch.batch_id for batch in session.query(ProblemStatsBatch)])
+    assert len(batch_ids) == 1 and batch_ids != ["old"]
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.code_executor import slots
+
+
+@pytest.fixture(autouse=True)
+def two_slots(tmp_path, monkeypatch):
+    monkeypatch.setattr(slots, "ENGINE_SLOTS", 2)
+    monkeypatch.setattr(slots, "ENGINE_SLOT_DIR", str(tmp_path))
+
+
+def test_slots_are_bounded_and_released():
+    held = [slots._try_acquire() for _ in range(2)]  # flock treats every open file as a separate holder
+    assert None not in held
+    assert slots._try_acquire() is None
+    slots._release(held.pop())
+    fd = slots._try_acquire()
+    assert fd is not None
+    for fd in held + [fd]:
+        slots._release(fd)
+
+
+def test_waiter_gets_the_slot_freed_by_another_holder():
+    held = [slots._try_acquire() for _ in range(2)]
+    threading.Timer(0.1, slots._release, (held[0],)).start()
+    started = time.monotonic()
+    with slots.engine_slot():
+        assert time.monotonic() - started >= 0.09
+    slots._release(held[1])
+
+
+def test_interactive_runs_wait_for_a_slot_without_blocking_the_loop():
+    async def main():
+        held = [slots._try_acquire() for _ in range(2)]
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        asyncio.get_running_loop().call_later(0.1, slots._release, held[0])
+        async with slots.async_engine_slot():
+            pass
+        ticker.cancel()
+        slots._release(held[1])
+        return ticks
+
+    assert asyncio.run(main()) >= 5
@@ -0,0 +1,40 @@
+import pytest
+import redis
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs the Lua scripts with it
+
+from services.code_executor import verdict_cache  # noqa: E402
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(verdict_cache, "_redis", client)
+    return client
+
+
+def test_round_trip(redis_client):
+    cache = verdict_cache.VerdictCache(capacity=2)
+    assert cache.get("a") is None
+    cache.put("a", [[1, "AC", 0.01, 1024]])
+    assert cache.get("a") == [[1, "AC", 0.01, 1024]]
+
+
+def test_least_recently_used_is_evicted(redis_client):
+    cache = verdict_cache.VerdictCache(capacity=2)
+    cache.put("a", [])
+    cache.put("b", [])
+    assert cache.get("a") == []  # "b" is now the least recently used
+    cache.put("c", [])
+    assert cache.get("b") is None
+    assert cache.get("a") == [] and cache.get("c") == []
+    assert redis_client.zcard(verdict_cache.LRU_KEY) == 2
+    assert not redis_client.exists(f"{verdict_cache.ENTRY_PREFIX}b")
+
+
+def test_unreachable_redis_is_a_miss(monkeypatch):
+    monkeypatch.setattr(verdict_cache, "_redis", redis.Redis(port=1, socket_connect_timeout=0.1))  # nothing listens
+    cache = verdict_cache.VerdictCache()
+    cache.put("a", [])
+    assert cache.get("a") is None
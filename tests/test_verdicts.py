@@ -0,0 +1,56 @@
+"""Runtime errors must not be reported as wrong answers, whichever engine ran the program."""
+import signal
+
+import pytest
+
+from services.code_executor.comparator import CompareMode, StreamingComparator
+from services.code_executor.engines import InterpreterEngine
+from services.code_executor.judge import Verdict, get_verdict
+
+
+def result(good=True, return_code=0, timed_out=False, matched=None, cpu_time=10, peak_memory=1024, error=None):
+    return {
+        "process_id": 1,
+        "good": good,
+        "result": "",
+        "error": error if error is not None else "" if good else "Runtime error",
+        "return_code": return_code,
+        "timed_out": timed_out,
+        "matched": matched,
+        "usage": {"cpu_time": cpu_time, "peak_memory": peak_memory}
+    }
+
+
+@pytest.mark.parametrize("communicated, verdict", [
+    (result(matched=True), Verdict.ACCEPTED),
+    (result(matched=False), Verdict.WRONG_ANSWER),
+    (result(good=False, return_code=-signal.SIGKILL, matched=False), Verdict.WRONG_ANSWER),  # killed on a difference
+    (result(good=False, return_code=1, matched=None), Verdict.RUNTIME_ERROR),
+    (result(good=False, return_code=-signal.SIGSEGV, matched=None), Verdict.RUNTIME_ERROR),
+    (result(good=False, return_code=-signal.SIGKILL, timed_out=True), Verdict.TIME_LIMIT_EXCEEDED),
+    (result(good=False, return_code=-signal.SIGXCPU), Verdict.TIME_LIMIT_EXCEEDED),
+    (result(matched=True, cpu_time=1500), Verdict.TIME_LIMIT_EXCEEDED),
+    (result(good=False, return_code=1, peak_memory=65 * 1024), Verdict.MEMORY_LIMIT_EXCEEDED),
+    # RLIMIT_AS makes the allocation fail before the RSS passes the limit
+    (result(good=False, return_code=-signal.SIGABRT,
+            error="terminate called after throwing an instance of 'std::bad_alloc'"), Verdict.MEMORY_LIMIT_EXCEEDED),
+    (result(good=False, return_code=-signal.SIGSEGV, peak_memory=63 * 1024), Verdict.MEMORY_LIMIT_EXCEEDED),
+    (result(good=True, peak_memory=63 * 1024, matched=True), Verdict.ACCEPTED),
+])
+def test_get_verdict(communicated, verdict, limits):
+    assert get_verdict(communicated, limits) == verdict
+
+
+@pytest.mark.parametrize("source, expected, verdict", [
+    ("OUTPUT 3\n", "3\n", Verdict.ACCEPTED),
+    ("OUTPUT 2\n", "3\n", Verdict.WRONG_ANSWER),
+    ("OUTPUT 1 DIV 0\n", "3\n", Verdict.RUNTIME_ERROR),
+    ("OUTPUT 3\nOUTPUT 1 DIV 0\n", "3\n", Verdict.RUNTIME_ERROR),  # crashed after a correct prefix
+    ("OUTPUT (\n", "3\n", Verdict.RUNTIME_ERROR),  # syntax error
+    ("WHILE TRUE DO\n    OUTPUT 2\nENDWHILE\n", "3\n", Verdict.WRONG_ANSWER),  # stopped on the first line
+    ("WHILE TRUE DO\nENDWHILE\n", "3\n", Verdict.TIME_LIMIT_EXCEEDED),
+])
+def test_interpreter_verdicts(source, expected, verdict, limits):
+    comparator = StreamingComparator(expected, CompareMode.WHITESPACE)
+    communicated = InterpreterEngine().communicate(source, "", limits, timeout=2, comparator=comparator)
+    assert get_verdict(communicated, limits) == verdict
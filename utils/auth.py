@@ -51,7 +51,7 @@ def create_access_token(
 
 async def get_user_from_uid(session: database.Session, uid: str) -> UserSchema | None:
     try:
-        user: User = session.query(User).get(uid)
+        user: User = await database.run_db(lambda: session.query(User).get(uid))
         if user is None:
             raise ValueError
     except (ValueError, sqlalchemy.exc.SQLAlchemyError):
@@ -61,7 +61,7 @@ async def get_user_from_uid(session: database.Session, uid: str) -> UserSchema |
 
 async def get_user_from_email(session: database.Session, email: str) -> UserSchema | None:
     try:
-        user = session.query(User).where(User.email == email).one_or_none()
+        user = await database.run_db(lambda: session.query(User).where(User.email == email).one_or_none())
         if user is None:
             raise ValueError
     except (ValueError, sqlalchemy.exc.IntegrityError):
@@ -81,7 +81,7 @@ async def authenticate_user(
     user = await get_user_from_uid(session, uid)
     if user is None:
         return None
-    if not verify_password(password, user.password):
+    if not await database.run_db(verify_password, password, user.password):  # bcrypt is deliberately slow
         return None
     return user
 
@@ -98,14 +98,31 @@ async def authenticate_user_by_email(
     user = await get_user_from_email(session, email)
     if user is None:
         return None
-    if not verify_password(password, user.password):
+    if not await database.run_db(verify_password, password, user.password):  # bcrypt is deliberately slow
         return None
     return user
 
 
+async def get_user_from_token(session: database.Session, token: str) -> UserSchema | None:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        uid: str = payload.get("sub")
+        if uid is None:
+            return None
+        token_data = TokenDataSchema(uid=uid)
+    except JWTError as e:
+        print(e)
+        return None
+    return await get_user_from_uid(session, token_data.uid)
+
+
+def is_active(user: UserSchema) -> bool:
+    return not user.disabled and user.verified
+
+
 async def get_current_user(
         token: Annotated[str, Depends(oauth2_scheme)],
-        session: Annotated[database.Session, Depends(database.make_session)]
+        session: Annotated[database.Session, Depends(database.make_read_session)]
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,16 +130,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     print(datetime.now())
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        uid: str = payload.get("sub")
-        if uid is None:
-            raise credentials_exception
-        token_data = TokenDataSchema(uid=uid)
-    except JWTError as e:
-        print(e)
-        raise credentials_exception
-    user = await get_user_from_uid(session, token_data.uid)
+    user = await get_user_from_token(session, token)
 
     if user is None:
         raise credentials_exception
@@ -130,6 +138,6 @@ async def get_current_user(
 
 
 async def require_login(user: Annotated[UserSchema, Depends(get_current_user)]):
-    if user.disabled or not user.verified:
+    if not is_active(user):
         raise HTTPException(status_code=400, detail="Inactive user")
     return user